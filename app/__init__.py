@@ -3,9 +3,10 @@ from flask import Flask
 from flask_login import LoginManager
 from flask_socketio import SocketIO
 from config import Config  # Import the Config class
+from app.utils import packet_json
 
 login_manager = LoginManager()
-socketio = SocketIO()
+socketio = SocketIO(json=packet_json) # Lets broadcast_hub send each sample encoded once
 
 def create_app():
     app = Flask(__name__)
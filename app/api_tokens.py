@@ -0,0 +1,79 @@
+import hashlib
+import hmac
+import logging
+import secrets
+import threading
+from collections import OrderedDict
+from config import Config
+from app import database
+
+# --- Constants ---
+TOKEN_PREFIX = 'bep_'
+# Scopes a token can be granted. Session (browser) users implicitly have all.
+SCOPE_DEVICES_READ = 'devices:read'
+SCOPE_DEVICES_WRITE = 'devices:write'
+SCOPE_DATA_READ = 'data:read'
+SCOPE_SETTINGS_READ = 'settings:read'
+SCOPE_SETTINGS_WRITE = 'settings:write'
+ALL_SCOPES = (SCOPE_DEVICES_READ, SCOPE_DEVICES_WRITE, SCOPE_DATA_READ, SCOPE_SETTINGS_READ, SCOPE_SETTINGS_WRITE)
+
+# --- State Variables ---
+# LRU caches so repeated requests skip the database entirely: token hash ->
+# (id, username, scopes) for valid tokens, and a smaller one of hashes of
+# unknown tokens, so a client sending bad tokens can't evict the valid ones
+_cache = OrderedDict()
+_misses = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _hash_token(token):
+    """Keyed hash of a token. Tokens are random, so a fast HMAC is sufficient (no bcrypt)."""
+    return hmac.new(Config.API_TOKEN_KEY.encode('utf-8'), token.encode('utf-8'), hashlib.sha256).hexdigest()
+
+def _cache_put(cache, token_hash, info, size):
+    """Stores an entry in one of the LRU caches. Call with _cache_lock held."""
+    cache[token_hash] = info
+    cache.move_to_end(token_hash)
+    while len(cache) > size:
+        cache.popitem(last=False)
+
+# --- Public Functions ---
+def issue_token(username, name, scopes):
+    """
+    Creates a token for a user. Returns (token_id, token); the plaintext token
+    is only available here and is never stored.
+    """
+    invalid = set(scopes) - set(ALL_SCOPES)
+    if invalid:
+        raise ValueError(f"Unknown scopes: {', '.join(sorted(invalid))}")
+    token = TOKEN_PREFIX + secrets.token_urlsafe(32)
+    token_id = database.add_api_token(username, name, _hash_token(token), sorted(set(scopes)))
+    logging.info(f"API token {token_id} ('{name}') issued for '{username}' with scopes {sorted(set(scopes))}.")
+    return token_id, token
+
+def verify_token(token):
+    """Returns (id, username, scopes) for a valid token, or None."""
+    if not token.startswith(TOKEN_PREFIX):
+        return None
+    token_hash = _hash_token(token)
+    with _cache_lock:
+        for cache in (_cache, _misses):
+            if token_hash in cache:
+                cache.move_to_end(token_hash)
+                return cache[token_hash]
+    info = database.find_api_token(token_hash)
+    with _cache_lock:
+        if info is None:
+            _cache_put(_misses, token_hash, None, Config.API_TOKEN_MISS_CACHE_SIZE)
+        else:
+            _cache_put(_cache, token_hash, info, Config.API_TOKEN_CACHE_SIZE)
+    return info
+
+def revoke_token(token_id):
+    """Revokes a token and drops it from the cache. Returns True if it existed."""
+    revoked = database.revoke_api_token(token_id)
+    with _cache_lock:
+        for token_hash in [h for h, info in _cache.items() if info[0] == token_id]:
+            del _cache[token_hash]
+    if revoked:
+        logging.info(f"API token {token_id} revoked.")
+    return revoked
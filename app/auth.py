@@ -1,12 +1,68 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import wraps
 from flask import Blueprint, request, render_template, redirect, url_for, flash
-from flask_login import UserMixin, login_user, logout_user, current_user
-from .database import authenticate_user
+from flask_login import UserMixin, login_user, logout_user, current_user, login_required
+from config import Config
+from .database import authenticate_user, user_exists, list_api_tokens
+from . import api_tokens
+from .utils.offload import PoolBusyError
 from . import login_manager  # Import the login_manager instance
 
 auth_blueprint = Blueprint('auth', __name__)
 
+# --- Failed Login Limiter ---
+# Failure timestamps per key ('user:<name>' / 'addr:<ip>'), least recently
+# failed first. Once a key reaches LOGIN_MAX_FAILURES within
+# LOGIN_FAILURE_WINDOW, attempts are rejected before any password hash is
+# computed.
+_MAX_TRACKED_KEYS = 10000 # Bound memory under a flood of distinct usernames
+_failed_logins = OrderedDict()
+_failed_logins_lock = threading.Lock()
+
+def _prune(failures, now):
+    while failures and now - failures[0] > Config.LOGIN_FAILURE_WINDOW:
+        failures.popleft()
+
+def _is_locked_out(keys):
+    now = time.monotonic()
+    with _failed_logins_lock:
+        for key in keys:
+            failures = _failed_logins.get(key)
+            if failures:
+                _prune(failures, now)
+                if len(failures) >= Config.LOGIN_MAX_FAILURES:
+                    return True
+    return False
+
+def _record_failure(keys):
+    now = time.monotonic()
+    with _failed_logins_lock:
+        for key in keys:
+            failures = _failed_logins.get(key)
+            if failures is None:
+                failures = _failed_logins[key] = deque(maxlen=Config.LOGIN_MAX_FAILURES)
+            else:
+                _failed_logins.move_to_end(key)
+            failures.append(now)
+        # Drop keys whose failures have all expired, then the least recently
+        # failed ones beyond the cap (both from the front, no full scan)
+        while _failed_logins:
+            failures = next(iter(_failed_logins.values()))
+            if len(_failed_logins) <= _MAX_TRACKED_KEYS and failures and now - failures[-1] <= Config.LOGIN_FAILURE_WINDOW:
+                break
+            _failed_logins.popitem(last=False)
+
+def _clear_failures(keys):
+    with _failed_logins_lock:
+        for key in keys:
+            _failed_logins.pop(key, None)
+
 class User(UserMixin):
-    pass
+    scopes = None   # None for session users (all scopes), frozenset for token users
+    token_id = None
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -14,21 +70,108 @@ def load_user(user_id):
     user.id = user_id
     return user
 
+@login_manager.request_loader
+def load_user_from_request(req):
+    """Authenticates machine clients by an 'Authorization: Bearer <token>' header."""
+    header = req.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return None
+    info = api_tokens.verify_token(header[len('Bearer '):].strip())
+    if info is None:
+        return None
+    user = User()
+    user.token_id, user.id, user.scopes = info
+    return user
+
+def require_scope(scope):
+    """
+    Route decorator (use after @login_required) rejecting token users whose
+    token lacks `scope`. Session users are always allowed.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if current_user.scopes is not None and scope not in current_user.scopes:
+                return {'error': f"Token lacks required scope '{scope}'"}, 403
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
+
+def admin_required(view):
+    """Route decorator allowing only session-authenticated users listed in Config.ADMIN_USERS."""
+    @wraps(view)
+    @login_required
+    def wrapped(*args, **kwargs):
+        if current_user.token_id is not None or current_user.id not in Config.ADMIN_USERS:
+            return {'error': 'Admin access required'}, 403
+        return view(*args, **kwargs)
+    return wrapped
+
 @auth_blueprint.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        if authenticate_user(username, password):
+        limiter_keys = (f"user:{username}", f"addr:{request.remote_addr}")
+        if _is_locked_out(limiter_keys):
+            logging.warning(f"Login rejected for '{username}' from {request.remote_addr}: too many failed attempts.")
+            return "Too many failed attempts, try again later", 429
+        try:
+            authenticated = authenticate_user(username, password)
+        except PoolBusyError:
+            return "Server busy, try again later", 503
+        if authenticated:
+            _clear_failures(limiter_keys)
             user = User()
             user.id = username
             login_user(user)
             return redirect(url_for('main.index'))
+        _record_failure(limiter_keys)
         return "Invalid credentials", 401
     if current_user.is_authenticated:
         return redirect(url_for('main.index'))
     return render_template('login.html')
 
+@auth_blueprint.route('/tokens', methods=['GET'])
+@admin_required
+def list_tokens():
+    """List issued API tokens (hashes are never returned)."""
+    return {'tokens': list_api_tokens()}
+
+@auth_blueprint.route('/tokens', methods=['POST'])
+@admin_required
+def create_token():
+    """Issue an API token. The plaintext token is only returned in this response."""
+    data = request.json or {}
+    username = data.get('username', current_user.id)
+    name = data.get('name')
+    scopes = data.get('scopes', [])
+
+    if not name:
+        return {'error': "Missing 'name' parameter"}, 400
+    if not isinstance(name, str):
+        return {'error': "'name' must be a string"}, 400
+    if not isinstance(username, str):
+        return {'error': "'username' must be a string"}, 400
+    if not isinstance(scopes, list) or not scopes or not all(isinstance(scope, str) for scope in scopes):
+        return {'error': f"'scopes' must be a non-empty list of: {', '.join(api_tokens.ALL_SCOPES)}"}, 400
+    if not user_exists(username):
+        return {'error': f"Unknown user: {username}"}, 400
+
+    try:
+        token_id, token = api_tokens.issue_token(username, name, scopes)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    return {'id': token_id, 'username': username, 'name': name, 'scopes': sorted(set(scopes)), 'token': token}, 201
+
+@auth_blueprint.route('/tokens/<int:token_id>', methods=['DELETE'])
+@admin_required
+def revoke_token(token_id):
+    """Revoke an API token."""
+    if not api_tokens.revoke_token(token_id):
+        return {'error': f"Unknown token: {token_id}"}, 404
+    return {'status': 'success', 'id': token_id}
+
 @auth_blueprint.route('/logout')
 def logout():
     logout_user()
@@ -1,31 +1,198 @@
 import sqlite3
+import threading
+import time
 import bcrypt
 from config import Config  # Updated import
+from app.utils.offload import OffloadPool
 
 DB_PATH = Config.DB_PATH
 
+# --- State Variables ---
+_local = threading.local() # Holds one persistent connection per thread
+# bcrypt is deliberately slow; run it on a small bounded pool so a login
+# never stalls the server loop (and SocketIO emits) for the length of a hash
+_hash_pool = OffloadPool('bcrypt', max_workers=Config.AUTH_HASH_WORKERS, max_pending=Config.AUTH_HASH_MAX_PENDING)
+
+def get_connection():
+    """
+    Returns this thread's persistent connection to the user database,
+    opening it in WAL mode on first use.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=5.0)
+        conn.execute('PRAGMA journal_mode=WAL')   # Readers don't block the writer
+        conn.execute('PRAGMA synchronous=NORMAL') # Safe with WAL, fewer fsyncs
+        _local.conn = conn
+    return conn
+
 def init_db():
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
+    conn = get_connection()
+    with conn:
+        conn.execute('''
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 username TEXT NOT NULL UNIQUE,
                 password TEXT NOT NULL
             )
         ''')
-        conn.commit()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS api_tokens (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT NOT NULL,
+                name TEXT NOT NULL,
+                token_hash TEXT NOT NULL UNIQUE,
+                scopes TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                revoked INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS settings (
+                version INTEGER PRIMARY KEY,
+                data TEXT NOT NULL,
+                username TEXT,
+                created_at REAL NOT NULL,
+                chamber TEXT NOT NULL DEFAULT 'main'
+            )
+        ''')
+        # Databases created before multi-chamber support lack the chamber column
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(settings)')]
+        if 'chamber' not in columns:
+            conn.execute("ALTER TABLE settings ADD COLUMN chamber TEXT NOT NULL DEFAULT 'main'")
+        conn.execute('CREATE INDEX IF NOT EXISTS settings_chamber ON settings (chamber, version)')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS alarm_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chamber TEXT NOT NULL,
+                rule TEXT NOT NULL,
+                severity TEXT NOT NULL,
+                state TEXT NOT NULL,
+                value REAL,
+                message TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS alarm_events_chamber ON alarm_events (chamber, id)')
 
 def add_user(username, password):
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-        cursor.execute('INSERT INTO users (username, password) VALUES (?, ?)', (username, hashed_password))
-        conn.commit()
+    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    conn = get_connection()
+    with conn:
+        conn.execute('INSERT INTO users (username, password) VALUES (?, ?)', (username, hashed_password))
 
 def authenticate_user(username, password):
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute('SELECT password FROM users WHERE username = ?', (username,))
-        result = cursor.fetchone()
-    return result and bcrypt.checkpw(password.encode('utf-8'), result[0])
+    """
+    Checks a username/password pair. The bcrypt check runs on the hash pool;
+    raises PoolBusyError if too many checks are already queued.
+    """
+    result = get_connection().execute('SELECT password FROM users WHERE username = ?', (username,)).fetchone()
+    if not result:
+        return False
+    return _hash_pool.run(bcrypt.checkpw, password.encode('utf-8'), result[0])
+
+def user_exists(username):
+    row = get_connection().execute('SELECT 1 FROM users WHERE username = ?', (username,)).fetchone()
+    return row is not None
+
+# --- API Tokens ---
+# Only an HMAC of each token is stored (see app/api_tokens.py); scopes are
+# stored space-separated.
+def add_api_token(username, name, token_hash, scopes):
+    """Stores a new token hash and returns its id."""
+    conn = get_connection()
+    with conn:
+        cursor = conn.execute(
+            'INSERT INTO api_tokens (username, name, token_hash, scopes, created_at) VALUES (?, ?, ?, ?, ?)',
+            (username, name, token_hash, ' '.join(scopes), time.time())
+        )
+    return cursor.lastrowid
+
+def find_api_token(token_hash):
+    """Returns (id, username, scopes) for an active token hash, or None."""
+    row = get_connection().execute(
+        'SELECT id, username, scopes FROM api_tokens WHERE token_hash = ? AND revoked = 0', (token_hash,)
+    ).fetchone()
+    if row is None:
+        return None
+    return row[0], row[1], frozenset(row[2].split())
+
+def list_api_tokens():
+    rows = get_connection().execute(
+        'SELECT id, username, name, scopes, created_at, revoked FROM api_tokens ORDER BY id'
+    ).fetchall()
+    return [
+        {'id': r[0], 'username': r[1], 'name': r[2], 'scopes': r[3].split(), 'created_at': r[4], 'revoked': bool(r[5])}
+        for r in rows
+    ]
+
+def revoke_api_token(token_id):
+    """Marks a token as revoked. Returns True if the token existed."""
+    conn = get_connection()
+    with conn:
+        cursor = conn.execute('UPDATE api_tokens SET revoked = 1 WHERE id = ?', (token_id,))
+    return cursor.rowcount > 0
+
+# --- Runtime Settings ---
+# Append-only: every saved change is a new row holding a chamber's complete
+# settings as JSON (see app/settings.py), so earlier versions stay available.
+# Version numbers are global across chambers.
+def add_settings_version(version, data, username, chamber):
+    """
+    Stores a settings version. Raises sqlite3.IntegrityError if the version
+    already exists (another writer saved first).
+    """
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            'INSERT INTO settings (version, data, username, created_at, chamber) VALUES (?, ?, ?, ?, ?)',
+            (version, data, username, time.time(), chamber)
+        )
+
+def get_latest_settings_version():
+    """Returns the highest stored settings version number (any chamber), or 0 if none."""
+    row = get_connection().execute('SELECT MAX(version) FROM settings').fetchone()
+    return row[0] or 0
+
+def get_latest_settings_versions():
+    """Returns chamber -> highest stored settings version for that chamber."""
+    rows = get_connection().execute('SELECT chamber, MAX(version) FROM settings GROUP BY chamber').fetchall()
+    return dict(rows)
+
+def get_settings_version(version):
+    """Returns (version, data, username, created_at) for a settings version, or None."""
+    return get_connection().execute(
+        'SELECT version, data, username, created_at FROM settings WHERE version = ?', (version,)
+    ).fetchone()
+
+def list_settings_versions(chamber, limit=50):
+    rows = get_connection().execute(
+        'SELECT version, data, username, created_at FROM settings WHERE chamber = ? ORDER BY version DESC LIMIT ?', (chamber, limit)
+    ).fetchall()
+    return [{'version': r[0], 'data': r[1], 'username': r[2], 'created_at': r[3]} for r in rows]
+
+# --- Alarms ---
+# Raised and cleared transitions from app/services/alarm_service.py.
+def add_alarm_events(events):
+    conn = get_connection()
+    with conn:
+        conn.executemany(
+            'INSERT INTO alarm_events (chamber, rule, severity, state, value, message, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(e['chamber'], e['rule'], e['severity'], e['state'], e['value'], e['message'], e['timestamp']) for e in events]
+        )
+
+def list_alarm_events(chamber=None, limit=100):
+    """Returns the most recent alarm transitions (optionally for one chamber), newest first."""
+    if chamber is None:
+        rows = get_connection().execute(
+            'SELECT chamber, rule, severity, state, value, message, created_at FROM alarm_events ORDER BY id DESC LIMIT ?', (limit,)
+        ).fetchall()
+    else:
+        rows = get_connection().execute(
+            'SELECT chamber, rule, severity, state, value, message, created_at FROM alarm_events WHERE chamber = ? ORDER BY id DESC LIMIT ?',
+            (chamber, limit)
+        ).fetchall()
+    return [
+        {'chamber': r[0], 'rule': r[1], 'severity': r[2], 'state': r[3], 'value': r[4], 'message': r[5], 'timestamp': r[6]}
+        for r in rows
+    ]
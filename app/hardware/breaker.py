@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+
+# --- Constants ---
+STATE_CLOSED = 'closed'       # Reads go through
+STATE_OPEN = 'open'           # Reads are skipped and return the fallback value at once
+STATE_HALF_OPEN = 'half-open' # One probe read is in progress; its result closes or reopens the breaker
+
+FAILURE_THRESHOLD = 3  # Consecutive failed reads before the breaker opens
+BASE_BACKOFF = 5.0     # Seconds until the first probe after opening...
+MAX_BACKOFF = 300.0    # ...doubling after each failed probe, up to this
+
+# --- Exceptions ---
+class DeviceLostError(RuntimeError):
+    """Raised by a read function when its device has gone away (e.g. a USB serial adapter was unplugged)."""
+
+# --- Circuit Breaker ---
+class CircuitBreaker:
+    """
+    Guards one device's reads. A dead sensor costs its full failure time on
+    every read (serial timeouts, I2C retry sleeps, DHT read_retry); after
+    FAILURE_THRESHOLD consecutive failures the breaker opens and reads return
+    the fallback value immediately. Once the backoff has passed, the next read
+    goes through as a probe: success closes the breaker, failure reopens it
+    with twice the backoff.
+    """
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, base_backoff=BASE_BACKOFF, max_backoff=MAX_BACKOFF):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self.state = STATE_CLOSED
+        self._consecutive_failures = 0
+        self._backoff = 0.0
+        self._next_probe = 0.0 # Monotonic time the open breaker lets a probe through
+        self._stats = {
+            'calls': 0,
+            'failures': 0,
+            'short_circuits': 0, # Reads skipped while open
+            'trips': 0,          # Times the breaker opened from closed
+            'failure_time': 0.0, # Seconds spent in failed reads
+            'last_failure': None,
+        }
+
+    def allow(self):
+        """Returns True if a read may go through now (closed, or the probe of an open breaker)."""
+        with self._lock:
+            if self.state == STATE_OPEN and time.monotonic() >= self._next_probe:
+                self.state = STATE_HALF_OPEN
+            elif self.state != STATE_CLOSED:
+                self._stats['short_circuits'] += 1
+                return False
+            self._stats['calls'] += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != STATE_CLOSED:
+                logging.info(f"Breaker '{self.name}': probe succeeded, device reads resumed.")
+            self.state = STATE_CLOSED
+            self._consecutive_failures = 0
+            self._backoff = 0.0
+
+    def record_failure(self, duration=0.0, error=None, lost=False):
+        """Counts a failed read. `lost` opens a closed breaker at once, without waiting for the threshold."""
+        with self._lock:
+            self._consecutive_failures += 1
+            self._stats['failures'] += 1
+            self._stats['failure_time'] += duration
+            self._stats['last_failure'] = error or 'fallback value'
+            if self.state == STATE_HALF_OPEN:
+                self._open(min(self.max_backoff, self._backoff * 2))
+            elif self.state == STATE_CLOSED and (lost or self._consecutive_failures >= self.failure_threshold):
+                self._stats['trips'] += 1
+                self._open(self.base_backoff)
+
+    def _open(self, backoff):
+        self.state = STATE_OPEN
+        self._backoff = backoff
+        self._next_probe = time.monotonic() + backoff
+        logging.warning(
+            f"Breaker '{self.name}': {self._consecutive_failures} consecutive failed reads, "
+            f"skipping reads for {backoff:.0f}s."
+        )
+
+    def call(self, read_func, fallback, is_failure):
+        """
+        Runs read_func() through the breaker. Returns `fallback` without
+        calling it while the breaker is open; a result for which
+        is_failure(result) is true, or an exception, counts as a failure.
+        """
+        if not self.allow():
+            return fallback
+        start_time = time.monotonic()
+        try:
+            result = read_func()
+        except DeviceLostError as e:
+            logging.error(f"Breaker '{self.name}': device lost: {e}")
+            self.record_failure(time.monotonic() - start_time, str(e), lost=True)
+            return fallback
+        except Exception as e:
+            logging.error(f"Breaker '{self.name}': read failed: {e}")
+            self.record_failure(time.monotonic() - start_time, str(e))
+            return fallback
+        if is_failure(result):
+            self.record_failure(time.monotonic() - start_time)
+        else:
+            self.record_success()
+        return result
+
+    def reset(self):
+        """Closes the breaker."""
+        self.record_success()
+
+    def probe_now(self):
+        """
+        Lets the next read of an open breaker through as a probe (e.g. after
+        the device was re-initialized). The backoff is kept, so a device that
+        fails again right away backs off further.
+        """
+        with self._lock:
+            if self.state == STATE_OPEN:
+                self._next_probe = 0.0
+
+    @property
+    def backoff(self):
+        """Seconds the breaker waits before its next probe (0 while closed)."""
+        return self._backoff
+
+    def status(self):
+        """Returns the breaker's state and counters for the API."""
+        with self._lock:
+            status = dict(self._stats, state=self.state, consecutive_failures=self._consecutive_failures)
+            status['failure_time'] = round(status['failure_time'], 3)
+            if self.state == STATE_OPEN:
+                status['next_probe_in'] = round(max(0.0, self._next_probe - time.monotonic()), 1)
+            return status
+
+# --- State Variables ---
+_lock = threading.Lock()
+_breakers = {} # Device name -> CircuitBreaker
+
+# --- Public Functions ---
+def get_breaker(device_name):
+    """Returns the device's breaker, creating it on first use."""
+    breaker = _breakers.get(device_name)
+    if breaker is None:
+        with _lock:
+            breaker = _breakers.setdefault(device_name, CircuitBreaker(device_name))
+    return breaker
+
+def probe_now(device_name):
+    """Lets the next read of a device through as a probe, if it has a breaker."""
+    breaker = _breakers.get(device_name)
+    if breaker is not None:
+        breaker.probe_now()
+
+def get_all_breaker_statuses():
+    """Returns device name -> breaker status for every device read so far."""
+    return {name: breaker.status() for name, breaker in list(_breakers.items())}
+
+# Note: chambers.Chamber.read_sensors() reads each sensor device through its
+# breaker and reports a device whose breaker opens to the hardware registry,
+# which re-initializes it in the background. Breaker states are served at
+# /hardware-status and pushed to the dashboard by the sensor service.
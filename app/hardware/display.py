@@ -2,10 +2,7 @@ import logging
 import socket
 import subprocess
 import atexit
-import board
-import busio
-import adafruit_ssd1306
-from PIL import Image, ImageDraw, ImageFont
+from app.hardware import registry
 from app.hardware.sensors import FALLBACK_TEMPERATURE, FALLBACK_HUMIDITY, FALLBACK_OXYGEN # Import fallbacks for comparison
 
 # --- Constants ---
@@ -17,6 +14,10 @@ DEFAULT_FONT = None # Load default font during init if possible
 _i2c = None
 _oled = None
 _is_initialized = False
+# PIL modules, loaded lazily by initialize_display()
+Image = None
+ImageDraw = None
+ImageFont = None
 
 # --- Helper Functions ---
 def _get_ip_address():
@@ -49,13 +50,24 @@ def _get_wifi_ssid():
 
 # --- Initialization and Cleanup ---
 def initialize_display():
-    """Initializes the I2C bus and the OLED display."""
-    global _i2c, _oled, _is_initialized, DEFAULT_FONT
+    """
+    Initializes the I2C bus and the OLED display.
+    Returns True on success, False if the display is not found. Raises
+    registry.LibraryUnavailableError if a driver library is missing.
+    """
+    global _i2c, _oled, _is_initialized, DEFAULT_FONT, Image, ImageDraw, ImageFont
     if _is_initialized:
         logging.warning("Display already initialized.")
         return True
 
     logging.info("Initializing OLED display...")
+    board = registry.require_library('board')
+    busio = registry.require_library('busio')
+    adafruit_ssd1306 = registry.require_library('adafruit_ssd1306')
+    Image = registry.require_library('PIL.Image')
+    ImageDraw = registry.require_library('PIL.ImageDraw')
+    ImageFont = registry.require_library('PIL.ImageFont')
+
     try:
         # Note: I2C might be initialized by other sensors too.
         # Consider sharing the bus object if necessary.
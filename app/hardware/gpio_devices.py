@@ -1,6 +1,11 @@
-import RPi.GPIO as GPIO
 import logging
 import atexit
+from collections import namedtuple
+from app.hardware import pwm
+from app.hardware import registry
+
+# RPi.GPIO is loaded lazily by setup_gpio() so the app can start without it
+GPIO = None
 
 # --- Constants ---
 # Device Names (used as keys)
@@ -19,6 +24,21 @@ _DEVICE_PINS = {
     'pump-in2': 18   # Direction Pin 2 for Pump (kept LOW for forward)
 }
 
+# Why an actuator changed, passed to set_device_state()/set_pump_speed() and
+# reported to transition listeners
+SOURCE_SYSTEM = 'system'   # Startup, shutdown and other internal changes
+SOURCE_MANUAL = 'manual'   # A user or API token via the API
+SOURCE_CONTROL = 'control' # A control loop decision
+SOURCE_PULSE = 'pulse'     # A timed pulse (the CO2 solenoid dose)
+SOURCES = (SOURCE_SYSTEM, SOURCE_MANUAL, SOURCE_CONTROL, SOURCE_PULSE)
+
+# One actuator change: states are 'on'/'off'; duty is the pump's PWM duty
+# cycle (%), None for relays
+Transition = namedtuple('Transition', ['device', 'old_state', 'new_state', 'duty', 'source'])
+
+# Relay devices (LOW = ON). Additional chambers add their own via add_relay().
+_RELAYS = [CO2_SOLENOID, ARGON_SOLENOID, ITO_HEATING]
+
 # PWM Configuration
 _PWM_FREQUENCY = 100 # Hz
 _PUMP_ENA_PIN = _DEVICE_PINS['pump-ena']
@@ -26,7 +46,7 @@ _PUMP_IN1_PIN = _DEVICE_PINS['pump-in1']
 _PUMP_IN2_PIN = _DEVICE_PINS['pump-in2']
 
 # --- State Variables ---
-_pwm_pump = None
+_pwm_pump = None # pwm.PwmBackend driving the pump's enable pin
 _current_pump_speed = 0
 _device_states = { # Store the intended state ('on'/'off')
     CO2_SOLENOID: 'off',
@@ -34,19 +54,28 @@ _device_states = { # Store the intended state ('on'/'off')
     ITO_HEATING: 'off',
     PUMP: 'off'
 }
+_state_listeners = [] # Called with (device_name, state) after each successful change
+_transition_listeners = [] # Called with a Transition after each change of state or pump duty
 
 # --- Initialization ---
-def setup_gpio():
-    """Initializes GPIO pins, sets modes, and configures PWM."""
-    global _pwm_pump, _device_states
+def setup_gpio(pwm_backend=pwm.BACKEND_SOFTWARE):
+    """
+    Initializes GPIO pins, sets modes, and configures PWM through the named
+    pwm backend (see app/hardware/pwm.py). Returns True on success, False if
+    setup fails (an unknown backend, or one that can't be used, falls back to
+    software PWM, so a pump setting never takes the relays down with it).
+    Raises registry.LibraryUnavailableError if RPi.GPIO is not available.
+    """
+    global GPIO, _pwm_pump, _device_states
+    GPIO = registry.require_library('RPi.GPIO')
+
     try:
         GPIO.setmode(GPIO.BCM)
         GPIO.setwarnings(False)
 
         # Setup Relays (HIGH = OFF)
-        GPIO.setup(_DEVICE_PINS[CO2_SOLENOID], GPIO.OUT, initial=GPIO.HIGH)
-        GPIO.setup(_DEVICE_PINS[ARGON_SOLENOID], GPIO.OUT, initial=GPIO.HIGH)
-        GPIO.setup(_DEVICE_PINS[ITO_HEATING], GPIO.OUT, initial=GPIO.HIGH)
+        for relay in list(_RELAYS):
+            GPIO.setup(_DEVICE_PINS[relay], GPIO.OUT, initial=GPIO.HIGH)
 
         # Setup Pump Pins
         GPIO.setup(_PUMP_ENA_PIN, GPIO.OUT, initial=GPIO.LOW)
@@ -54,24 +83,78 @@ def setup_gpio():
         GPIO.setup(_PUMP_IN2_PIN, GPIO.OUT, initial=GPIO.LOW) # Keep IN2 low for forward
 
         # Setup Pump PWM
-        _pwm_pump = GPIO.PWM(_PUMP_ENA_PIN, _PWM_FREQUENCY)
+        try:
+            _pwm_pump = pwm.create_backend(pwm_backend, _PUMP_ENA_PIN, _PWM_FREQUENCY, gpio=GPIO)
+        except (registry.LibraryUnavailableError, RuntimeError, ValueError) as e: # ValueError: unknown backend name
+            if pwm_backend == pwm.BACKEND_SOFTWARE:
+                raise
+            logging.warning(f"PWM backend '{pwm_backend}' unavailable ({e}); using software PWM for the pump.")
+            _pwm_pump = pwm.create_backend(pwm.BACKEND_SOFTWARE, _PUMP_ENA_PIN, _PWM_FREQUENCY, gpio=GPIO)
         _pwm_pump.start(0) # Start with 0% duty cycle (off)
         _current_pump_speed = 0
         _device_states[PUMP] = 'off' # Ensure initial state reflects PWM
 
         logging.info("GPIO setup complete.")
         atexit.register(cleanup_gpio) # Register cleanup on exit
+        return True
 
     except Exception as e:
         logging.error(f"Error initializing GPIO: {e}")
-        # Consider raising the exception or handling it more robustly
-        raise # Re-raise the exception to indicate failure
+        return False
+
+def add_relay(device_name, pin):
+    """
+    Registers an additional relay (e.g. another chamber's heater) under a
+    device name, so set_device_state()/get_device_state() work for it.
+    Call before setup_gpio(); if GPIO is already set up, the pin is configured now.
+    """
+    if device_name in _DEVICE_PINS or device_name == PUMP:
+        raise ValueError(f"Device '{device_name}' already defined")
+    if pin in _DEVICE_PINS.values():
+        raise ValueError(f"GPIO pin {pin} already used by another device")
+    _DEVICE_PINS[device_name] = pin
+    _device_states[device_name] = 'off'
+    _RELAYS.append(device_name)
+    if GPIO is not None:
+        GPIO.setup(pin, GPIO.OUT, initial=GPIO.HIGH)
+
+def add_state_listener(callback):
+    """
+    Registers callback(device_name, state), called after each successful
+    set_device_state() and set_pump_speed() (with the pump's resulting state).
+    Runs on the caller's thread, so it must not block.
+    """
+    _state_listeners.append(callback)
+
+def add_transition_listener(callback):
+    """
+    Registers callback(transition), called with a Transition after each
+    set_device_state()/set_pump_speed() that changed a device's state or the
+    pump's duty cycle. Runs on the caller's thread, so it must not block.
+    """
+    _transition_listeners.append(callback)
+
+def _notify_state_change(device_name, state, old_state, duty=None, old_duty=None, source=SOURCE_SYSTEM):
+    for callback in _state_listeners:
+        try:
+            callback(device_name, state)
+        except Exception as e:
+            logging.error(f"State listener failed for {device_name}: {e}")
+    if state == old_state and duty == old_duty:
+        return # Re-asserted, not a transition
+    transition = Transition(device_name, old_state, state, duty, source)
+    for callback in _transition_listeners:
+        try:
+            callback(transition)
+        except Exception as e:
+            logging.error(f"Transition listener failed for {device_name}: {e}")
 
 # --- Control Functions ---
-def set_device_state(device_name, state):
+def set_device_state(device_name, state, source=SOURCE_SYSTEM):
     """
     Sets the state ('on' or 'off') for a specific device.
-    Handles relays and the pump motor.
+    Handles relays and the pump motor. `source` (one of SOURCES) says why,
+    for the transition listeners.
     """
     global _current_pump_speed, _device_states
 
@@ -79,8 +162,14 @@ def set_device_state(device_name, state):
         logging.error(f"Invalid device name: {device_name}")
         return False # Indicate failure
 
+    if GPIO is None:
+        logging.warning(f"GPIO unavailable. Cannot set {device_name} to {state}.")
+        return False
+
     pin = _DEVICE_PINS.get(device_name)
     desired_state_on = (state == 'on')
+    old_state = _device_states.get(device_name)
+    old_speed = _current_pump_speed
 
     try:
         if device_name == PUMP:
@@ -89,12 +178,12 @@ def set_device_state(device_name, state):
             GPIO.output(_PUMP_IN2_PIN, GPIO.LOW) # Keep IN2 low for forward
             # Set speed to 75% when turning on, 0% when turning off
             speed_to_set = 75 if desired_state_on else 0
-            _pwm_pump.ChangeDutyCycle(speed_to_set)
+            _pwm_pump.set_duty(speed_to_set)
             _current_pump_speed = speed_to_set
             _device_states[PUMP] = state
             logging.info(f"Pump set to {state} (Speed: {speed_to_set}%)")
 
-        elif device_name in [CO2_SOLENOID, ARGON_SOLENOID, ITO_HEATING]:
+        elif device_name in _RELAYS:
             # Control relays (LOW = ON, HIGH = OFF)
             gpio_state = GPIO.LOW if desired_state_on else GPIO.HIGH
             GPIO.output(pin, gpio_state)
@@ -104,15 +193,23 @@ def set_device_state(device_name, state):
             logging.warning(f"Device '{device_name}' not directly controllable via set_device_state (might be part of pump).")
             return False
 
+        if device_name == PUMP:
+            _notify_state_change(device_name, state, old_state, _current_pump_speed, old_speed, source)
+        else:
+            _notify_state_change(device_name, state, old_state, source=source)
         return True # Indicate success
 
     except Exception as e:
         logging.error(f"Error setting state for {device_name} to {state}: {e}")
         return False # Indicate failure
 
-def set_pump_speed(speed):
-    """Sets the pump speed (PWM duty cycle)."""
+def set_pump_speed(speed, source=SOURCE_SYSTEM):
+    """Sets the pump speed (PWM duty cycle). `source` as for set_device_state()."""
     global _current_pump_speed
+    if GPIO is None:
+        logging.warning(f"GPIO unavailable. Cannot set pump speed to {speed}%.")
+        return False
+
     try:
         speed = int(speed)
         if not (0 <= speed <= 100):
@@ -120,13 +217,15 @@ def set_pump_speed(speed):
 
         # Only change duty cycle if pump is intended to be 'on'
         if _device_states[PUMP] == 'on' or speed == 0:
-             _pwm_pump.ChangeDutyCycle(speed)
+             old_state, old_speed = _device_states[PUMP], _current_pump_speed
+             _pwm_pump.set_duty(speed)
              _current_pump_speed = speed
              logging.info(f"Pump speed set to {speed}%")
              # If speed is set to 0, update the state
              if speed == 0:
                  _device_states[PUMP] = 'off'
                  GPIO.output(_PUMP_IN1_PIN, GPIO.LOW) # Ensure direction pin is off
+             _notify_state_change(PUMP, _device_states[PUMP], old_state, speed, old_speed, source)
              return True
         else:
             logging.warning(f"Pump is currently off. Cannot set speed to {speed}%. Turn pump on first.")
@@ -150,10 +249,18 @@ def get_device_state(device_name):
     logging.warning(f"Could not get state for unknown device: {device_name}")
     return None # Or raise an error
 
+def get_device_pin(device_name):
+    """Gets the BCM pin of a relay device, or None if unknown."""
+    return _DEVICE_PINS.get(device_name)
+
 def get_pump_speed():
     """Gets the current pump speed (PWM duty cycle)."""
     return _current_pump_speed
 
+def get_pump_pwm_status():
+    """Returns the pump PWM backend's name, timing, pin, frequency and duty cycle, or None before setup."""
+    return _pwm_pump.status() if _pwm_pump else None
+
 def get_all_device_states():
     """Returns a dictionary of all tracked device states."""
     # Consider adding actual hardware reads here if necessary for robustness
@@ -163,6 +270,8 @@ def get_relay_states_for_ui():
      """Gets relay states suitable for UI (interpreting HIGH/LOW)."""
      # This reads the *actual* pin state, which might differ from tracked state briefly
      # during transitions or if external factors change it.
+     if GPIO is None:
+         return {name: registry.STATUS_UNAVAILABLE for name in (CO2_SOLENOID, ARGON_SOLENOID, ITO_HEATING)}
      return {
          CO2_SOLENOID: 'on' if GPIO.input(_DEVICE_PINS[CO2_SOLENOID]) == GPIO.LOW else 'off',
          ARGON_SOLENOID: 'on' if GPIO.input(_DEVICE_PINS[ARGON_SOLENOID]) == GPIO.LOW else 'off',
@@ -174,6 +283,8 @@ def get_relay_states_for_ui():
 def cleanup_gpio():
     """Cleans up GPIO resources and stops PWM."""
     global _pwm_pump
+    if GPIO is None:
+        return # Never initialized, nothing to release
     logging.info("Cleaning up GPIO resources...")
     if _pwm_pump:
         try:
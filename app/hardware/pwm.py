@@ -0,0 +1,150 @@
+import logging
+import time
+from abc import ABC, abstractmethod
+
+from app.hardware import registry
+
+# --- Constants ---
+BACKEND_SOFTWARE = 'software'   # RPi.GPIO.PWM: a C thread toggles the pin, so timing follows CPU load
+BACKEND_PIGPIO = 'pigpio'       # pigpiod: DMA-timed on any pin, the PWM peripheral on HARDWARE_PWM_PINS
+BACKEND_SIMULATED = 'simulated' # No pin: the output level is computed from the clock (tests, benchmarks)
+
+HARDWARE_PWM_PINS = (12, 13, 18, 19) # BCM pins wired to the PWM peripheral
+PIGPIO_RANGE = 1000 # DMA PWM steps per period (0.1% duty resolution)
+
+# --- Backends ---
+class PwmBackend(ABC):
+    """
+    One PWM output at a fixed frequency. Duty cycles are percentages
+    (0-100). read_level() returns the pin's current output level (0/1), or
+    None if the backend can't read it back.
+    """
+    name = None
+    timing = None # 'software', 'dma', 'hardware' or 'simulated'
+
+    def __init__(self, pin, frequency):
+        self.pin = pin
+        self.frequency = frequency
+        self.duty = 0.0
+
+    def start(self, duty=0.0):
+        self.set_duty(duty)
+
+    @abstractmethod
+    def set_duty(self, duty):
+        """Sets the duty cycle (%) and records it in self.duty."""
+
+    def stop(self):
+        pass
+
+    def read_level(self):
+        return None
+
+    def status(self):
+        return {'backend': self.name, 'timing': self.timing, 'pin': self.pin, 'frequency': self.frequency, 'duty': self.duty}
+
+class SoftwarePwm(PwmBackend):
+    """RPi.GPIO's software PWM. `gpio` is the RPi.GPIO module, with the pin already set up as an output."""
+    name = BACKEND_SOFTWARE
+    timing = 'software'
+
+    def __init__(self, pin, frequency, gpio=None):
+        super().__init__(pin, frequency)
+        self._gpio = gpio or registry.require_library('RPi.GPIO')
+        self._pwm = self._gpio.PWM(pin, frequency)
+
+    def start(self, duty=0.0):
+        self._pwm.start(duty)
+        self.duty = duty
+
+    def set_duty(self, duty):
+        self._pwm.ChangeDutyCycle(duty)
+        self.duty = duty
+
+    def stop(self):
+        self._pwm.stop()
+
+    def read_level(self):
+        return self._gpio.input(self.pin)
+
+class PigpioPwm(PwmBackend):
+    """
+    PWM generated by the pigpiod daemon: DMA-timed on any pin, or by the PWM
+    peripheral on HARDWARE_PWM_PINS. Neither uses a thread in this process,
+    so the output doesn't jitter with the server's CPU load. Raises
+    RuntimeError if pigpiod isn't running.
+    """
+    name = BACKEND_PIGPIO
+
+    def __init__(self, pin, frequency, gpio=None):
+        super().__init__(pin, frequency)
+        pigpio = registry.require_library('pigpio')
+        self._pi = pigpio.pi()
+        if not self._pi.connected:
+            raise RuntimeError("pigpiod is not running (start it with 'sudo pigpiod')")
+        self.timing = 'hardware' if pin in HARDWARE_PWM_PINS else 'dma'
+        self._pi.set_mode(pin, pigpio.OUTPUT)
+        if self.timing == 'dma':
+            self.frequency = self._pi.set_PWM_frequency(pin, frequency) # Nearest frequency the DMA sample rate allows
+            self._pi.set_PWM_range(pin, PIGPIO_RANGE)
+
+    def set_duty(self, duty):
+        if self.timing == 'hardware':
+            self._pi.hardware_PWM(self.pin, self.frequency, int(duty * 10000)) # Duty in millionths
+        else:
+            self._pi.set_PWM_dutycycle(self.pin, round(duty * PIGPIO_RANGE / 100))
+        self.duty = duty
+
+    def stop(self):
+        try:
+            self.set_duty(0)
+        finally:
+            self._pi.stop()
+
+    def read_level(self):
+        return self._pi.read(self.pin)
+
+class SimulatedPwm(PwmBackend):
+    """
+    An ideal PWM output without hardware: the level at any moment follows
+    from the duty cycle and the time since it was set. Records every duty
+    change as (monotonic time, duty) in `changes`.
+    """
+    name = BACKEND_SIMULATED
+    timing = 'simulated'
+
+    def __init__(self, pin, frequency, gpio=None):
+        super().__init__(pin, frequency)
+        self._period_start = time.monotonic()
+        self.changes = []
+
+    def set_duty(self, duty):
+        self._period_start = time.monotonic()
+        self.duty = duty
+        self.changes.append((self._period_start, duty))
+
+    def read_level(self):
+        phase = (time.monotonic() - self._period_start) * self.frequency % 1.0
+        return 1 if phase * 100 < self.duty else 0
+
+BACKENDS = {
+    BACKEND_SOFTWARE: SoftwarePwm,
+    BACKEND_PIGPIO: PigpioPwm,
+    BACKEND_SIMULATED: SimulatedPwm,
+}
+
+# --- Public Functions ---
+def create_backend(name, pin, frequency, gpio=None):
+    """
+    Creates and returns a backend by name (see BACKENDS). Raises ValueError
+    for an unknown name, registry.LibraryUnavailableError if its library is
+    missing.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown PWM backend '{name}'. Expected one of: {', '.join(BACKENDS)}")
+    backend = BACKENDS[name](pin, frequency, gpio=gpio)
+    logging.info(f"PWM on GPIO {pin}: {name} backend ({backend.timing} timing, {backend.frequency} Hz).")
+    return backend
+
+# Note: gpio_devices drives the pump's enable pin through a backend chosen by
+# Config.PUMP_PWM_BACKEND; app/simulation/pwm_benchmark.py compares them.
@@ -0,0 +1,282 @@
+import importlib
+import logging
+import threading
+import time
+
+from app.hardware import breaker
+
+# --- Constants ---
+# Device names (keys used by run.py and the services)
+DEVICE_GPIO = 'gpio'
+DEVICE_TEMPERATURE = 'temperature'
+DEVICE_HUMIDITY = 'humidity'
+DEVICE_OXYGEN = 'oxygen'
+DEVICE_DISPLAY = 'display'
+DEVICE_CO2 = 'co2'
+
+# Device status values (reported to the UI and the startup report)
+STATUS_PENDING = 'pending'           # Registered, init not attempted yet
+STATUS_INITIALIZING = 'initializing' # Init attempt in progress
+STATUS_READY = 'ready'               # Init succeeded
+STATUS_DEGRADED = 'degraded'         # Usable with reduced function (e.g. some channels missing)
+STATUS_FAILED = 'failed'             # Init failed, timed out or the device was lost; retried in the background
+STATUS_UNAVAILABLE = 'unavailable'   # Driver library missing, not retried
+USABLE_STATUSES = (STATUS_READY, STATUS_DEGRADED)
+
+DEFAULT_INIT_TIMEOUT = 5.0 # Seconds before an init attempt is reported as failed
+RETRY_MIN_INTERVAL = 2.0   # Seconds before the first retry of a failed device...
+RETRY_INTERVAL = 30.0      # ...doubling after each failed attempt, up to this
+SUPERVISE_INTERVAL = 0.5   # Seconds between timeout/retry checks
+
+# --- Exceptions ---
+class LibraryUnavailableError(RuntimeError):
+    """Raised by require_library() when a driver library cannot be loaded."""
+
+# --- State Variables ---
+_lock = threading.RLock()
+_libraries = {}     # Module name -> imported module (None if unavailable)
+_import_times = {}  # Module name -> import cost in seconds
+_import_errors = {} # Module name -> error message
+_devices = {}       # Device name -> state dict, see register_device()
+_supervisor_thread = None
+
+# --- Library Loading ---
+def load_library(module_name):
+    """
+    Imports a hardware driver library on first use and caches the result.
+    Returns the module, or None if it is missing or fails to load
+    (e.g. RPi.GPIO raises RuntimeError when not running on a Pi).
+    """
+    if module_name in _libraries:
+        return _libraries[module_name]
+
+    with _lock:
+        if module_name in _libraries: # Loaded by another thread meanwhile
+            return _libraries[module_name]
+
+        start_time = time.perf_counter()
+        try:
+            module = importlib.import_module(module_name)
+        except Exception as e:
+            logging.warning(f"Driver library '{module_name}' unavailable: {e}")
+            module = None
+            _import_errors[module_name] = str(e)
+        _import_times[module_name] = time.perf_counter() - start_time
+        _libraries[module_name] = module
+    return module
+
+def is_library_available(module_name):
+    """Returns True if the driver library can be imported."""
+    return load_library(module_name) is not None
+
+def require_library(module_name):
+    """Like load_library(), but raises LibraryUnavailableError if missing."""
+    module = load_library(module_name)
+    if module is None:
+        raise LibraryUnavailableError(f"Driver library '{module_name}' not available")
+    return module
+
+# --- Device Registration and Initialization ---
+def register_device(device_name, init_func, timeout=DEFAULT_INIT_TIMEOUT):
+    """
+    Registers a device and its init function.
+    The init function returns True (ready), False (failed) or STATUS_DEGRADED,
+    and may raise LibraryUnavailableError if its driver library is missing.
+    """
+    with _lock:
+        _devices[device_name] = {
+            'status': STATUS_PENDING,
+            'init_func': init_func,
+            'timeout': timeout,
+            'attempts': 0,
+            'in_progress': False,
+            'started_at': None,
+            'finished_at': None,
+            'init_time': None,
+            'error': None,
+            'retry_delay': RETRY_MIN_INTERVAL, # Seconds after a failed attempt before the next one
+            'losses': 0, # Times the device was lost after becoming usable
+        }
+
+def initialize_device(device_name):
+    """
+    Runs one init attempt for a registered device in the calling thread and
+    records its cost and resulting status. Exceptions are never propagated,
+    so a missing device never aborts startup. Returns the new status.
+    """
+    with _lock:
+        device = _devices[device_name]
+        if device['in_progress']:
+            return device['status'] # Another attempt is still running
+        device['in_progress'] = True
+        device['attempts'] += 1
+        device['status'] = STATUS_INITIALIZING
+        device['started_at'] = time.monotonic()
+        device['error'] = None
+
+    start_time = time.perf_counter()
+    error = None
+    try:
+        result = device['init_func']()
+        if result is True:
+            status = STATUS_READY
+        elif result == STATUS_DEGRADED:
+            status = STATUS_DEGRADED
+        else:
+            status = STATUS_FAILED
+    except LibraryUnavailableError as e:
+        logging.error(f"Device '{device_name}' unavailable: {e}")
+        status = STATUS_UNAVAILABLE
+        error = str(e)
+    except Exception as e:
+        logging.error(f"Error initializing device '{device_name}': {e}", exc_info=True)
+        status = STATUS_FAILED
+        error = str(e)
+
+    with _lock:
+        device['status'] = status
+        device['error'] = error or device['error']
+        device['init_time'] = time.perf_counter() - start_time
+        device['finished_at'] = time.monotonic()
+        device['in_progress'] = False
+        if status in USABLE_STATUSES:
+            device['retry_delay'] = RETRY_MIN_INTERVAL
+    logging.info(f"Device '{device_name}' {status} after {device['init_time']:.2f}s (attempt {device['attempts']}).")
+    if status in USABLE_STATUSES:
+        breaker.probe_now(device_name) # A re-initialized device is probed on its next read
+    return status
+
+def mark_lost(device_name, reason, retry_after=RETRY_MIN_INTERVAL):
+    """
+    Reports that a usable device stopped responding (its port vanished or its
+    reads keep failing). The device is marked failed, so services stop
+    sampling it, and the supervisor re-runs its init function in the
+    background after `retry_after` seconds. Returns True if the device was
+    usable until now; repeated reports are ignored.
+    """
+    with _lock:
+        device = _devices.get(device_name)
+        if device is None or device['status'] not in USABLE_STATUSES or device['in_progress']:
+            return False
+        device['status'] = STATUS_FAILED
+        device['error'] = reason
+        device['finished_at'] = time.monotonic()
+        device['retry_delay'] = max(RETRY_MIN_INTERVAL, retry_after)
+        device['losses'] += 1
+    logging.warning(f"Device '{device_name}' lost ({reason}). Re-initializing in {device['retry_delay']:.0f}s.")
+    return True
+
+def _start_attempt(device_name):
+    """Runs an init attempt for a device in its own daemon thread."""
+    threading.Thread(target=initialize_device, args=(device_name,), name=f"init-{device_name}", daemon=True).start()
+
+def _supervise_loop():
+    """
+    Enforces per-device init timeouts and retries failed devices, backing off
+    from RETRY_MIN_INTERVAL to RETRY_INTERVAL. Timed out attempts keep
+    running; if they eventually succeed the device becomes ready. Keeps
+    running once every device has settled, to re-initialize devices that are
+    lost later (see mark_lost()).
+    """
+    report_logged = False
+    settled_logged = False
+    while True:
+        now = time.monotonic()
+        pending = False
+        with _lock:
+            for name, device in _devices.items():
+                status = device['status']
+                if status == STATUS_INITIALIZING and now - device['started_at'] > device['timeout']:
+                    logging.warning(f"Device '{name}' init timed out after {device['timeout']}s. Continuing in background.")
+                    device['status'] = STATUS_FAILED
+                    device['error'] = f"init timed out after {device['timeout']}s"
+                elif status == STATUS_FAILED and not device['in_progress'] and now - device['finished_at'] >= device['retry_delay']:
+                    logging.info(f"Retrying init of device '{name}'...")
+                    device['status'] = STATUS_INITIALIZING
+                    device['started_at'] = now
+                    device['retry_delay'] = min(RETRY_INTERVAL, device['retry_delay'] * 2) # Used if this attempt fails too
+                    _start_attempt(name)
+                pending = pending or device['status'] in (STATUS_PENDING, STATUS_INITIALIZING, STATUS_FAILED)
+            first_pass_done = all(d['status'] != STATUS_INITIALIZING for d in _devices.values())
+
+        if first_pass_done and not report_logged:
+            log_startup_report()
+            report_logged = True
+        if pending:
+            settled_logged = False
+        elif not settled_logged:
+            logging.info("All hardware devices settled.")
+            settled_logged = True
+        time.sleep(SUPERVISE_INTERVAL)
+
+def start_initialization():
+    """
+    Starts init of all registered devices concurrently and returns immediately.
+    Services consult is_usable() and only sample devices that are ready.
+    """
+    global _supervisor_thread
+    with _lock:
+        for name, device in _devices.items():
+            if device['status'] == STATUS_PENDING:
+                device['status'] = STATUS_INITIALIZING
+                device['started_at'] = time.monotonic()
+                _start_attempt(name)
+        if _supervisor_thread is None or not _supervisor_thread.is_alive():
+            _supervisor_thread = threading.Thread(target=_supervise_loop, name="device-supervisor", daemon=True)
+            _supervisor_thread.start()
+
+# --- Status Queries ---
+def get_device_status(device_name):
+    """Returns the status string of a device (pending if never registered)."""
+    device = _devices.get(device_name)
+    return device['status'] if device else STATUS_PENDING
+
+def is_usable(device_name):
+    """Returns True if a device is ready or degraded and can be sampled."""
+    return get_device_status(device_name) in USABLE_STATUSES
+
+def get_all_device_statuses():
+    """Returns a dictionary of device name -> status."""
+    with _lock:
+        return {name: info['status'] for name, info in _devices.items()}
+
+# --- Startup Report ---
+def get_startup_report():
+    """Returns import and init cost per library/device (seconds)."""
+    with _lock:
+        return {
+            'libraries': [
+                {
+                    'name': name,
+                    'available': _libraries[name] is not None,
+                    'import_time': round(_import_times[name], 4),
+                    'error': _import_errors.get(name),
+                }
+                for name in _libraries
+            ],
+            'devices': [
+                {
+                    'name': name,
+                    'status': info['status'],
+                    'attempts': info['attempts'],
+                    'losses': info['losses'],
+                    'init_time': round(info['init_time'], 4) if info['init_time'] is not None else None,
+                    'error': info['error'],
+                }
+                for name, info in _devices.items()
+            ],
+        }
+
+def log_startup_report():
+    """Logs the startup timing report, one line per library and device."""
+    report = get_startup_report()
+    logging.info("Hardware startup report:")
+    for lib in report['libraries']:
+        state = 'ok' if lib['available'] else 'unavailable'
+        logging.info(f"  import {lib['name']:<24} {lib['import_time'] * 1000:8.1f} ms  {state}")
+    for dev in report['devices']:
+        init_ms = f"{dev['init_time'] * 1000:8.1f} ms" if dev['init_time'] is not None else "     --    "
+        logging.info(f"  init   {dev['name']:<24} {init_ms}  {dev['status']}")
+
+# Note: Hardware modules call load_library()/require_library() from their init
+# functions, so no driver library is imported until a device is initialized.
@@ -1,17 +1,11 @@
 import logging
-import board
-import busio
-import digitalio
-import adafruit_max31865
-import Adafruit_DHT
-# Assuming DFRobot_Oxygen.py is correctly placed relative to this file or installable
-# If DFRobot_Oxygen.py is in the app/ directory, the import should work.
-# If it's meant to be a library, it should be in requirements.txt
-try:
-    from app.DFRobot_Oxygen import DFRobot_Oxygen_IIC
-except ImportError:
-    logging.error("Failed to import DFRobot_Oxygen_IIC. Make sure DFRobot_Oxygen.py is in the 'app' directory or installed.")
-    DFRobot_Oxygen_IIC = None # Define as None if import fails
+import threading
+from app.hardware import registry
+
+# Driver libraries (board, busio, digitalio, adafruit_max31865, Adafruit_DHT and
+# the local DFRobot_Oxygen module) are loaded lazily through the hardware
+# registry in the initialize_*/open_* functions, so a missing library only disables the
+# affected sensor instead of preventing the app from starting.
 
 # --- Constants ---
 # Fallback values (used if sensor reading fails)
@@ -20,14 +14,14 @@ FALLBACK_HUMIDITY = -1.0    # Using a distinct value
 FALLBACK_OXYGEN = -1.0      # Using a distinct value
 
 # DHT Sensor Configuration
-DHT_SENSOR_TYPE = Adafruit_DHT.DHT22
+DHT_SENSOR_TYPE = 'DHT22' # Attribute name in Adafruit_DHT
 DHT_PIN = 4 # GPIO Pin (BCM numbering)
 
 # MAX31865 Configuration
 RTD_NOMINAL_RESISTANCE = 100.0
 RTD_REF_RESISTANCE = 430.0
-# Define CS pins for each MAX31865 sensor
-CS_PINS = [board.D5, board.D6, board.D13, board.D19, board.D26]
+# Define CS pins for each MAX31865 sensor (names of `board` pins, resolved at init)
+CS_PINS = ['D5', 'D6', 'D13', 'D19', 'D26']
 
 # DFRobot Oxygen Sensor Configuration
 OXYGEN_I2C_BUS = 1 # Raspberry Pi I2C bus 1
@@ -38,64 +32,137 @@ _spi = None
 _i2c = None
 _temp_sensors = [] # List to hold MAX31865 sensor objects
 _oxygen_sensor = None # Holds the DFRobot_Oxygen_IIC object
+_dht = None # Adafruit_DHT module, if available
+_spi_init_lock = threading.Lock() # Chambers may open probes on the shared bus concurrently
 
 # --- Initialization ---
-def initialize_sensors():
-    """Initializes all connected sensors (Temperature, Humidity, Oxygen)."""
-    global _spi, _i2c, _temp_sensors, _oxygen_sensor
-    logging.info("Initializing hardware sensors...")
+# Each sensor group is a separate device in the hardware registry so they can
+# be initialized concurrently and become ready independently. Each function
+# raises registry.LibraryUnavailableError if its driver library is missing.
+def initialize_temperature_sensors():
+    """
+    Initializes the SPI bus and the MAX31865 temperature sensors.
+    Returns True if all sensors are usable, STATUS_DEGRADED if only some are,
+    False if none are.
+    """
+    global _temp_sensors
+    logging.info("Initializing temperature sensors...")
+
+    # Build the new sensor list locally and publish it in one assignment, so
+    # readers never see a partially initialized list
+    temp_sensors = open_temperature_sensors(CS_PINS)
+    _temp_sensors = temp_sensors
+    return temperature_sensors_status(temp_sensors)
+
+def open_temperature_sensors(cs_pins):
+    """
+    Creates MAX31865 sensor objects for the given CS pins on the shared SPI
+    bus (opened on first use). Returns a list with None for sensors that
+    failed. Also used for the probes of additional chambers.
+    """
+    global _spi
+    board = registry.require_library('board')
+    busio = registry.require_library('busio')
+    digitalio = registry.require_library('digitalio')
+    adafruit_max31865 = registry.require_library('adafruit_max31865')
 
-    # Initialize SPI for Temperature Sensors
+    temp_sensors = []
     try:
-        _spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
-        _temp_sensors = [] # Clear previous instances if any
-        for cs_pin in CS_PINS:
+        with _spi_init_lock:
+            if _spi is None:
+                _spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
+        for cs_pin in cs_pins:
             try:
-                cs_digitalio = digitalio.DigitalInOut(cs_pin)
+                cs_digitalio = digitalio.DigitalInOut(getattr(board, cs_pin))
                 sensor = adafruit_max31865.MAX31865(
                     _spi,
                     cs_digitalio,
                     rtd_nominal=RTD_NOMINAL_RESISTANCE,
                     ref_resistor=RTD_REF_RESISTANCE
                 )
-                _temp_sensors.append(sensor)
+                temp_sensors.append(sensor)
                 logging.info(f"MAX31865 sensor on CS pin {cs_pin} initialized.")
             except Exception as e:
                  logging.error(f"Failed to initialize MAX31865 on CS pin {cs_pin}: {e}")
-                 _temp_sensors.append(None) # Add None as placeholder if init fails
+                 temp_sensors.append(None) # Add None as placeholder if init fails
 
     except Exception as e:
         logging.error(f"Failed to initialize SPI bus: {e}")
-        _spi = None # Ensure SPI is None if failed
-        _temp_sensors = [None] * len(CS_PINS) # Fill with None placeholders
+        temp_sensors = [None] * len(cs_pins) # Fill with None placeholders
+    return temp_sensors
 
-    # Initialize I2C for Oxygen Sensor (if library loaded)
-    if DFRobot_Oxygen_IIC:
-        try:
-            # Note: I2C is often initialized elsewhere too (e.g., for OLED).
-            # Consider passing an existing I2C bus object if available.
+def temperature_sensors_status(temp_sensors):
+    """True if all sensors are usable, STATUS_DEGRADED if only some are, False if none are."""
+    working = sum(1 for sensor in temp_sensors if sensor)
+    if temp_sensors and working == len(temp_sensors):
+        return True
+    return registry.STATUS_DEGRADED if working else False
+
+def initialize_oxygen_sensor():
+    """
+    Initializes the DFRobot oxygen sensor on I2C and performs a test read.
+    Also called to recover a lost sensor; the new sensor object replaces the
+    old one in a single assignment. Returns True on success, False on failure.
+    """
+    global _oxygen_sensor
+    logging.info("Initializing oxygen sensor...")
+    oxygen_sensor = open_oxygen_sensor(OXYGEN_I2C_ADDRESS)
+    if oxygen_sensor is None:
+        return False
+    old_sensor, _oxygen_sensor = _oxygen_sensor, oxygen_sensor
+    close_oxygen_sensor(old_sensor)
+    return True
+
+def open_oxygen_sensor(address):
+    """
+    Opens a DFRobot oxygen sensor at an I2C address and performs a test read.
+    Returns the sensor object, or None on failure.
+    """
+    global _i2c
+    board = registry.require_library('board')
+    busio = registry.require_library('busio')
+    oxygen_module = registry.require_library('app.DFRobot_Oxygen')
+    try:
+        # Note: I2C is often initialized elsewhere too (e.g., for OLED).
+        # Consider passing an existing I2C bus object if available.
+        if _i2c is None:
             _i2c = busio.I2C(board.SCL, board.SDA)
-            _oxygen_sensor = DFRobot_Oxygen_IIC(OXYGEN_I2C_BUS, OXYGEN_I2C_ADDRESS)
-            # Perform a basic check if possible (e.g., read data once)
-            _oxygen_sensor.get_oxygen_data(1) # Example check
-            logging.info(f"DFRobot Oxygen sensor on I2C bus {OXYGEN_I2C_BUS} address {OXYGEN_I2C_ADDRESS} initialized.")
+        oxygen_sensor = oxygen_module.DFRobot_Oxygen_IIC(OXYGEN_I2C_BUS, address)
+        # Perform a basic check if possible (e.g., read data once)
+        oxygen_sensor.get_oxygen_data(1) # Example check
+        logging.info(f"DFRobot Oxygen sensor on I2C bus {OXYGEN_I2C_BUS} address {address} initialized.")
+        return oxygen_sensor
+    except Exception as e:
+        logging.error(f"Failed to initialize DFRobot Oxygen sensor at address {address}: {e}")
+        # Don't reset _i2c here as it might be used by other devices (OLED)
+        return None
+
+def close_oxygen_sensor(oxygen_sensor):
+    """Closes the SMBus handle of a replaced oxygen sensor object, ignoring errors."""
+    bus = getattr(oxygen_sensor, 'i2cbus', None)
+    if bus is not None:
+        try:
+            bus.close()
         except Exception as e:
-            logging.error(f"Failed to initialize DFRobot Oxygen sensor: {e}")
-            _oxygen_sensor = None
-            # Don't reset _i2c here as it might be used by other devices (OLED)
-    else:
-        logging.warning("DFRobot_Oxygen_IIC library not available. Oxygen sensor disabled.")
-        _oxygen_sensor = None
+            logging.debug(f"Error closing oxygen sensor I2C handle: {e}")
 
-    # DHT sensor doesn't require explicit object initialization here,
-    # Adafruit_DHT.read_retry handles it.
-    logging.info("Sensor initialization complete.")
+def initialize_humidity_sensor():
+    """
+    Loads the DHT driver. The DHT sensor doesn't require explicit object
+    initialization, Adafruit_DHT.read_retry handles it. Returns True.
+    """
+    global _dht
+    _dht = registry.require_library('Adafruit_DHT')
+    return True
 
 # --- Reading Functions ---
-def read_temperatures():
-    """Reads temperature from all initialized MAX31865 sensors."""
+def read_temperatures(temp_sensors=None):
+    """
+    Reads temperature from all initialized MAX31865 sensors (default: the
+    main chamber's, or a list from open_temperature_sensors()).
+    """
     temperatures = []
-    for i, sensor in enumerate(_temp_sensors):
+    for i, sensor in enumerate(_temp_sensors if temp_sensors is None else temp_sensors):
         if sensor:
             try:
                 temp = sensor.temperature
@@ -109,11 +176,14 @@ def read_temperatures():
             temperatures.append(FALLBACK_TEMPERATURE)
     return temperatures
 
-def read_humidity():
-    """Reads humidity from the DHT22 sensor."""
+def read_humidity(pin=DHT_PIN):
+    """Reads humidity from the DHT22 sensor on `pin`."""
+    if not _dht:
+        return FALLBACK_HUMIDITY # Library unavailable
+
     try:
         # read_retry handles the communication and retries
-        humidity, temp_from_dht = Adafruit_DHT.read_retry(DHT_SENSOR_TYPE, DHT_PIN)
+        humidity, temp_from_dht = _dht.read_retry(getattr(_dht, DHT_SENSOR_TYPE), pin)
         if humidity is not None:
             # Add basic validation if needed (e.g., 0-100 range)
             return round(humidity, 2)
@@ -125,12 +195,16 @@ def read_humidity():
         logging.error(f"Error reading humidity from DHT sensor: {e}")
         return FALLBACK_HUMIDITY
 
-def read_oxygen():
-    """Reads oxygen concentration from the DFRobot Gravity Oxygen Sensor."""
-    if _oxygen_sensor:
+def read_oxygen(oxygen_sensor=None):
+    """
+    Reads oxygen concentration from the DFRobot Gravity Oxygen Sensor
+    (default: the main chamber's, or one from open_oxygen_sensor()).
+    """
+    oxygen_sensor = _oxygen_sensor if oxygen_sensor is None else oxygen_sensor
+    if oxygen_sensor:
         try:
             # The '1' likely refers to the number of samples or a mode
-            oxygen_value = _oxygen_sensor.get_oxygen_data(1)
+            oxygen_value = oxygen_sensor.get_oxygen_data(1)
             if oxygen_value is not None:
                  # Add basic validation if needed (e.g., 0-25% range typical)
                 return round(oxygen_value, 2)
@@ -145,4 +219,5 @@ def read_oxygen():
         # logging.debug("Oxygen sensor not available.") # Use debug level if frequent
         return FALLBACK_OXYGEN
 
-# Note: initialize_sensors() should be called once during application startup.
\ No newline at end of file
+# Note: The initialize_* functions are registered with the hardware registry in
+# run.py; additional chambers open their own sensors via the open_* functions.
\ No newline at end of file
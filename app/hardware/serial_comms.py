@@ -1,7 +1,11 @@
-import serial
 import time
 import logging
 import atexit
+from app.hardware import registry
+from app.hardware.breaker import DeviceLostError
+
+# pyserial is loaded lazily by initialize_co2_sensor()
+serial = None
 
 # --- Constants ---
 SERIAL_PORT = '/dev/serial0' # Default serial port on Raspberry Pi for GPIO pins
@@ -16,6 +20,7 @@ READ_COMMAND = b'Z 2\r\n' # Command to request a CO2 reading
 # --- State Variables ---
 _serial_connection = None
 _is_initialized = False
+_atexit_registered = False
 
 # --- Internal Functions ---
 def _process_co2_response(response_str):
@@ -55,64 +60,93 @@ def _process_co2_response(response_str):
         return FALLBACK_CO2_PERCENT
 
 # --- Public Functions ---
-def initialize_co2_sensor(port=SERIAL_PORT, baudrate=BAUDRATE, timeout=TIMEOUT):
+def open_co2_sensor(port, baudrate=BAUDRATE, timeout=TIMEOUT):
     """
-    Initializes the serial connection to the CO2 sensor.
-    Returns True on success, False on failure.
+    Opens a serial connection to a CO2 sensor and sends the init command.
+    Returns the connection, or None on failure. Raises
+    registry.LibraryUnavailableError if pyserial is not available. Also used
+    for the CO2 sensors of additional chambers.
     """
-    global _serial_connection, _is_initialized
-    if _is_initialized:
-        logging.warning("Serial CO2 sensor already initialized.")
-        return True
+    global serial
+    serial = registry.require_library('serial')
 
     logging.info(f"Initializing CO2 sensor on {port}...")
     try:
-        _serial_connection = serial.Serial(port, baudrate=baudrate, timeout=timeout)
+        connection = serial.Serial(port, baudrate=baudrate, timeout=timeout)
         # Wait briefly for the port to open
         time.sleep(1.5) # Increased sleep slightly
 
         # Send initialization command if required by the sensor
         if INIT_COMMAND:
-            _serial_connection.write(INIT_COMMAND)
+            connection.write(INIT_COMMAND)
             time.sleep(0.2) # Allow time for command processing
             # Optionally read and discard any response to the init command
-            _serial_connection.read(_serial_connection.in_waiting or 1)
+            connection.read(connection.in_waiting or 1)
 
-        _is_initialized = True
-        logging.info("CO2 sensor serial connection established.")
-        atexit.register(close_serial_port) # Ensure cleanup on exit
-        return True
+        logging.info(f"CO2 sensor serial connection on {port} established.")
+        return connection
     except serial.SerialException as e:
         logging.error(f"SerialException initializing CO2 sensor on {port}: {e}")
-        _serial_connection = None
-        _is_initialized = False
-        return False
+        return None
     except Exception as e:
-        logging.error(f"Unexpected error initializing CO2 sensor: {e}")
-        _serial_connection = None
-        _is_initialized = False
+        logging.error(f"Unexpected error initializing CO2 sensor on {port}: {e}")
+        return None
+
+def close_connection(connection):
+    """Closes a serial connection, ignoring errors (the port may already be gone)."""
+    try:
+        connection.close()
+    except Exception as e:
+        logging.debug(f"Error closing serial connection: {e}")
+
+def initialize_co2_sensor(port=SERIAL_PORT, baudrate=BAUDRATE, timeout=TIMEOUT):
+    """
+    Initializes the serial connection to the main CO2 sensor. Also called by
+    the hardware registry to recover a lost sensor: the port is reopened and
+    the new connection replaces the old one in a single assignment, so reads
+    never see a half-open port. Returns True on success, False on failure.
+    Raises registry.LibraryUnavailableError if pyserial is not available.
+    """
+    global _serial_connection, _is_initialized, _atexit_registered
+    connection = open_co2_sensor(port, baudrate, timeout)
+    if connection is None:
         return False
 
-def read_co2_value():
+    old_connection = _serial_connection
+    _serial_connection = connection
+    _is_initialized = True
+    if old_connection is not None:
+        close_connection(old_connection)
+    if not _atexit_registered:
+        atexit.register(close_serial_port) # Ensure cleanup on exit
+        _atexit_registered = True
+    return True
+
+def read_co2_value(connection=None):
     """
-    Reads the CO2 value from the serial sensor.
-    Returns the CO2 percentage or FALLBACK_CO2_PERCENT on failure.
+    Reads the CO2 value from the serial sensor (default: the main one, or a
+    connection from open_co2_sensor()).
+    Returns the CO2 percentage or FALLBACK_CO2_PERCENT on failure. Raises
+    DeviceLostError if the port has gone away (e.g. the USB adapter was
+    unplugged), so the device is re-initialized.
     """
-    if not _is_initialized or not _serial_connection:
-        logging.warning("CO2 sensor serial port not initialized.")
-        return FALLBACK_CO2_PERCENT
+    if connection is None:
+        if not _is_initialized or not _serial_connection:
+            logging.warning("CO2 sensor serial port not initialized.")
+            return FALLBACK_CO2_PERCENT
+        connection = _serial_connection
 
     try:
         # Clear input buffer before sending command
-        _serial_connection.reset_input_buffer()
+        connection.reset_input_buffer()
         # Send the command to request data
-        _serial_connection.write(READ_COMMAND)
+        connection.write(READ_COMMAND)
         # Wait for the sensor to respond
         time.sleep(0.2) # Adjust sleep time based on sensor response time
 
         # Read the response
-        if _serial_connection.in_waiting > 0:
-            response_bytes = _serial_connection.read(_serial_connection.in_waiting)
+        if connection.in_waiting > 0:
+            response_bytes = connection.read(connection.in_waiting)
             response_str = response_bytes.decode("utf-8", errors='ignore') # Decode safely
             return _process_co2_response(response_str)
         else:
@@ -120,9 +154,9 @@ def read_co2_value():
             return FALLBACK_CO2_PERCENT
 
     except serial.SerialException as e:
-        logging.error(f"SerialException reading CO2 sensor: {e}")
-        # Consider attempting to re-initialize or flag the connection as broken
-        return FALLBACK_CO2_PERCENT
+        raise DeviceLostError(f"SerialException reading CO2 sensor: {e}") from e
+    except OSError as e:
+        raise DeviceLostError(f"Error reading CO2 sensor: {e}") from e
     except Exception as e:
         logging.error(f"Unexpected error reading CO2 sensor: {e}")
         return FALLBACK_CO2_PERCENT
@@ -140,5 +174,6 @@ def close_serial_port():
     _serial_connection = None
     _is_initialized = False
 
-# Note: initialize_co2_sensor() should be called once during application startup.
-# atexit registration is handled within initialize_co2_sensor().
\ No newline at end of file
+# Note: initialize_co2_sensor() is called by the hardware registry at startup
+# and again whenever the sensor is lost. atexit registration is handled within
+# initialize_co2_sensor().
\ No newline at end of file
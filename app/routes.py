@@ -1,8 +1,26 @@
-from flask import Blueprint, render_template, redirect, url_for, request, flash
+from flask import Blueprint, render_template, redirect, url_for, request, flash, Response, stream_with_context
 from flask_login import login_required, current_user
 import logging
+import math
+import os
 from config import Config
 from app.hardware import gpio_devices as hw_gpio # Import the new hardware module
+from app.hardware import registry as hw_registry
+from app.hardware import breaker as hw_breaker
+from app.auth import require_scope
+from app.api_tokens import SCOPE_DEVICES_READ, SCOPE_DEVICES_WRITE, SCOPE_DATA_READ, SCOPE_SETTINGS_READ, SCOPE_SETTINGS_WRITE
+from app import settings
+from app.services import scheduler
+from app.services import export_service
+from app.services import chambers
+from app.services import telemetry_service
+from app.services import alarm_service
+from app.services import state_service
+from app.services import stream_service
+from app.services import broadcast_hub
+from app.services import sensor_service
+from app.services import analytics_service
+from app.services import actuator_journal
 
 # Configure logging (can be done once in run.py or app factory)
 # logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -16,6 +34,7 @@ main_blueprint = Blueprint('main', __name__)
 
 @main_blueprint.route('/toggle-device', methods=['POST'])
 @login_required
+@require_scope(SCOPE_DEVICES_WRITE)
 def toggle_device():
     """Toggle a device state using the hardware abstraction layer."""
     try:
@@ -27,7 +46,7 @@ def toggle_device():
              return {'error': "Invalid state. Must be 'on' or 'off'."}, 400
 
         # Use the hardware module function
-        success = hw_gpio.set_device_state(device_name, state)
+        success = hw_gpio.set_device_state(device_name, state, hw_gpio.SOURCE_MANUAL)
 
         if success:
             logging.info(f"API: Device '{device_name}' toggled to {state}")
@@ -36,7 +55,7 @@ def toggle_device():
             # The hardware module logs the specific error
             logging.error(f"API: Failed to toggle device '{device_name}' to {state}")
             # Check if the device name itself was invalid vs. a hardware issue
-            if device_name not in [hw_gpio.PUMP, hw_gpio.CO2_SOLENOID, hw_gpio.ARGON_SOLENOID, hw_gpio.ITO_HEATING]:
+            if device_name not in hw_gpio.get_all_device_states(): # Includes other chambers' relays
                  return {'error': f"Invalid device name: {device_name}"}, 400
             else:
                  return {'error': f"Failed to set state for device '{device_name}'"}, 500
@@ -48,6 +67,7 @@ def toggle_device():
 
 @main_blueprint.route('/set-device-speed', methods=['POST'])
 @login_required
+@require_scope(SCOPE_DEVICES_WRITE)
 def set_device_speed():
     """Set the speed for the pump."""
     try:
@@ -70,7 +90,7 @@ def set_device_speed():
              return {'error': f"Invalid speed value: {e}"}, 400
 
         # Use the hardware module function
-        success = hw_gpio.set_pump_speed(speed)
+        success = hw_gpio.set_pump_speed(speed, hw_gpio.SOURCE_MANUAL)
 
         if success:
             logging.info(f"API: Pump speed set to {speed}%")
@@ -89,6 +109,265 @@ def set_device_speed():
         return {'error': 'An internal server error occurred'}, 500
 
 
+@main_blueprint.route('/hardware-status', methods=['GET'])
+@login_required
+@require_scope(SCOPE_DEVICES_READ)
+def hardware_status():
+    """Report per-device status and circuit breakers, the startup timing report, background job timings and client feeds."""
+    return {
+        'devices': hw_registry.get_all_device_statuses(),
+        'breakers': hw_breaker.get_all_breaker_statuses(),
+        'startup': hw_registry.get_startup_report(),
+        'jobs': scheduler.get_job_stats(),
+        'broadcast': broadcast_hub.get_status(),
+        'streams': stream_service.get_status(),
+        'sampling': sensor_service.get_sampling_status(),
+        'pump_pwm': hw_gpio.get_pump_pwm_status(),
+        'actuator_journal': actuator_journal.get_status(),
+    }
+
+
+@main_blueprint.route('/api/telemetry', methods=['GET'])
+@login_required
+@require_scope(SCOPE_DEVICES_READ)
+def telemetry_status():
+    """Report the telemetry uplink's queue depth, last success and failure counters."""
+    return telemetry_service.get_status()
+
+
+@main_blueprint.route('/api/state', methods=['GET'])
+@login_required
+@require_scope(SCOPE_DEVICES_READ)
+def current_state():
+    """
+    Report actuator states, pump speed and each chamber's latest reading from
+    memory, with an ETag. Send If-None-Match to get 304 while nothing has
+    changed; add ?wait_for_change=<seconds> to hold the request until it does
+    (long-poll). ?sensors=0 leaves readings out, so only actuator changes count.
+    """
+    include_sensors = request.args.get('sensors', '1').lower() not in ('0', 'false', 'no')
+    try:
+        wait = float(request.args.get('wait_for_change', 0))
+    except ValueError:
+        wait = math.nan
+    if not math.isfinite(wait):
+        return {'error': "'wait_for_change' must be a number of seconds"}, 400
+    wait = min(max(wait, 0.0), Config.STATE_MAX_WAIT)
+
+    etag = state_service.current_etag(include_sensors)
+    if request.if_none_match.contains(etag):
+        if not (wait and state_service.wait_for_change(etag, include_sensors, wait)):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+    etag, body = state_service.get_state(include_sensors)
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _get_request_chamber():
+    """Resolves the optional 'chamber' query parameter (default: main). Returns None if unknown."""
+    return chambers.get_chamber(request.args.get('chamber', chambers.MAIN_CHAMBER))
+
+
+@main_blueprint.route('/api/chambers', methods=['GET'])
+@login_required
+@require_scope(SCOPE_DEVICES_READ)
+def list_chambers():
+    """Report each chamber's sensor/actuator mapping, device status and latest reading."""
+    return {'chambers': [chamber.describe() for chamber in chambers.get_chambers()]}
+
+
+@main_blueprint.route('/api/stream', methods=['GET'])
+@login_required
+@require_scope(SCOPE_DATA_READ)
+def event_stream():
+    """
+    Server-Sent Events stream of a chamber's samples (?chamber=, default main),
+    as 'update_dashboard' events with the same payload as the SocketIO feed.
+    Reconnecting clients send Last-Event-ID and get the samples they missed
+    that are still buffered.
+    """
+    chamber = _get_request_chamber()
+    if chamber is None or not stream_service.has_stream(chamber.name):
+        return {'error': f"Unknown chamber: {request.args.get('chamber')}"}, 404
+    last_event_id = stream_service.parse_event_id(request.headers.get('Last-Event-ID'))
+    return Response(
+        stream_service.stream_events(chamber.name, last_event_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'} # No proxy buffering of the stream
+    )
+
+
+@main_blueprint.route('/api/export', methods=['GET'])
+@login_required
+@require_scope(SCOPE_DATA_READ)
+def export_data():
+    """
+    Stream a time range and channel subset of the sensor log.
+    Query params: start, end (unix seconds), channels (comma-separated),
+    format (csv, ndjson, arrow, parquet), gzip (1/true), chamber (default main).
+    """
+    chamber = _get_request_chamber()
+    if chamber is None:
+        return {'error': f"Unknown chamber: {request.args['chamber']}"}, 404
+    try:
+        start_time = float(request.args['start']) if 'start' in request.args else None
+        end_time = float(request.args['end']) if 'end' in request.args else None
+    except ValueError:
+        return {'error': "'start' and 'end' must be unix timestamps"}, 400
+    channels = [name for name in request.args.get('channels', '').split(',') if name]
+    export_format = request.args.get('format', export_service.FORMAT_CSV)
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+    try:
+        chunks = export_service.stream_export(start_time, end_time, channels, export_format, compress, path=chamber.log_file)
+    except export_service.ExportError as e:
+        return {'error': str(e)}, 400
+
+    filename = os.path.splitext(os.path.basename(chamber.log_file))[0] + f".{export_format}" + ('.gz' if compress else '')
+    return Response(
+        stream_with_context(chunks),
+        mimetype='application/gzip' if compress else export_service.MIMETYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+
+@main_blueprint.route('/api/settings', methods=['GET'])
+@login_required
+@require_scope(SCOPE_SETTINGS_READ)
+def get_settings():
+    """Return a chamber's current settings snapshot (?chamber=, default main) and the editable ranges."""
+    chamber = _get_request_chamber()
+    if chamber is None:
+        return {'error': f"Unknown chamber: {request.args['chamber']}"}, 404
+    return {
+        'settings': settings.as_dict(settings.current(chamber.name)),
+        'fields': {name: {'default': spec[0], 'min': spec[1], 'max': spec[2]} for name, spec in settings.FIELDS.items()},
+    }
+
+
+@main_blueprint.route('/api/settings', methods=['PATCH'])
+@login_required
+@require_scope(SCOPE_SETTINGS_WRITE)
+def update_settings():
+    """
+    Change one or more settings, e.g. {"co2_threshold": 4.5}. Applied by the
+    control loops on their next cycle. Include "version" to reject the edit
+    (409) if someone else saved since that version was read. ?chamber=
+    selects the chamber (default main).
+    """
+    chamber = _get_request_chamber()
+    if chamber is None:
+        return {'error': f"Unknown chamber: {request.args['chamber']}"}, 404
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return {'error': 'Expected a JSON object of settings'}, 400
+    expected_version = data.pop('version', None)
+    if not data:
+        return {'error': 'No settings given'}, 400
+
+    try:
+        snapshot = settings.update(data, username=current_user.id, expected_version=expected_version, chamber=chamber.name)
+    except settings.SettingsConflictError as e:
+        return {'error': str(e), 'settings': settings.as_dict(settings.current(chamber.name))}, 409
+    except settings.SettingsError as e:
+        return {'error': str(e)}, 400
+    logging.info(f"API: Settings version {snapshot.version} for chamber '{chamber.name}' saved by '{current_user.id}'")
+    return {'settings': settings.as_dict(snapshot)}
+
+
+@main_blueprint.route('/api/settings/history', methods=['GET'])
+@login_required
+@require_scope(SCOPE_SETTINGS_READ)
+def settings_history():
+    """Return a chamber's most recent saved settings versions, newest first."""
+    chamber = _get_request_chamber()
+    if chamber is None:
+        return {'error': f"Unknown chamber: {request.args['chamber']}"}, 404
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+    except ValueError:
+        return {'error': "'limit' must be an integer"}, 400
+    return {'versions': settings.history(chamber.name, limit)}
+
+
+@main_blueprint.route('/api/stats', methods=['GET'])
+@login_required
+@require_scope(SCOPE_DATA_READ)
+def rolling_stats():
+    """Return a chamber's rolling mean/variance/min/max/slope per channel and window (?chamber=, default main)."""
+    chamber = _get_request_chamber()
+    if chamber is None:
+        return {'error': f"Unknown chamber: {request.args['chamber']}"}, 404
+    return {'timestamp': chamber.latest_data.get('timestamp'), 'stats': chambers.stats_as_dict(chamber.stats)}
+
+
+@main_blueprint.route('/api/alarms', methods=['GET'])
+@login_required
+@require_scope(SCOPE_DATA_READ)
+def list_alarms():
+    """Return the active alarms and the most recent raised/cleared transitions (all chambers, or ?chamber=)."""
+    chamber_name = request.args.get('chamber')
+    if chamber_name is not None and chambers.get_chamber(chamber_name) is None:
+        return {'error': f"Unknown chamber: {chamber_name}"}, 404
+    try:
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+    except ValueError:
+        return {'error': "'limit' must be an integer"}, 400
+    return {
+        'active': alarm_service.get_active_alarms(chamber_name),
+        'history': alarm_service.get_history(chamber_name, limit),
+    }
+
+
+@main_blueprint.route('/api/actuator-events', methods=['GET'])
+@login_required
+@require_scope(SCOPE_DEVICES_READ)
+def actuator_events():
+    """
+    Return journaled actuator transitions (time, device, old/new state, pump
+    duty, source), oldest first. Query params: start, end (unix seconds),
+    device (gpio device name, e.g. 'ito-heating' or 'b:co2-solenoid'), limit.
+    """
+    try:
+        start_time = float(request.args['start']) if 'start' in request.args else None
+        end_time = float(request.args['end']) if 'end' in request.args else None
+    except ValueError:
+        return {'error': "'start' and 'end' must be unix timestamps"}, 400
+    try:
+        limit = min(max(int(request.args.get('limit', 1000)), 1), 10000)
+    except ValueError:
+        return {'error': "'limit' must be an integer"}, 400
+    return {'events': actuator_journal.get_events(start_time, end_time, request.args.get('device'), limit)}
+
+
+@main_blueprint.route('/api/analytics', methods=['GET'])
+@login_required
+@require_scope(SCOPE_DATA_READ)
+def control_analytics():
+    """
+    Return a chamber's control KPIs (temperature time-in-band, heater duty
+    cycle, CO2 dosing) for the whole range and per interval.
+    Query params: start, end (unix seconds, default the last hour), interval
+    (seconds), low, high (temperature band, default the chamber's bounds),
+    chamber (default main).
+    """
+    chamber = _get_request_chamber()
+    if chamber is None:
+        return {'error': f"Unknown chamber: {request.args['chamber']}"}, 404
+    try:
+        params = {name: float(request.args[name]) for name in ('start', 'end', 'interval', 'low', 'high') if name in request.args}
+    except ValueError:
+        return {'error': "'start', 'end', 'interval', 'low' and 'high' must be numbers"}, 400
+    try:
+        return analytics_service.compute_kpis(chamber, **params)
+    except analytics_service.AnalyticsError as e:
+        return {'error': str(e)}, 400
+
+
 @main_blueprint.route('/')
 @login_required
 def index():
@@ -108,7 +387,7 @@ def dashboard():
 @main_blueprint.route('/setup', methods=['GET']) # Only handle GET requests now
 @login_required
 def setup():
-    """Display the setup page with current thresholds from config and device states."""
+    """Display the setup page with the current thresholds and device states."""
 
     # Get current device states from the hardware layer
     try:
@@ -133,12 +412,13 @@ def setup():
         device_states = { hw_gpio.PUMP: 'error', 'pump_speed': 'error' }
 
 
-    # Fetch thresholds from Config object
+    # Fetch thresholds from the current settings snapshot
+    snapshot = settings.current()
     thresholds = {
-        "co2_threshold": Config.CO2_THRESHOLD,
-        "o2_threshold": Config.O2_THRESHOLD, # Note: O2 control not implemented yet
-        "temp_lower_bound": Config.TEMP_LOWER_BOUND,
-        "temp_upper_bound": Config.TEMP_UPPER_BOUND,
+        "co2_threshold": snapshot.co2_threshold,
+        "o2_threshold": snapshot.o2_threshold, # Note: O2 control not implemented yet
+        "temp_lower_bound": snapshot.temp_lower_bound,
+        "temp_upper_bound": snapshot.temp_upper_bound,
         # Add other relevant config values if needed by the template
     }
 
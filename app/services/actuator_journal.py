@@ -0,0 +1,260 @@
+import bisect
+import logging
+import math
+import os
+import struct
+import threading
+from array import array
+from collections import namedtuple
+
+from config import Config
+from app.hardware import gpio_devices as hw_gpio
+from app.utils import clock
+
+# --- Constants ---
+# One fixed-size record per actuator transition (little-endian): wall-clock
+# time (s), pump duty (%, NaN for relays), device id, old state, new state,
+# source. Device ids index the names in the journal's .devices file.
+_RECORD = struct.Struct('<dfHBBB')
+RECORD_SIZE = _RECORD.size # 17 bytes
+INDEX_STRIDE = 256  # Records per sparse time index entry
+READ_RECORDS = 4096 # Records read per file read when scanning a range
+DEVICES_SUFFIX = '.devices'
+
+_STATES = ('off', 'on')
+_STATE_CODES = {state: code for code, state in enumerate(_STATES)}
+_UNKNOWN = 255 # State/source code for values outside the tables
+_SOURCE_CODES = {source: code for code, source in enumerate(hw_gpio.SOURCES)}
+
+Event = namedtuple('Event', ['time', 'device', 'old_state', 'new_state', 'duty', 'source'])
+
+# --- Journal ---
+class ActuatorJournal:
+    """
+    Append-only file of actuator transitions in time order. Appending is one
+    os.write() of a fixed-size record; a sparse in-memory index holds the
+    time of every INDEX_STRIDE-th record, so a range query bisects the index
+    and reads only the records from the block holding its start onwards.
+    Times are kept non-decreasing, which the index relies on: after the wall
+    clock steps back (e.g. NTP correcting an RTC-less Pi), records are
+    stamped with the last recorded time until the clock catches up, and the
+    step is logged.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fd = None
+        self._devices = []    # Device id -> name
+        self._device_ids = {} # Name -> device id
+        self._index = array('d') # Time of records 0, INDEX_STRIDE, 2 * INDEX_STRIDE, ...
+        self._count = 0
+        self._last_time = -math.inf
+        self._clamped = False # Stamping at _last_time since the wall clock stepped back
+
+    def open(self):
+        """Opens (or creates) the journal, dropping a partial last record, and builds the index."""
+        if os.path.exists(self.path + DEVICES_SUFFIX):
+            with open(self.path + DEVICES_SUFFIX, encoding='utf-8') as file:
+                self._devices = file.read().splitlines()
+            self._device_ids = {name: device_id for device_id, name in enumerate(self._devices)}
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        size = os.path.getsize(self.path)
+        if size % RECORD_SIZE:
+            logging.warning(f"Actuator journal '{self.path}': dropping a partial last record ({size % RECORD_SIZE} bytes).")
+            size -= size % RECORD_SIZE
+            os.truncate(self.path, size)
+        self._count = size // RECORD_SIZE
+        with open(self.path, 'rb') as file:
+            for position in range(0, self._count, INDEX_STRIDE):
+                file.seek(position * RECORD_SIZE)
+                self._index.append(_RECORD.unpack(file.read(RECORD_SIZE))[0])
+            if self._count:
+                file.seek((self._count - 1) * RECORD_SIZE)
+                self._last_time = _RECORD.unpack(file.read(RECORD_SIZE))[0]
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def _device_id(self, name):
+        """Returns a device's id, adding new names to the .devices file. Call with the lock held."""
+        device_id = self._device_ids.get(name)
+        if device_id is None:
+            device_id = len(self._devices)
+            with open(self.path + DEVICES_SUFFIX, 'a', encoding='utf-8') as file:
+                file.write(name + '\n')
+            self._devices.append(name)
+            self._device_ids[name] = device_id
+        return device_id
+
+    def append(self, transition, timestamp):
+        """Records a gpio_devices.Transition at wall-clock `timestamp` (seconds)."""
+        with self._lock:
+            if self._fd is None:
+                return
+            if timestamp < self._last_time:
+                if not self._clamped:
+                    logging.warning(f"Actuator journal: wall clock stepped back {self._last_time - timestamp:.3f}s; "
+                                    f"stamping events at {self._last_time:.3f} until it catches up.")
+                    self._clamped = True
+                timestamp = self._last_time # Keep time order for the index
+            elif self._clamped:
+                logging.info("Actuator journal: wall clock caught up; event times are exact again.")
+                self._clamped = False
+            os.write(self._fd, _RECORD.pack(
+                timestamp,
+                math.nan if transition.duty is None else transition.duty,
+                self._device_id(transition.device),
+                _STATE_CODES.get(transition.old_state, _UNKNOWN),
+                _STATE_CODES.get(transition.new_state, _UNKNOWN),
+                _SOURCE_CODES.get(transition.source, _UNKNOWN),
+            ))
+            if self._count % INDEX_STRIDE == 0:
+                self._index.append(timestamp)
+            self._count += 1
+            self._last_time = timestamp
+
+    def _decode(self, record, devices):
+        timestamp, duty, device_id, old_state, new_state, source = record
+        return Event(
+            timestamp,
+            devices[device_id] if device_id < len(devices) else None,
+            _STATES[old_state] if old_state < len(_STATES) else None,
+            _STATES[new_state] if new_state < len(_STATES) else None,
+            None if duty != duty else round(duty, 2), # NaN: a relay
+            hw_gpio.SOURCES[source] if source < len(hw_gpio.SOURCES) else None,
+        )
+
+    def query(self, start=None, end=None, device=None, limit=None):
+        """
+        Returns the Events in [start, end] (wall-clock seconds, either may be
+        None), oldest first, optionally for one device name and at most
+        `limit` of them.
+        """
+        with self._lock:
+            count = self._count
+            devices = list(self._devices)
+            block = max(bisect.bisect_left(self._index, start) - 1, 0) if start is not None else 0
+        if device is not None and device not in devices:
+            return []
+        device_id = None if device is None else devices.index(device)
+        events = []
+        with open(self.path, 'rb') as file:
+            position = block * INDEX_STRIDE
+            file.seek(position * RECORD_SIZE)
+            while position < count:
+                size = min(READ_RECORDS, count - position)
+                for record in _RECORD.iter_unpack(file.read(size * RECORD_SIZE)):
+                    if start is not None and record[0] < start:
+                        continue
+                    if end is not None and record[0] > end:
+                        return events
+                    if device_id is None or record[2] == device_id:
+                        events.append(self._decode(record, devices))
+                        if limit is not None and len(events) >= limit:
+                            return events
+                position += size
+        return events
+
+    def last_before(self, timestamp, device):
+        """
+        Returns a device's last Event before `timestamp`, or None. Scans the
+        index blocks before it backwards, newest first.
+        """
+        with self._lock:
+            count = self._count
+            devices = list(self._devices)
+            block = bisect.bisect_left(self._index, timestamp) # Blocks [0, block) start before timestamp
+        if device not in devices:
+            return None
+        device_id = devices.index(device)
+        with open(self.path, 'rb') as file:
+            for first in range((block - 1) * INDEX_STRIDE, -1, -INDEX_STRIDE):
+                file.seek(first * RECORD_SIZE)
+                records = list(_RECORD.iter_unpack(file.read(min(INDEX_STRIDE, count - first) * RECORD_SIZE)))
+                for record in reversed(records):
+                    if record[0] < timestamp and record[2] == device_id:
+                        return self._decode(record, devices)
+        return None
+
+    def first_time(self):
+        """Returns the time of the oldest record, or None while the journal is empty."""
+        with self._lock:
+            return self._index[0] if self._index else None
+
+    def status(self):
+        with self._lock:
+            return {
+                'path': self.path,
+                'events': self._count,
+                'bytes': self._count * RECORD_SIZE,
+                'devices': len(self._devices),
+                'index_entries': len(self._index),
+                'last_event': None if self._count == 0 else self._last_time,
+            }
+
+# --- State Variables ---
+_journal = None
+
+# --- Private Functions ---
+def _on_transition(transition):
+    """gpio_devices transition listener: journals the change, stamped from the monotonic clock."""
+    try:
+        _journal.append(transition, clock.to_wall(clock.monotonic_ns()))
+    except OSError as e:
+        logging.error(f"Actuator journal write failed for {transition.device}: {e}")
+
+# --- Public Service Functions ---
+def get_events(start=None, end=None, device=None, limit=None):
+    """Returns the journaled transitions in [start, end] as dicts, oldest first (empty before start)."""
+    if _journal is None:
+        return []
+    return [event._asdict() for event in _journal.query(start, end, device, limit)]
+
+def state_history(device_name, start, end):
+    """
+    Returns (since, opening_state, times, states) for a device over
+    [start, end]: the time the journal begins, its state ('on' = 1, else 0)
+    at max(start, since), and the times (array('d')) and new states
+    (bytearray) of its transitions in the range. The opening state is the
+    first transition's old state, else the new state of the last one before
+    the range; a device never journaled is taken as off (its state at
+    startup). None while nothing is journaled.
+    """
+    since = _journal.first_time() if _journal is not None else None
+    if since is None:
+        return None
+    events = _journal.query(start, end, device_name)
+    if events:
+        opening = events[0].old_state
+    else:
+        previous = _journal.last_before(start, device_name)
+        opening = previous.new_state if previous else 'off'
+    return (
+        since,
+        1 if opening == 'on' else 0,
+        array('d', [event.time for event in events]),
+        bytearray(1 if event.new_state == 'on' else 0 for event in events),
+    )
+
+def get_status():
+    """Returns the journal's path, size and index size, or None if it isn't running."""
+    return _journal.status() if _journal is not None else None
+
+def start_actuator_journal(path=None):
+    """Opens the journal (default Config.ACTUATOR_JOURNAL_PATH) and starts recording transitions."""
+    global _journal
+    journal = ActuatorJournal(path or Config.ACTUATOR_JOURNAL_PATH)
+    journal.open()
+    _journal = journal
+    hw_gpio.add_transition_listener(_on_transition)
+    logging.info(f"Actuator journal started ({journal.path}, {journal.status()['events']} events).")
+
+def stop_actuator_journal():
+    if _journal is not None:
+        _journal.close()
+
+# Note: start_actuator_journal() should be called during application startup,
+# before the control loops can switch anything.
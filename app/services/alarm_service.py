@@ -0,0 +1,261 @@
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+
+from config import Config
+from app import settings
+from app import database
+from app import socketio
+from app.services import chambers
+from app.services import scheduler
+from app.services import sensor_service
+
+# --- Constants ---
+CHECK_JOB_NAME = 'alarm-check'
+CHECK_INTERVAL = 1.0 # Seconds between staleness checks (samples are evaluated as they arrive)
+
+SEVERITY_WARNING = 'warning'
+SEVERITY_CRITICAL = 'critical'
+SEVERITIES = (SEVERITY_WARNING, SEVERITY_CRITICAL)
+STATE_RAISED = 'raised'
+STATE_CLEARED = 'cleared'
+
+# --- Rules ---
+# A rule is fed one channel value per sample (None when the sensor reported
+# its fallback value) and says whether its alarm condition holds. Each update
+# is O(1) (amortized for the rate window), keeping only incremental state.
+class Rule(ABC):
+    """
+    Base class. With `relative_to` (a settings field, e.g. 'co2_threshold'),
+    the rule's limits are offsets from that chamber's current setting.
+    """
+    def __init__(self, name, channel, severity=SEVERITY_WARNING, relative_to=None):
+        if channel not in chambers.CHANNELS:
+            raise ValueError(f"Rule '{name}': unknown channel '{channel}'")
+        if severity not in SEVERITIES:
+            raise ValueError(f"Rule '{name}': unknown severity '{severity}'")
+        if relative_to is not None and relative_to not in settings.FIELDS:
+            raise ValueError(f"Rule '{name}': unknown setting '{relative_to}'")
+        self.name = name
+        self.channel = channel
+        self.severity = severity
+        self.relative_to = relative_to
+        self.active = False
+        self.detail = '' # Why the condition holds, set when it does
+
+    def _limit(self, offset, snapshot):
+        if offset is None or self.relative_to is None:
+            return offset
+        return getattr(snapshot, self.relative_to) + offset
+
+    def _out_of_range(self, value, low, high, margin):
+        """True if value is outside [low + margin, high - margin] (margin > 0 narrows the band for clearing)."""
+        if high is not None and value > high - margin:
+            self.detail = f"{self.channel} {value} above {high}"
+            return True
+        if low is not None and value < low + margin:
+            self.detail = f"{self.channel} {value} below {low}"
+            return True
+        return False
+
+    @abstractmethod
+    def update(self, timestamp, value, snapshot):
+        """Feeds one sample. Returns whether the alarm condition holds."""
+
+    def check(self, now):
+        """Re-evaluates without a new sample (staleness). Returns whether the condition holds."""
+        return self.active
+
+class ThresholdRule(Rule):
+    """Raised when the value leaves [low, high]; cleared once it is `hysteresis` back inside."""
+    def __init__(self, name, channel, high=None, low=None, hysteresis=0.0, **kwargs):
+        super().__init__(name, channel, **kwargs)
+        self.high = high
+        self.low = low
+        self.hysteresis = hysteresis
+
+    def update(self, timestamp, value, snapshot):
+        if value is None:
+            return self.active # Dropouts are the staleness rules' business
+        margin = self.hysteresis if self.active else 0.0
+        return self._out_of_range(value, self._limit(self.low, snapshot), self._limit(self.high, snapshot), margin)
+
+class SustainedRule(ThresholdRule):
+    """Raised when the value has stayed outside [low, high] for `duration` seconds."""
+    def __init__(self, name, channel, duration, **kwargs):
+        super().__init__(name, channel, **kwargs)
+        self.duration = duration
+        self._since = None # Timestamp the value left the band
+
+    def update(self, timestamp, value, snapshot):
+        if value is None:
+            return self.active
+        if not super().update(timestamp, value, snapshot):
+            self._since = None
+            return False
+        if self._since is None:
+            self._since = timestamp
+        if timestamp - self._since < self.duration:
+            return self.active # Not yet (or still, while the value stays out)
+        self.detail += f" for {timestamp - self._since:.0f}s"
+        return True
+
+class RateOfChangeRule(Rule):
+    """
+    Raised when the value changes faster than `max_rate` units per minute,
+    measured across the last `window` seconds.
+    """
+    def __init__(self, name, channel, max_rate, window=60.0, hysteresis=0.0, **kwargs):
+        super().__init__(name, channel, **kwargs)
+        self.max_rate = max_rate
+        self.window = window
+        self.hysteresis = hysteresis
+        self._samples = deque() # (timestamp, value) within the window; each sample enters and leaves once
+
+    def update(self, timestamp, value, snapshot):
+        if value is None:
+            return self.active
+        samples = self._samples
+        samples.append((timestamp, value))
+        while timestamp - samples[0][0] > self.window:
+            samples.popleft()
+        first_time, first_value = samples[0]
+        if timestamp - first_time < self.window / 2:
+            return self.active # Too short a span to judge
+        rate = (value - first_value) / (timestamp - first_time) * 60
+        limit = self.max_rate - (self.hysteresis if self.active else 0.0)
+        if abs(rate) > limit:
+            self.detail = f"{self.channel} changing {rate:+.2f}/min (limit {self.max_rate})"
+            return True
+        return False
+
+class StaleRule(Rule):
+    """Raised when the channel has had no valid reading for `max_age` seconds."""
+    def __init__(self, name, channel, max_age, **kwargs):
+        super().__init__(name, channel, **kwargs)
+        self.max_age = max_age
+        self._last_valid = time.time() # Grace period from startup
+
+    def update(self, timestamp, value, snapshot):
+        if value is not None:
+            self._last_valid = timestamp
+        return self.check(timestamp)
+
+    def check(self, now):
+        age = now - self._last_valid
+        if age > self.max_age:
+            self.detail = f"no valid {self.channel} reading for {age:.0f}s"
+            return True
+        return False
+
+RULE_TYPES = {
+    'threshold': ThresholdRule,
+    'sustained': SustainedRule,
+    'rate': RateOfChangeRule,
+    'stale': StaleRule,
+}
+
+def create_rule(definition):
+    """Builds a rule from a Config.ALARM_RULES entry ({'name', 'type', 'channel', ...})."""
+    definition = dict(definition)
+    rule_type = definition.pop('type')
+    if rule_type not in RULE_TYPES:
+        raise ValueError(f"Rule '{definition.get('name')}': unknown type '{rule_type}'")
+    return RULE_TYPES[rule_type](**definition)
+
+# --- State Variables ---
+_lock = threading.Lock()
+_rules = {}  # Chamber name -> list of rules (each chamber has its own rule state)
+_active = {} # (chamber name, rule name) -> the event that raised it
+
+# --- Private Functions ---
+def _evaluate(chamber, data=None, now=None):
+    """Runs a chamber's rules on a sample (or a staleness check at `now`). Returns the transitions."""
+    events = []
+    snapshot = settings.current(chamber.name)
+    values = chamber.channel_values(data) if data is not None else None
+    with _lock:
+        for rule in _rules.get(chamber.name, ()):
+            if data is not None:
+                value = values.get(rule.channel)
+                active = rule.update(chamber.channel_time(data, rule.channel), value, snapshot)
+            else:
+                value = None
+                active = rule.check(now)
+            if active == rule.active:
+                continue
+            rule.active = active
+            event = {
+                'chamber': chamber.name,
+                'rule': rule.name,
+                'channel': rule.channel,
+                'severity': rule.severity,
+                'state': STATE_RAISED if active else STATE_CLEARED,
+                'value': value,
+                'message': rule.detail if active else f"{rule.name} cleared",
+                'timestamp': data['timestamp'] if data is not None else now,
+            }
+            if active:
+                _active[(chamber.name, rule.name)] = event
+            else:
+                _active.pop((chamber.name, rule.name), None)
+            events.append(event)
+    return events
+
+def _publish(events):
+    """Pushes alarm transitions to clients and stores them."""
+    for event in events:
+        log = logging.warning if event['state'] == STATE_RAISED else logging.info
+        log(f"Alarm {event['state']}: [{event['chamber']}] {event['rule']} ({event['severity']}): {event['message']}")
+        socketio.emit('alarm', event)
+    try:
+        scheduler.run_blocking(database.add_alarm_events, events)
+    except Exception as e:
+        logging.error(f"Failed to store alarm events: {e}")
+
+def _on_sample(chamber, data):
+    """sensor_service sample listener."""
+    events = _evaluate(chamber, data)
+    if events:
+        _publish(events)
+
+def _check_job():
+    """Periodic staleness check, so a sensor job that stops producing samples still raises."""
+    now = time.time()
+    events = []
+    for chamber in chambers.get_chambers():
+        events.extend(_evaluate(chamber, now=now))
+    if events:
+        _publish(events)
+
+# --- Public Service Functions ---
+def start_alarm_service(definitions=None):
+    """
+    Builds each chamber's rules from Config.ALARM_RULES, skipping rules on
+    sensors the chamber doesn't have, and starts evaluating live samples.
+    """
+    for chamber in chambers.get_chambers():
+        _rules[chamber.name] = [
+            rule for rule in map(create_rule, Config.ALARM_RULES if definitions is None else definitions)
+            if chamber.has_sensor(chambers.CHANNELS[rule.channel])
+        ]
+    sensor_service.add_sample_listener(_on_sample)
+    scheduler.add_periodic_job(CHECK_JOB_NAME, _check_job, interval=CHECK_INTERVAL)
+    logging.info(f"Alarm service started with {len(Config.ALARM_RULES if definitions is None else definitions)} rule(s) per chamber.")
+
+def stop_alarm_service():
+    scheduler.remove_job(CHECK_JOB_NAME)
+
+def get_active_alarms(chamber_name=None):
+    """Returns the raising events of the alarms currently active (optionally for one chamber)."""
+    with _lock:
+        return [event for (name, _), event in _active.items() if chamber_name in (None, name)]
+
+def get_history(chamber_name=None, limit=100):
+    """Returns the most recent stored alarm transitions, newest first."""
+    return database.list_alarm_events(chamber_name, limit)
+
+# Note: start_alarm_service() should be called once during application
+# startup, after chambers are loaded and before scheduler.start().
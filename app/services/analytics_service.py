@@ -0,0 +1,233 @@
+import bisect
+import itertools
+import math
+import time
+from array import array
+
+from config import Config
+from app import settings
+from app.hardware import gpio_devices as hw_gpio
+from app.hardware import sensors as hw_sensors
+from app.hardware import serial_comms as hw_serial
+from app.services import actuator_journal
+from app.services import export_service
+
+# --- Constants ---
+DEFAULT_RANGE = 3600     # Seconds analysed when no start is given
+DEFAULT_INTERVAL = 300   # Seconds per breakdown interval when none is given
+MAX_INTERVALS = 1000     # Breakdown intervals per query
+MAX_SAMPLE_HOLD = 2 * Config.SAMPLING_MAX_INTERVAL # A logged reading stands for at most this long (longer gaps count as no data)
+
+# --- Exceptions ---
+class AnalyticsError(ValueError):
+    """Raised for invalid query parameters (reported to the client as 400)."""
+
+# --- Columns and Segments ---
+def _load_columns(chamber, start, end):
+    """
+    Reads the chamber's log for [start - MAX_SAMPLE_HOLD, end] into columns:
+    times, control temperature (mean of the control probes) and CO2, as
+    array('d') with NaN where the sensor reported its fallback value.
+    """
+    probes = [f"temperature_{index + 1}" for index in chamber.control_sensors]
+    count = len(probes)
+    times, temperature, co2 = array('d'), array('d'), array('d')
+    for timestamp, values in export_service.iter_rows(chamber.log_file, start - MAX_SAMPLE_HOLD, end, probes + ['co2']):
+        readings = values[:count]
+        times.append(timestamp)
+        temperature.append(math.nan if hw_sensors.FALLBACK_TEMPERATURE in readings else sum(readings) / count)
+        co2.append(math.nan if values[count] == hw_serial.FALLBACK_CO2_PERCENT else values[count])
+    return times, temperature, co2
+
+def _held_segments(times, values, start, end, max_hold):
+    """
+    Holds each value from its time until the next one (for at most max_hold
+    seconds) and returns the (starts, ends, values) of these segments,
+    clipped to [start, end]. NaN values (no valid reading) leave gaps.
+    """
+    starts, ends, held = array('d'), array('d'), array('d')
+    next_times = itertools.chain(itertools.islice(times, 1, None), (math.inf,))
+    for segment_time, next_time, value in zip(times, next_times, values):
+        if value != value: # NaN
+            continue
+        segment_start = max(segment_time, start)
+        segment_end = min(next_time, segment_time + max_hold, end)
+        if segment_end > segment_start:
+            starts.append(segment_start)
+            ends.append(segment_end)
+            held.append(value)
+    return starts, ends, held
+
+def _interval_sums(segments, edges, weight=None):
+    """
+    Returns, per interval between consecutive edges, the sum over segments
+    of weight(value) times the seconds the segment overlaps the interval
+    (weight None: the seconds covered). One pass over the segments.
+    """
+    sums = [0.0] * (len(edges) - 1)
+    last = len(sums) - 1
+    for start, end, value in zip(*segments):
+        factor = 1.0 if weight is None else weight(value)
+        if not factor:
+            continue
+        index = max(bisect.bisect_right(edges, start) - 1, 0)
+        while index <= last and edges[index] < end:
+            overlap = min(end, edges[index + 1]) - max(start, edges[index])
+            if overlap > 0:
+                sums[index] += factor * overlap
+            index += 1
+    return sums
+
+def _interval_counts(times, edges):
+    """Returns the number of (sorted) times falling in each interval between consecutive edges."""
+    positions = [bisect.bisect_left(times, edge) for edge in edges]
+    return [b - a for a, b in zip(positions, positions[1:])]
+
+def _actuator_totals(chamber, actuator, edges, now):
+    """
+    Per interval: seconds the actuator's state is known, seconds it was on
+    and the number of times it switched on. None if the chamber has no such
+    actuator.
+    """
+    if not chamber.has_actuator(actuator):
+        return None
+    intervals = len(edges) - 1
+    history = actuator_journal.state_history(chamber.actuator_name(actuator), edges[0], edges[-1])
+    if history is None:
+        return [0.0] * intervals, [0.0] * intervals, [0] * intervals
+    since, opening, times, states = history
+    begin, known_end = max(edges[0], since), min(edges[-1], now)
+    known = [max(0.0, min(b, known_end) - max(a, begin)) for a, b in zip(edges, edges[1:])]
+    on_values = array('d', [1.0 if state else math.nan for state in [opening, *states]])
+    on_time = _interval_sums(_held_segments(array('d', [begin]) + times, on_values, begin, known_end, math.inf), edges)
+    switch_ons = _interval_counts([t for t, state in zip(times, states) if state], edges)
+    return known, on_time, switch_ons
+
+# --- KPIs ---
+def _ratio(part, whole, digits=4):
+    return round(part / whole, digits) if whole > 0 else None
+
+def _kpis(totals, span, flow_rate):
+    """Builds the KPI dict for one interval (or the whole range) from its raw second/count totals."""
+    temperature = totals['temperature']
+    result = {
+        'temperature': {
+            'coverage': _ratio(temperature['covered'], span),
+            'in_band': _ratio(temperature['in_band'], temperature['covered']),
+            'below': _ratio(temperature['below'], temperature['covered']),
+            'above': _ratio(temperature['above'], temperature['covered']),
+            'mean': _ratio(temperature['integral'], temperature['covered'], 3),
+        },
+        'co2': {
+            'coverage': _ratio(totals['co2']['covered'], span),
+            'mean': _ratio(totals['co2']['integral'], totals['co2']['covered'], 3),
+        },
+    }
+    heater = totals.get('heater')
+    if heater is not None:
+        known, on_time, switch_ons = heater
+        result['heater'] = {'duty_cycle': _ratio(on_time, known), 'switch_ons': switch_ons}
+    solenoid = totals.get('solenoid')
+    if solenoid is not None:
+        known, open_time, pulses = solenoid
+        co2 = result['co2']
+        co2['pulses'] = pulses
+        co2['open_seconds'] = round(open_time, 2)
+        co2['open_seconds_per_hour'] = _ratio(open_time * 3600, known, 2)
+        if flow_rate:
+            co2['dose_litres_per_hour'] = _ratio(open_time * flow_rate / 60 * 3600, known, 3)
+    return result
+
+# --- Public Service Functions ---
+def compute_kpis(chamber, start=None, end=None, interval=None, low=None, high=None):
+    """
+    Computes a chamber's control KPIs over [start, end] (unix seconds;
+    default: the last DEFAULT_RANGE seconds), for the whole range and per
+    `interval` seconds (default DEFAULT_INTERVAL):
+
+    - temperature: fraction of time the control temperature was in the band
+      [low, high] (default: the chamber's current temp bounds), below and
+      above it, its time-weighted mean and the logged coverage;
+    - heater: duty cycle and number of switch-ons;
+    - co2: time-weighted mean, solenoid pulses and open time (per hour, and
+      dosed litres per hour with Config.CO2_FLOW_RATE).
+
+    Readings are time-weighted: each logged reading stands until the next
+    (at most MAX_SAMPLE_HOLD seconds). Actuator figures cover the time since
+    the actuator journal began. Raises AnalyticsError for
+    invalid parameters.
+    """
+    given = {'start': start, 'end': end, 'interval': interval, 'low': low, 'high': high}
+    for name, value in given.items():
+        if value is not None and not math.isfinite(value):
+            raise AnalyticsError(f"'{name}' must be a finite number")
+    now = time.time()
+    end = now if end is None else end
+    start = end - DEFAULT_RANGE if start is None else start
+    interval = DEFAULT_INTERVAL if interval is None else interval
+    if start >= end:
+        raise AnalyticsError("'start' must be before 'end'")
+    if interval <= 0:
+        raise AnalyticsError("'interval' must be positive")
+    if math.ceil((end - start) / interval) > MAX_INTERVALS:
+        raise AnalyticsError(f"Too many intervals; at most {MAX_INTERVALS} per query")
+    snapshot = settings.current(chamber.name)
+    band = (snapshot.temp_lower_bound if low is None else low, snapshot.temp_upper_bound if high is None else high)
+    if band[0] >= band[1]:
+        raise AnalyticsError("'low' must be below 'high'")
+
+    edges = [start + index * interval for index in range(math.ceil((end - start) / interval))] + [end]
+    times, temperature_values, co2_values = _load_columns(chamber, start, end)
+    temperature = _held_segments(times, temperature_values, start, end, MAX_SAMPLE_HOLD)
+    co2 = _held_segments(times, co2_values, start, end, MAX_SAMPLE_HOLD)
+    low, high = band
+    columns = {
+        'temperature': {
+            'covered': _interval_sums(temperature, edges),
+            'in_band': _interval_sums(temperature, edges, lambda value: low <= value <= high),
+            'below': _interval_sums(temperature, edges, lambda value: value < low),
+            'above': _interval_sums(temperature, edges, lambda value: value > high),
+            'integral': _interval_sums(temperature, edges, lambda value: value),
+        },
+        'co2': {
+            'covered': _interval_sums(co2, edges),
+            'integral': _interval_sums(co2, edges, lambda value: value),
+        },
+    }
+    actuators = {
+        'heater': _actuator_totals(chamber, hw_gpio.ITO_HEATING, edges, now),
+        'solenoid': _actuator_totals(chamber, hw_gpio.CO2_SOLENOID, edges, now),
+    }
+    columns.update({name: totals for name, totals in actuators.items() if totals is not None})
+
+    def totals_at(index):
+        return {
+            name: tuple(column[index] for column in value) if isinstance(value, tuple)
+            else {key: column[index] for key, column in value.items()}
+            for name, value in columns.items()
+        }
+
+    def range_totals():
+        return {
+            name: tuple(sum(column) for column in value) if isinstance(value, tuple)
+            else {key: sum(column) for key, column in value.items()}
+            for name, value in columns.items()
+        }
+
+    flow_rate = Config.CO2_FLOW_RATE
+    return {
+        'chamber': chamber.name,
+        'start': start,
+        'end': end,
+        'interval': interval,
+        'band': {'low': low, 'high': high},
+        'rows': len(times),
+        'summary': _kpis(range_totals(), end - start, flow_rate),
+        'intervals': [
+            {'start': a, 'end': b, **_kpis(totals_at(index), b - a, flow_rate)}
+            for index, (a, b) in enumerate(zip(edges, edges[1:]))
+        ],
+    }
+
+# Note: sensor history comes from the chamber's CSV log (seeked by time, see
+# export_service.iter_rows()), actuator transitions from the actuator journal.
@@ -0,0 +1,209 @@
+import functools
+import logging
+import threading
+import time
+
+from flask import request
+
+from app import socketio
+from app.services import samples
+from app.services import scheduler
+from app.utils.packet_json import PreEncoded
+
+# --- Constants ---
+# Rate classes a client can pick with the 'subscribe' event. Interval classes
+# get at most one update per key (chamber) per interval, the latest one;
+# 'on-change' gets an update whenever the values (timestamp aside) change.
+RATE_1HZ = '1hz'
+RATE_0_2HZ = '0.2hz'
+RATE_ON_CHANGE = 'on-change'
+RATE_INTERVALS = {RATE_1HZ: 1.0, RATE_0_2HZ: 5.0, RATE_ON_CHANGE: None}
+DEFAULT_RATE = RATE_1HZ # Clients that never subscribe, e.g. older dashboards
+
+INTERVAL_SLACK = 0.9   # An update is due once 90% of the interval has passed, absorbing sampling jitter
+FLUSH_JOB_NAME = 'broadcast-flush'
+FLUSH_INTERVAL = 0.25  # Seconds between sends of updates held back by their rate class
+ACK_TIMEOUT = 10.0     # Seconds before an unacknowledged update is treated as lost
+
+_UNSET = object()
+
+# --- Rate Classes and Clients ---
+class RateClass:
+    """Decides which updates a rate class gets; shared by all of its clients."""
+    def __init__(self, name, interval):
+        self.name = name
+        self.interval = interval
+        self._last_sent = {}  # Key -> monotonic time of the last update delivered
+        self._signatures = {} # Key -> signature of the last update delivered (on-change)
+        self.pending = {}     # Key -> (event, payload) held back until the interval passes
+
+    def offer(self, key, event, payload, signature, now):
+        """Returns True if the update is due now; otherwise it replaces the key's pending update, if any is needed."""
+        if self.interval is None:
+            if self._signatures.get(key, _UNSET) == signature:
+                return False
+            self._signatures[key] = signature
+            return True
+        if now - self._last_sent.get(key, float('-inf')) >= self.interval * INTERVAL_SLACK:
+            self._last_sent[key] = now
+            self.pending.pop(key, None)
+            return True
+        self.pending[key] = (event, payload) # Coalesced: only the latest waits
+        return False
+
+    def take_due(self, now):
+        """Removes and returns the pending (key, event, payload) whose interval has passed."""
+        due = []
+        for key, (event, payload) in list(self.pending.items()):
+            if now - self._last_sent.get(key, float('-inf')) >= self.interval * INTERVAL_SLACK:
+                self._last_sent[key] = now
+                del self.pending[key]
+                due.append((key, event, payload))
+        return due
+
+class Client:
+    """
+    A subscribed client. With `ack`, it acknowledges each update and gets the
+    next one only then; updates arriving meanwhile replace each other per
+    key, so a slow consumer holds at most one pending update per chamber.
+    """
+    __slots__ = ('sid', 'rate', 'ack', 'in_flight_since', 'pending')
+
+    def __init__(self, sid, rate, ack):
+        self.sid = sid
+        self.rate = rate
+        self.ack = ack
+        self.in_flight_since = None # Monotonic time the unacknowledged update was sent
+        self.pending = {}           # Key -> (event, payload)
+
+# --- State Variables ---
+_lock = threading.Lock()
+_classes = {name: RateClass(name, interval) for name, interval in RATE_INTERVALS.items()}
+_clients = {} # sid -> Client, for clients that subscribed
+_stats = {'published': 0, 'broadcasts': 0, 'sends': 0, 'coalesced': 0, 'ack_timeouts': 0}
+
+# --- Private Functions ---
+def _send(client, event, payload):
+    """Sends one update to a client (call without the lock held)."""
+    if client.ack:
+        socketio.server.emit(event, payload, to=client.sid, callback=functools.partial(_on_ack, client.sid))
+    else:
+        socketio.emit(event, payload, to=client.sid)
+
+def _deliver(rate_name, key, event, payload, now):
+    """Delivers an update to a rate class: one broadcast for unsubscribed clients of the default class, one send per subscriber."""
+    sends = []
+    with _lock:
+        subscribed = list(_clients)
+        for client in _clients.values():
+            if client.rate != rate_name:
+                continue
+            if client.in_flight_since is not None:
+                if key in client.pending:
+                    _stats['coalesced'] += 1
+                client.pending[key] = (event, payload)
+            else:
+                if client.ack:
+                    client.in_flight_since = now
+                sends.append(client)
+        _stats['sends'] += len(sends)
+        if rate_name == DEFAULT_RATE:
+            _stats['broadcasts'] += 1
+    if rate_name == DEFAULT_RATE:
+        socketio.emit(event, payload, skip_sid=subscribed or None)
+    for client in sends:
+        _send(client, event, payload)
+
+def _on_ack(sid, *args):
+    """Ack callback: sends the client's oldest pending update, if any."""
+    now = time.monotonic()
+    with _lock:
+        client = _clients.get(sid)
+        if client is None:
+            return
+        client.in_flight_since = None
+        if not client.pending:
+            return
+        key = next(iter(client.pending))
+        event, payload = client.pending.pop(key)
+        client.in_flight_since = now
+        _stats['sends'] += 1
+    _send(client, event, payload)
+
+def _flush_job():
+    """Delivers updates whose rate interval has passed and resends to clients whose ack is overdue."""
+    now = time.monotonic()
+    with _lock:
+        due = [(rate.name, item) for rate in _classes.values() if rate.pending for item in rate.take_due(now)]
+        overdue = [
+            client for client in _clients.values()
+            if client.in_flight_since is not None and now - client.in_flight_since > ACK_TIMEOUT
+        ]
+        _stats['ack_timeouts'] += len(overdue)
+    for rate_name, (key, event, payload) in due:
+        _deliver(rate_name, key, event, payload, now)
+    for client in overdue:
+        _on_ack(client.sid) # Treat the lost ack as received
+
+# --- Public Functions ---
+def publish(event, data, key=None, signature=None):
+    """
+    Encodes an update once and delivers it to each rate class that is due
+    for it. `key` separates independent streams (e.g. chambers) for rate
+    limiting and coalescing; `signature` is what 'on-change' compares
+    (default: the data itself).
+    """
+    payload = PreEncoded(samples.dumps(data))
+    signature = data if signature is None else signature
+    now = time.monotonic()
+    with _lock:
+        _stats['published'] += 1
+        due = [rate.name for rate in _classes.values() if rate.offer(key, event, payload, signature, now)]
+    for rate_name in due:
+        _deliver(rate_name, key, event, payload, now)
+
+def subscribe(sid, rate=DEFAULT_RATE, ack=False):
+    """Puts a client in a rate class (replacing an earlier subscription). Raises ValueError for an unknown class."""
+    if rate not in RATE_INTERVALS:
+        raise ValueError(f"Unknown rate class '{rate}'. Expected one of: {', '.join(RATE_INTERVALS)}")
+    with _lock:
+        _clients[sid] = Client(sid, rate, ack)
+
+def unsubscribe(sid):
+    with _lock:
+        _clients.pop(sid, None)
+
+def get_status():
+    """Returns subscriber counts per rate class and delivery counters."""
+    with _lock:
+        counts = {name: 0 for name in RATE_INTERVALS}
+        for client in _clients.values():
+            counts[client.rate] += 1
+        return dict(_stats, subscribers=counts, awaiting_ack=sum(1 for c in _clients.values() if c.in_flight_since is not None))
+
+def start_broadcast_hub():
+    scheduler.add_periodic_job(FLUSH_JOB_NAME, _flush_job, interval=FLUSH_INTERVAL)
+
+def stop_broadcast_hub():
+    scheduler.remove_job(FLUSH_JOB_NAME)
+
+# --- SocketIO Event Handlers ---
+def register_socketio_handlers(socketio_instance):
+    """Registers the 'subscribe' event ({'rate': '1hz'|'0.2hz'|'on-change', 'ack': bool}) and disconnect cleanup."""
+    @socketio_instance.on('subscribe')
+    def handle_subscribe(options=None):
+        options = options if isinstance(options, dict) else {}
+        rate = options.get('rate', DEFAULT_RATE)
+        try:
+            subscribe(request.sid, rate, bool(options.get('ack')))
+        except ValueError as e:
+            return {'error': str(e)}
+        logging.debug(f"Client {request.sid} subscribed at {rate}{' with acks' if options.get('ack') else ''}.")
+        return {'rate': rate}
+
+    @socketio_instance.on('disconnect')
+    def handle_disconnect():
+        unsubscribe(request.sid)
+
+# Note: sensor_service publishes samples through publish(); start_broadcast_hub()
+# and register_socketio_handlers(socketio) are called from run.py.
@@ -0,0 +1,454 @@
+import atexit
+import logging
+import re
+from collections import deque
+
+from config import Config
+from app.hardware import registry as hw_registry
+from app.hardware import breaker as hw_breaker
+from app.hardware import gpio_devices as hw_gpio
+from app.hardware import sensors as hw_sensors
+from app.hardware import serial_comms as hw_serial
+from app.services import datalog_service
+from app.services import samples
+from app.utils import clock
+from app.utils.rolling import RollingWindow
+
+# --- Constants ---
+MAIN_CHAMBER = 'main' # The original chamber, always present
+BUFFER_SIZE = 20      # Number of recent readings kept in memory per chamber
+TEMPERATURE_CHANNELS = samples.TEMPERATURE_CHANNELS # Probes per chamber in the sample/log format
+DEFAULT_CONTROL_SENSORS = (2, 3) # Probes averaged for heater control (sensors 3 and 4)
+
+# Sensor kinds, from the channel registry; a chamber's hardware registry device is named after the kind
+SENSOR_KINDS = tuple(field.kind for field in samples.FIELDS)
+SAMPLE_KEYS = samples.SAMPLE_KEYS # Sensor kind -> sample key holding its reading(s)
+LATENCY_WINDOW = 300 # Seconds of read durations summarized per sensor in describe()
+# Relay actuators a chamber can have
+ACTUATORS = (hw_gpio.ITO_HEATING, hw_gpio.CO2_SOLENOID, hw_gpio.ARGON_SOLENOID)
+
+# Named scalar channels of a sample -> the sensor kind they come from
+CHANNEL_TEMPERATURE = 'temperature' # Average of the chamber's control probes
+CHANNELS = {
+    CHANNEL_TEMPERATURE: hw_registry.DEVICE_TEMPERATURE,
+    **{name: field.kind for name, field in samples.CHANNEL_FIELDS.items()},
+}
+
+# Init timeouts (seconds), as for the main chamber's devices in run.py
+_INIT_TIMEOUTS = {
+    hw_registry.DEVICE_TEMPERATURE: 3.0,
+    hw_registry.DEVICE_HUMIDITY: 2.0,
+    hw_registry.DEVICE_OXYGEN: 8.0,
+    hw_registry.DEVICE_CO2: 4.0,
+}
+_NAME_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]{0,31}$')
+
+# --- Channel Values ---
+def average_temperature(temperatures, control_sensors=DEFAULT_CONTROL_SENSORS):
+    """
+    Averages the control probes (by default 3 and 4, as per original logic).
+    Returns None if they are missing or report the fallback value.
+    """
+    if not temperatures or len(temperatures) <= max(control_sensors):
+        return None
+    values = [temperatures[index] for index in control_sensors]
+    if hw_sensors.FALLBACK_TEMPERATURE in values:
+        return None
+    return round(sum(values) / len(values), 2)
+
+# --- Chamber ---
+class Chamber:
+    """
+    One chamber run by this controller: its sensor and actuator mapping, its
+    latest reading and buffer, and its log file. Each chamber gets its own
+    hardware registry devices ('<name>:temperature', ...), relay device names
+    ('<name>:ito-heating', ...) and scheduler jobs ('sensor-reading:<name>', ...),
+    so one chamber's failing sensor never affects another.
+
+    Args:
+        name (str): Lowercase letters, digits, '-' and '_'.
+        temperature_cs_pins (list): `board` pin names of its MAX31865 probes
+                                    (up to TEMPERATURE_CHANNELS) on the shared SPI bus.
+        relay_pins (dict): Actuator (ACTUATORS) -> BCM pin of its relay.
+        control_sensors (tuple): Indexes of the probes averaged for heater control.
+        humidity_pin (int): BCM pin of its DHT22, or None if not fitted.
+        oxygen_address (int): I2C address of its oxygen sensor, or None.
+        co2_port (str): Serial port of its CO2 sensor, or None.
+    """
+    def __init__(self, name, temperature_cs_pins=(), relay_pins=None, control_sensors=DEFAULT_CONTROL_SENSORS,
+                 humidity_pin=None, oxygen_address=None, co2_port=None):
+        if not _NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid chamber name '{name}'")
+        if len(temperature_cs_pins) > TEMPERATURE_CHANNELS:
+            raise ValueError(f"Chamber '{name}': at most {TEMPERATURE_CHANNELS} temperature probes")
+        if any(not 0 <= index < len(temperature_cs_pins) for index in control_sensors):
+            raise ValueError(f"Chamber '{name}': control_sensors must index its temperature probes")
+        unknown = set(relay_pins or {}) - set(ACTUATORS)
+        if unknown:
+            raise ValueError(f"Chamber '{name}': unknown actuators {sorted(unknown)}")
+
+        self.name = name
+        self.temperature_cs_pins = list(temperature_cs_pins)
+        self.control_sensors = tuple(control_sensors)
+        self.relay_pins = dict(relay_pins or {})
+        self.humidity_pin = humidity_pin
+        self.oxygen_address = oxygen_address
+        self.co2_port = co2_port
+        self.log_file = f"sensor_data_{name}.csv"
+        # Latest reading and recent buffer, updated by the sensor service
+        self.latest_data = {}
+        self.buffer = deque(maxlen=BUFFER_SIZE)
+        # Rolling statistics per fitted channel and window (Config.STATS_WINDOWS);
+        # `stats` is republished as a new dict per sample, so readers never lock
+        self.stats_windows = {
+            channel: [(window_label(window), RollingWindow(window)) for window in Config.STATS_WINDOWS]
+            for channel, kind in CHANNELS.items() if self.has_sensor(kind)
+        }
+        self.latest_values = {} # Channel -> latest valid value or None
+        self.stats = {}         # Channel -> window label -> WindowStats
+        self._stats_acquired_ns = {} # Sample key -> acquisition time of the reading last fed into the windows
+        # Read durations (ms) per fitted sensor kind; `latency` is republished like `stats`
+        self.latency_windows = {kind: RollingWindow(LATENCY_WINDOW) for kind in SENSOR_KINDS if self.has_sensor(kind)}
+        self.latency = {}       # Sensor kind -> WindowStats of its read durations
+        self._last_readings = {} # Sensor kind -> (value, monotonic ns taken, 0), reported again while not due
+        # Driver handles, set by the init functions
+        self._temp_sensors = []
+        self._oxygen_sensor = None
+        self._co2_connection = None
+
+    # --- Names ---
+    def device_name(self, kind):
+        """Hardware registry device name for one of SENSOR_KINDS."""
+        return f"{self.name}:{kind}"
+
+    def actuator_name(self, actuator):
+        """gpio_devices device name for one of ACTUATORS."""
+        return f"{self.name}:{actuator}"
+
+    def job_name(self, job):
+        """Scheduler job name for one of this chamber's jobs."""
+        return f"{job}:{self.name}"
+
+    # --- Capabilities ---
+    def has_sensor(self, kind):
+        return {
+            hw_registry.DEVICE_TEMPERATURE: bool(self.temperature_cs_pins),
+            hw_registry.DEVICE_HUMIDITY: self.humidity_pin is not None,
+            hw_registry.DEVICE_OXYGEN: self.oxygen_address is not None,
+            hw_registry.DEVICE_CO2: self.co2_port is not None,
+        }[kind]
+
+    def has_actuator(self, actuator):
+        return actuator in self.relay_pins
+
+    def is_usable(self, kind):
+        """Returns True if the sensor is fitted and its device is ready or degraded."""
+        return self.has_sensor(kind) and hw_registry.is_usable(self.device_name(kind))
+
+    # --- Hardware Setup ---
+    def register_devices(self):
+        """Registers this chamber's relays with gpio_devices and its sensors with the hardware registry."""
+        for actuator, pin in self.relay_pins.items():
+            hw_gpio.add_relay(self.actuator_name(actuator), pin)
+        init_funcs = {
+            hw_registry.DEVICE_TEMPERATURE: self._init_temperature,
+            hw_registry.DEVICE_HUMIDITY: hw_sensors.initialize_humidity_sensor, # Only loads the shared driver
+            hw_registry.DEVICE_OXYGEN: self._init_oxygen,
+            hw_registry.DEVICE_CO2: self._init_co2,
+        }
+        for kind in SENSOR_KINDS:
+            if self.has_sensor(kind):
+                hw_registry.register_device(self.device_name(kind), init_funcs[kind], timeout=_INIT_TIMEOUTS[kind])
+
+    def _init_temperature(self):
+        temp_sensors = hw_sensors.open_temperature_sensors(self.temperature_cs_pins)
+        self._temp_sensors = temp_sensors # Published in one assignment
+        return hw_sensors.temperature_sensors_status(temp_sensors)
+
+    # Init functions also run when the registry recovers a lost device: the
+    # new driver object replaces the old one in a single assignment
+    def _init_oxygen(self):
+        oxygen_sensor = hw_sensors.open_oxygen_sensor(self.oxygen_address)
+        if oxygen_sensor is None:
+            return False
+        old_sensor, self._oxygen_sensor = self._oxygen_sensor, oxygen_sensor
+        hw_sensors.close_oxygen_sensor(old_sensor)
+        return True
+
+    def _init_co2(self):
+        connection = hw_serial.open_co2_sensor(self.co2_port)
+        if connection is None:
+            return False
+        old_connection, self._co2_connection = self._co2_connection, connection
+        if old_connection is not None:
+            hw_serial.close_connection(old_connection)
+        else:
+            atexit.register(self._close_co2)
+        return True
+
+    def _close_co2(self):
+        if self._co2_connection is not None:
+            hw_serial.close_connection(self._co2_connection)
+
+    # --- Sampling ---
+    # Blocking (bus I/O): called on the scheduler's I/O pool
+    def read_temperatures(self):
+        return hw_sensors.read_temperatures(self._temp_sensors)
+
+    def read_humidity(self):
+        return hw_sensors.read_humidity(self.humidity_pin)
+
+    def read_oxygen(self):
+        return hw_sensors.read_oxygen(self._oxygen_sensor)
+
+    def read_co2(self):
+        return hw_serial.read_co2_value(self._co2_connection)
+
+    def _read(self, kind, read_func, fallback, is_failure=None):
+        """
+        Reads one sensor through its device's circuit breaker, or returns
+        `fallback` if it isn't usable. A device whose breaker opens is reported
+        lost to the hardware registry, which re-initializes it in the
+        background (the breaker's backoff delays re-inits of a device that
+        keeps failing). Returns (value, monotonic ns the read finished, read
+        duration in ns).
+        """
+        start_ns = clock.monotonic_ns()
+        if not self.is_usable(kind):
+            return fallback, start_ns, 0
+        device_name = self.device_name(kind)
+        breaker = hw_breaker.get_breaker(device_name)
+        value = breaker.call(read_func, fallback, is_failure or (lambda value: value == fallback))
+        end_ns = clock.monotonic_ns()
+        if breaker.state == hw_breaker.STATE_OPEN:
+            hw_registry.mark_lost(device_name, breaker.status()['last_failure'], retry_after=breaker.backoff)
+        return value, end_ns, end_ns - start_ns
+
+    def read_sensors(self, kinds=None):
+        """
+        Reads this chamber's sensors (default: all of them; otherwise the
+        sensor kinds in `kinds`) and returns them as a samples.Sample.
+        Sensors left out report their previous reading; sensors that are not
+        fitted, still initializing, failed or whose circuit breaker is open
+        are reported with their fallback value.
+
+        The sample's 'timestamp' is the wall-clock time (seconds, ms
+        resolution) the read started; 'acquired_ns' holds the wall-clock
+        nanoseconds each sample key's reading was taken and 'read_ms' how long
+        the reads made for this sample took (only their keys appear). All come
+        from monotonic clock readings mapped through the same anchor (see
+        app.utils.clock), so they are ordered and spaced exactly even if the
+        wall clock steps.
+        """
+        clock.resync()
+        start_ns = clock.monotonic_ns()
+        readers = { # Sensor kind -> (read function, failure test for its result)
+            hw_registry.DEVICE_TEMPERATURE: (
+                self.read_temperatures,
+                lambda values: all(value == hw_sensors.FALLBACK_TEMPERATURE for value in values) # Some probes left: degraded, not failed
+            ),
+            hw_registry.DEVICE_HUMIDITY: (self.read_humidity, None),
+            hw_registry.DEVICE_OXYGEN: (self.read_oxygen, None),
+            hw_registry.DEVICE_CO2: (self.read_co2, None),
+        }
+        readings = {}
+        for field in samples.FIELDS:
+            kind = field.kind
+            read_func, is_failure = readers[kind]
+            fallback = [field.fallback] * len(self.temperature_cs_pins) if field.count else field.fallback
+            previous = self._last_readings.get(kind)
+            if kinds is None or kind in kinds or previous is None or not self.is_usable(kind):
+                readings[kind] = self._read(kind, read_func, fallback, is_failure)
+            else:
+                readings[kind] = previous # Not due: reported again with its own acquisition time
+        self._last_readings = {kind: (value, end_ns, 0) for kind, (value, end_ns, _) in readings.items()}
+        temperatures = readings[hw_registry.DEVICE_TEMPERATURE][0]
+        if len(temperatures) != len(self.temperature_cs_pins):
+            logging.warning(f"Chamber '{self.name}': expected {len(self.temperature_cs_pins)} temperature readings, got {len(temperatures)}.")
+
+        self._record_latency(readings)
+        # Chambers with fewer probes report the fallback value for the missing ones
+        return samples.Sample.from_readings(
+            round(clock.to_wall(start_ns), 3),
+            {SAMPLE_KEYS[kind]: value for kind, (value, _, _) in readings.items()},
+            acquired_ns={SAMPLE_KEYS[kind]: clock.to_wall_ns(end_ns) for kind, (_, end_ns, _) in readings.items()},
+            read_ms={SAMPLE_KEYS[kind]: round(duration_ns / 1e6, 3) for kind, (_, _, duration_ns) in readings.items() if duration_ns},
+        )
+
+    def _record_latency(self, readings):
+        """Feeds the read durations of the fitted sensors into their latency windows and publishes the new summaries."""
+        latency = {}
+        for kind, window in self.latency_windows.items():
+            _, end_ns, duration_ns = readings[kind]
+            if duration_ns: # Sensors not read this time leave their window as it is
+                window.update(end_ns / 1e9, duration_ns / 1e6)
+            latency[kind] = window.stats()
+        self.latency = latency
+
+    def channel_values(self, sample):
+        """Returns channel -> value for a sample, None for sensors that reported their fallback value."""
+        sample = samples.as_sample(sample)
+        values = {CHANNEL_TEMPERATURE: average_temperature(sample['temperatures'], self.control_sensors)}
+        values.update(sample.channel_values())
+        return values
+
+    def channel_time(self, sample, channel):
+        """
+        Returns the wall-clock time (seconds) a sample's channel value was
+        taken: its 'acquired_ns' entry, or the sample's timestamp for samples
+        without one (e.g. replayed from CSV).
+        """
+        acquired_ns = (sample.get('acquired_ns') or {}).get(SAMPLE_KEYS[CHANNELS[channel]])
+        return sample['timestamp'] if acquired_ns is None else acquired_ns / 1e9
+
+    def update_stats(self, sample):
+        """
+        Feeds a sample into the rolling windows and publishes the new latest
+        values and stats. Each channel is placed at its own acquisition time
+        (see channel_time()); a reading reported again because its sensor
+        wasn't due is not counted twice.
+        """
+        values = self.channel_values(sample)
+        acquired_ns = sample.get('acquired_ns') or {}
+        previous_ns = self._stats_acquired_ns
+        stats = {}
+        for channel, windows in self.stats_windows.items():
+            key = SAMPLE_KEYS[CHANNELS[channel]]
+            if key in acquired_ns and acquired_ns[key] == previous_ns.get(key):
+                stats[channel] = self.stats.get(channel, {})
+                continue
+            value = values.get(channel)
+            channel_time = self.channel_time(sample, channel)
+            channel_stats = stats[channel] = {}
+            for label, window in windows:
+                window.update(channel_time, value)
+                channel_stats[label] = window.stats()
+        self._stats_acquired_ns = acquired_ns
+        self.latest_values = values
+        self.stats = stats
+        return values
+
+    # --- Actuators ---
+    def get_actuator_state(self, actuator):
+        return hw_gpio.get_device_state(self.actuator_name(actuator)) if self.has_actuator(actuator) else None
+
+    def set_actuator_state(self, actuator, state, source=hw_gpio.SOURCE_SYSTEM):
+        if not self.has_actuator(actuator):
+            logging.error(f"Chamber '{self.name}' has no {actuator} relay.")
+            return False
+        return hw_gpio.set_device_state(self.actuator_name(actuator), state, source)
+
+    # --- Status ---
+    def breaker_states(self):
+        """Returns sensor kind -> circuit breaker state for the fitted sensors."""
+        return {kind: hw_breaker.get_breaker(self.device_name(kind)).state for kind in SENSOR_KINDS if self.has_sensor(kind)}
+
+    def describe(self):
+        """Returns the chamber's mapping and current state for the API."""
+        return {
+            'name': self.name,
+            'sensors': {
+                kind: hw_registry.get_device_status(self.device_name(kind)) if self.has_sensor(kind) else None
+                for kind in SENSOR_KINDS
+            },
+            'breakers': {
+                kind: hw_breaker.get_breaker(self.device_name(kind)).status() for kind in SENSOR_KINDS if self.has_sensor(kind)
+            },
+            'actuators': {
+                self.actuator_name(actuator): self.get_actuator_state(actuator) for actuator in self.relay_pins
+            },
+            'control_sensors': list(self.control_sensors),
+            'log_file': self.log_file,
+            'latest': dict(self.latest_data),
+            'stats': stats_as_dict(self.stats),
+            'acquisition': {
+                kind: {
+                    'reads': window.count,
+                    'mean_ms': None if window.mean is None else round(window.mean, 3),
+                    'max_ms': None if window.max is None else round(window.max, 3),
+                }
+                for kind, window in self.latency.items()
+            },
+        }
+
+class MainChamber(Chamber):
+    """
+    The original chamber, driven by the hardware modules' own devices: its
+    registry devices, relays and jobs keep their original names, its devices
+    are registered in run.py and it logs to datalog_service.OUTPUT_FILE.
+    """
+    def __init__(self):
+        super().__init__(
+            MAIN_CHAMBER,
+            temperature_cs_pins=hw_sensors.CS_PINS,
+            relay_pins={actuator: hw_gpio.get_device_pin(actuator) for actuator in ACTUATORS},
+            humidity_pin=hw_sensors.DHT_PIN,
+            oxygen_address=hw_sensors.OXYGEN_I2C_ADDRESS,
+            co2_port=hw_serial.SERIAL_PORT,
+        )
+        self.log_file = datalog_service.OUTPUT_FILE
+
+    def device_name(self, kind):
+        return kind
+
+    def actuator_name(self, actuator):
+        return actuator
+
+    def job_name(self, job):
+        return job
+
+    def register_devices(self):
+        pass # Shared devices, registered in run.py
+
+    def read_temperatures(self):
+        return hw_sensors.read_temperatures()
+
+    def read_oxygen(self):
+        return hw_sensors.read_oxygen()
+
+    def read_co2(self):
+        return hw_serial.read_co2_value()
+
+def window_label(seconds):
+    """Short label for a window length: 10 -> '10s', 60 -> '1m', 600 -> '10m', 3600 -> '1h'."""
+    for unit, size in (('h', 3600), ('m', 60)):
+        if seconds >= size and seconds % size == 0:
+            return f"{seconds // size:g}{unit}"
+    return f"{seconds:g}s"
+
+def stats_as_dict(stats):
+    """Converts a chamber's stats snapshot to plain dicts for JSON."""
+    return {channel: {label: window._asdict() for label, window in windows.items()} for channel, windows in stats.items()}
+
+# --- State Variables ---
+_chambers = {MAIN_CHAMBER: MainChamber()} # Name -> Chamber, in configuration order
+
+# --- Public Functions ---
+def add_chamber(chamber):
+    """Adds a chamber. Call before its devices are registered and the services start."""
+    if chamber.name in _chambers:
+        raise ValueError(f"Chamber '{chamber.name}' already exists")
+    _chambers[chamber.name] = chamber
+    return chamber
+
+def load_chambers(definitions=None):
+    """
+    Adds the additional chambers defined in Config.CHAMBERS (a list of
+    Chamber keyword-argument dicts). Returns all chambers.
+    """
+    for definition in (Config.CHAMBERS if definitions is None else definitions):
+        add_chamber(Chamber(**definition))
+    logging.info(f"Chambers: {', '.join(_chambers)}")
+    return get_chambers()
+
+def get_chamber(name):
+    """Returns the chamber with this name, or None."""
+    return _chambers.get(name)
+
+def get_chambers():
+    """Returns all chambers, the main chamber first."""
+    return list(_chambers.values())
+
+# Note: run.py calls load_chambers() and each chamber's register_devices()
+# before hardware initialization starts; the sensor and control services then
+# register one set of jobs per chamber on the shared scheduler.
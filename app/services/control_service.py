@@ -1,184 +1,197 @@
+import functools
 import time
 import logging
-import threading
 
 # Import config and hardware/service layers
-from config import Config
+from app import settings
+from app.hardware import registry as hw_registry
 from app.hardware import gpio_devices as hw_gpio
-from app.hardware import sensors as hw_sensors
 from app.hardware import serial_comms as hw_serial
-from app.services import sensor_service # To get latest data if needed
+from app.services import chambers
+from app.services import sensor_service # Control decisions use its latest reading
+from app.services import scheduler
 
 # --- Constants ---
-# Control loop intervals (seconds) - Consider moving to Config if user-adjustable
-TEMP_CONTROL_INTERVAL = 10
-CO2_CONTROL_INTERVAL = 30
-# CO2 solenoid on-time (seconds) - Consider moving to Config
-CO2_SOLENOID_ON_TIME = 0.1
-
-# --- State Variables ---
-_temp_control_thread = None
-_co2_control_thread = None
-_stop_event = threading.Event()
+# Thresholds, loop intervals and the CO2 pulse length are runtime settings
+# (app/settings.py); each control cycle works from one settings snapshot.
+# Readings older than this (seconds, from their acquisition time) are not acted on
+MAX_DATA_AGE = 3 * sensor_service.READ_INTERVAL
+# Seconds a control cycle waits for a reading it requested from a backed-off sensor
+FRESH_READ_WAIT = 2 * sensor_service.READ_INTERVAL
+
+TEMP_JOB_NAME = 'temperature-control'
+CO2_JOB_NAME = 'co2-control'
+
+# --- Private Helper Functions ---
+def _is_fresh(chamber, data, channel):
+    return bool(data) and time.time() - chamber.channel_time(data, channel) <= MAX_DATA_AGE
+
+def _get_fresh_data(chamber, channel):
+    """
+    Returns the chamber's latest sample if its `channel` value was acquired
+    within MAX_DATA_AGE, or None. A sample's timestamp is the tick time, and
+    a sensor that backed off (see sampling_policy) reports its previous
+    reading, so age is taken from the channel's acquisition time. If that is
+    too old, the reading is requested from the sensor job and waited for
+    (cooperatively) up to FRESH_READ_WAIT.
+    """
+    latest_data = sensor_service.get_latest_data(chamber.name)
+    if _is_fresh(chamber, latest_data, channel):
+        return latest_data
+    sensor_service.request_reading(chamber.name, chambers.CHANNELS[channel])
+    deadline = time.monotonic() + FRESH_READ_WAIT
+    while time.monotonic() < deadline:
+        scheduler.sleep(sensor_service.READ_INTERVAL / 4)
+        latest_data = sensor_service.get_latest_data(chamber.name)
+        if _is_fresh(chamber, latest_data, channel):
+            return latest_data
+    return None
+
+# --- Control Decision Functions ---
+# Pure functions of a reading and the current actuator state, with no hardware
+# access, so the live control jobs and the replay driver share the same logic.
+CO2_PULSE = 'pulse' # decide_co2() result: open the solenoid for co2_solenoid_on_time
+
+def average_control_temperature(temperatures, control_sensors=chambers.DEFAULT_CONTROL_SENSORS):
+    """
+    Averages the control sensors (by default 3 and 4, as per original logic).
+    Returns None if they are missing or report the fallback value.
+    """
+    return chambers.average_temperature(temperatures, control_sensors)
+
+def decide_heater(average_temperature, current_state, lower_bound=None, upper_bound=None):
+    """Returns the heater state to switch to ('on'/'off'), or None to leave it as is."""
+    lower_bound = settings.current().temp_lower_bound if lower_bound is None else lower_bound
+    upper_bound = settings.current().temp_upper_bound if upper_bound is None else upper_bound
+    if average_temperature < lower_bound and current_state != 'on':
+        return 'on'
+    if average_temperature > upper_bound and current_state != 'off':
+        return 'off'
+    return None
+
+def decide_co2(co2_value, current_state, threshold=None):
+    """
+    Returns CO2_PULSE to dose, 'off' to close the solenoid, or None.
+    Original logic: pulse if between 0.01% and co2_threshold (the upper limit).
+    """
+    threshold = settings.current().co2_threshold if threshold is None else threshold
+    if 0.01 < co2_value < threshold:
+        return CO2_PULSE
+    if current_state != 'off':
+        return 'off' # Ensure solenoid is off if value is too high or too low (e.g., 0)
+    return None
 
 # --- Private Control Logic Functions ---
-def _control_temperature():
-    """Checks temperature and controls the heater relay."""
-    try:
-        # Get latest temperature data
-        # Option 1: Use sensor_service cache (slightly delayed but less hardware access)
-        # latest_data = sensor_service.get_latest_data()
-        # temperatures = latest_data.get('temperatures', [])
-
-        # Option 2: Read directly from hardware (more immediate)
-        temperatures = hw_sensors.read_temperatures()
-
-        if not temperatures or len(temperatures) < 4:
-             logging.warning("Control Service: Insufficient temperature data to control heater.")
-             return
+def _control_temperature(chamber):
+    """Checks a chamber's temperature and controls its heater relay."""
+    if not (chamber.is_usable(hw_registry.DEVICE_TEMPERATURE) and hw_registry.is_usable(hw_registry.DEVICE_GPIO)):
+        logging.debug(f"Control Service [{chamber.name}]: Temperature sensors or GPIO not ready, skipping heater control.")
+        return
 
-        # Calculate average temperature (using sensors 3 and 4 as per original logic)
-        # Check if readings are valid before averaging
-        temp3 = temperatures[2]
-        temp4 = temperatures[3]
-        if temp3 == hw_sensors.FALLBACK_TEMPERATURE or temp4 == hw_sensors.FALLBACK_TEMPERATURE:
-             logging.warning("Control Service: Fallback temperature reading detected, skipping heater control.")
+    try:
+        # Get latest temperature data from the sensor_service cache, so the
+        # control loop never competes with the sensor job for the SPI bus
+        latest_data = _get_fresh_data(chamber, chambers.CHANNEL_TEMPERATURE)
+        if latest_data is None:
+            logging.warning(f"Control Service [{chamber.name}]: No recent sensor data, skipping heater control.")
+            return
+
+        # Control probe average, computed once per sample by the sensor service
+        average_temperature = chamber.latest_values.get(chambers.CHANNEL_TEMPERATURE)
+        if average_temperature is None:
+             logging.warning(f"Control Service [{chamber.name}]: Missing or fallback temperature reading, skipping heater control.")
              return
-
-        average_temperature = round((temp3 + temp4) / 2, 2)
-        logging.debug(f"Control Service: Avg Temp = {average_temperature:.2f} C")
-
-        # Get current heater state (optional, for logging state changes)
-        current_state = hw_gpio.get_device_state(hw_gpio.ITO_HEATING)
-
-        # Apply control logic based on Config thresholds
-        if average_temperature < Config.TEMP_LOWER_BOUND:
-            if current_state != 'on':
-                logging.info(f"Temp below lower bound ({Config.TEMP_LOWER_BOUND}). Turning heater ON.")
-                hw_gpio.set_device_state(hw_gpio.ITO_HEATING, 'on')
-            else:
-                 logging.debug("Temp below lower bound, heater already ON.")
-        elif average_temperature > Config.TEMP_UPPER_BOUND:
-            if current_state != 'off':
-                logging.info(f"Temp above upper bound ({Config.TEMP_UPPER_BOUND}). Turning heater OFF.")
-                hw_gpio.set_device_state(hw_gpio.ITO_HEATING, 'off')
-            else:
-                 logging.debug("Temp above upper bound, heater already OFF.")
+        logging.debug(f"Control Service [{chamber.name}]: Avg Temp = {average_temperature:.2f} C")
+
+        # Apply control logic based on the chamber's current settings snapshot
+        snapshot = settings.current(chamber.name)
+        current_state = chamber.get_actuator_state(hw_gpio.ITO_HEATING)
+        new_state = decide_heater(average_temperature, current_state, snapshot.temp_lower_bound, snapshot.temp_upper_bound)
+        if new_state == 'on':
+            logging.info(f"[{chamber.name}] Temp below lower bound ({snapshot.temp_lower_bound}). Turning heater ON.")
+            chamber.set_actuator_state(hw_gpio.ITO_HEATING, 'on', hw_gpio.SOURCE_CONTROL)
+        elif new_state == 'off':
+            logging.info(f"[{chamber.name}] Temp above upper bound ({snapshot.temp_upper_bound}). Turning heater OFF.")
+            chamber.set_actuator_state(hw_gpio.ITO_HEATING, 'off', hw_gpio.SOURCE_CONTROL)
         else:
-            # Temperature is within bounds, ensure heater state is logged if it was previously unknown
-            if current_state is None: # Log initial state if unknown
-                 logging.info(f"Temp within bounds [{Config.TEMP_LOWER_BOUND}-{Config.TEMP_UPPER_BOUND}]. Heater state: {hw_gpio.get_device_state(hw_gpio.ITO_HEATING)}")
-            else:
-                 logging.debug(f"Temp within bounds [{Config.TEMP_LOWER_BOUND}-{Config.TEMP_UPPER_BOUND}]. Heater state: {current_state}")
-
+            logging.debug(f"[{chamber.name}] Temp {average_temperature:.2f} C, bounds [{snapshot.temp_lower_bound}-{snapshot.temp_upper_bound}]. Heater state: {current_state}")
 
     except Exception as e:
         logging.error(f"Error in temperature control logic: {e}", exc_info=True)
 
 
-def _control_co2():
-    """Checks CO2 level and controls the CO2 solenoid."""
-    try:
-        # Get latest CO2 reading
-        # Option 1: Use sensor_service cache
-        # latest_data = sensor_service.get_latest_data()
-        # co2_value = latest_data.get('co2', hw_serial.FALLBACK_CO2_PERCENT)
+def _control_co2(chamber):
+    """Checks a chamber's CO2 level and controls its CO2 solenoid."""
+    if not (chamber.is_usable(hw_registry.DEVICE_CO2) and hw_registry.is_usable(hw_registry.DEVICE_GPIO)):
+        logging.debug(f"Control Service [{chamber.name}]: CO2 sensor or GPIO not ready, skipping CO2 control.")
+        return
 
-        # Option 2: Read directly from hardware
-        co2_value = hw_serial.read_co2_value()
-        logging.debug(f"Control Service: CO2 = {co2_value:.2f} %")
+    try:
+        # Get latest CO2 reading from the sensor_service cache (the serial
+        # sensor can't serve two concurrent requests anyway)
+        latest_data = _get_fresh_data(chamber, 'co2')
+        if latest_data is None:
+            logging.warning(f"Control Service [{chamber.name}]: No recent sensor data, skipping CO2 control.")
+            return
+        co2_value = latest_data.get('co2', hw_serial.FALLBACK_CO2_PERCENT)
+        logging.debug(f"Control Service [{chamber.name}]: CO2 = {co2_value:.2f} %")
 
         if co2_value == hw_serial.FALLBACK_CO2_PERCENT:
-             logging.warning("Control Service: Fallback CO2 reading detected, skipping CO2 control.")
+             logging.warning(f"Control Service [{chamber.name}]: Fallback CO2 reading detected, skipping CO2 control.")
              return
 
-        # Apply control logic based on Config threshold
-        # Original logic: Turn on briefly if between 0.01% and 5% (CO2_THRESHOLD)
-        # Assuming Config.CO2_THRESHOLD is the upper limit (e.g., 5.0)
-        if 0.01 < co2_value < Config.CO2_THRESHOLD:
-            logging.info(f"CO2 below threshold ({Config.CO2_THRESHOLD}%). Activating CO2 solenoid for {CO2_SOLENOID_ON_TIME}s.")
+        # Apply control logic based on the chamber's current settings snapshot
+        snapshot = settings.current(chamber.name)
+        action = decide_co2(co2_value, chamber.get_actuator_state(hw_gpio.CO2_SOLENOID), snapshot.co2_threshold)
+        if action == CO2_PULSE:
+            logging.info(f"[{chamber.name}] CO2 below threshold ({snapshot.co2_threshold}%). Activating CO2 solenoid for {snapshot.co2_solenoid_on_time}s.")
             # Turn solenoid ON (LOW state for relay)
-            success_on = hw_gpio.set_device_state(hw_gpio.CO2_SOLENOID, 'on')
+            success_on = chamber.set_actuator_state(hw_gpio.CO2_SOLENOID, 'on', hw_gpio.SOURCE_PULSE)
             if success_on:
-                time.sleep(CO2_SOLENOID_ON_TIME)
+                scheduler.sleep(snapshot.co2_solenoid_on_time) # Cooperative: other jobs keep running
                 # Turn solenoid OFF (HIGH state for relay)
-                hw_gpio.set_device_state(hw_gpio.CO2_SOLENOID, 'off')
-                logging.info("CO2 solenoid OFF.")
+                chamber.set_actuator_state(hw_gpio.CO2_SOLENOID, 'off', hw_gpio.SOURCE_PULSE)
+                logging.info(f"[{chamber.name}] CO2 solenoid OFF.")
             else:
-                 logging.error("Failed to turn CO2 solenoid ON.")
+                 logging.error(f"[{chamber.name}] Failed to turn CO2 solenoid ON.")
+        elif action == 'off':
+             logging.info(f"[{chamber.name}] CO2 level ({co2_value}%) outside activation range (0.01-{snapshot.co2_threshold}%). Ensuring CO2 solenoid is OFF.")
+             chamber.set_actuator_state(hw_gpio.CO2_SOLENOID, 'off', hw_gpio.SOURCE_CONTROL)
         else:
-             # Ensure solenoid is off if value is too high or too low (e.g., 0)
-             current_state = hw_gpio.get_device_state(hw_gpio.CO2_SOLENOID)
-             if current_state != 'off':
-                  logging.info(f"CO2 level ({co2_value}%) outside activation range (0.01-{Config.CO2_THRESHOLD}%). Ensuring CO2 solenoid is OFF.")
-                  hw_gpio.set_device_state(hw_gpio.CO2_SOLENOID, 'off')
-             else:
-                  logging.debug(f"CO2 level ({co2_value}%) outside activation range. Solenoid already OFF.")
+             logging.debug(f"[{chamber.name}] CO2 level ({co2_value}%) outside activation range. Solenoid already OFF.")
 
     except Exception as e:
         logging.error(f"Error in CO2 control logic: {e}", exc_info=True)
 
 
-# --- Background Thread Loops ---
-def _temperature_control_loop():
-    """Background thread loop for temperature control."""
-    logging.info("Temperature control loop started.")
-    while not _stop_event.is_set():
-        _control_temperature()
-        # Wait for the defined interval, checking stop event periodically
-        _stop_event.wait(TEMP_CONTROL_INTERVAL)
-    logging.info("Temperature control loop stopped.")
-
-def _co2_control_loop():
-    """Background thread loop for CO2 control."""
-    logging.info("CO2 control loop started.")
-    while not _stop_event.is_set():
-        _control_co2()
-        # Wait for the defined interval, checking stop event periodically
-        _stop_event.wait(CO2_CONTROL_INTERVAL)
-    logging.info("CO2 control loop stopped.")
-
-
 # --- Public Service Functions ---
 def start_control_service():
-    """Starts the background threads for temperature and CO2 control."""
-    global _temp_control_thread, _co2_control_thread
-    if (_temp_control_thread and _temp_control_thread.is_alive()) or \
-       (_co2_control_thread and _co2_control_thread.is_alive()):
-        logging.warning("Control service threads already running.")
-        return
-
-    _stop_event.clear()
-
-    # Start Temperature Control Thread
-    _temp_control_thread = threading.Thread(target=_temperature_control_loop, daemon=True)
-    _temp_control_thread.start()
-
-    # Start CO2 Control Thread
-    _co2_control_thread = threading.Thread(target=_co2_control_loop, daemon=True)
-    _co2_control_thread.start()
-
-    logging.info("Control service threads started.")
+    """
+    Registers the temperature and CO2 control jobs of each chamber (that has
+    the relay) with the scheduler. Their intervals are re-read from the
+    chamber's settings each cycle, so edits apply without a restart.
+    """
+    for chamber in chambers.get_chambers():
+        if chamber.has_actuator(hw_gpio.ITO_HEATING):
+            scheduler.add_periodic_job(
+                chamber.job_name(TEMP_JOB_NAME), functools.partial(_control_temperature, chamber),
+                interval=lambda name=chamber.name: settings.current(name).temp_control_interval
+            )
+        if chamber.has_actuator(hw_gpio.CO2_SOLENOID):
+            scheduler.add_periodic_job(
+                chamber.job_name(CO2_JOB_NAME), functools.partial(_control_co2, chamber),
+                interval=lambda name=chamber.name: settings.current(name).co2_control_interval
+            )
+    logging.info("Control service started.")
 
 def stop_control_service():
-    """Signals the background control threads to stop."""
-    logging.info("Stopping control service threads...")
-    _stop_event.set()
-
-    threads_to_join = []
-    if _temp_control_thread and _temp_control_thread.is_alive():
-        threads_to_join.append(_temp_control_thread)
-    if _co2_control_thread and _co2_control_thread.is_alive():
-        threads_to_join.append(_co2_control_thread)
-
-    for thread in threads_to_join:
-        thread.join(timeout=max(TEMP_CONTROL_INTERVAL, CO2_CONTROL_INTERVAL) + 1) # Wait slightly longer than interval
-        if thread.is_alive():
-             logging.warning(f"Control service thread {thread.name} did not stop gracefully.")
-
-    _temp_control_thread = None
-    _co2_control_thread = None
-    logging.info("Control service threads stop signal sent.")
-
-# Note: start_control_service() should be called once during application startup.
-# stop_control_service() could be called during shutdown (e.g., via atexit).
\ No newline at end of file
+    """Removes the control jobs from the scheduler."""
+    logging.info("Stopping control service...")
+    for chamber in chambers.get_chambers():
+        scheduler.remove_job(chamber.job_name(TEMP_JOB_NAME))
+        scheduler.remove_job(chamber.job_name(CO2_JOB_NAME))
+    logging.info("Control service stopped.")
+
+# Note: start_control_service() should be called once during application startup,
+# before scheduler.start().
+# stop_control_service() could be called during shutdown (e.g., via atexit).
@@ -1,77 +1,73 @@
 import csv
 import logging
 import os
-import time
+
+from app.services import samples
 
 # --- Constants ---
 OUTPUT_FILE = "sensor_data.csv"
-# Define the header row explicitly to ensure consistency
-# Note: Original code calculated average_temperature but didn't save it explicitly.
-# The header had 'average_temperature', but the save function used *sensor_data['temperatures']
-# which included 5 temps. Let's define a clear header.
-# Assuming 5 temperature sensors + humidity + co2 + o2
-HEADER = [
-    'timestamp', 'co2', 'o2',
-    'temperature_1', 'temperature_2', 'temperature_3', 'temperature_4', 'temperature_5',
-    'humidity'
-]
+# Header row, derived from the channel registry: the timestamp, CO2, O2, the
+# five temperature probes and humidity
+HEADER = samples.LOG_HEADER
 
 # --- Service Functions ---
-def initialize_datalog():
+def initialize_datalog(path=OUTPUT_FILE):
     """
-    Initializes the data log file. Creates the file and writes the header
-    if the file doesn't exist or is empty.
+    Initializes a data log file (default: the main chamber's). Creates the
+    file and writes the header if the file doesn't exist or is empty.
     """
     try:
         # Check if file exists and is not empty
-        file_exists = os.path.exists(OUTPUT_FILE)
-        is_empty = os.path.getsize(OUTPUT_FILE) == 0 if file_exists else True
+        file_exists = os.path.exists(path)
+        is_empty = os.path.getsize(path) == 0 if file_exists else True
 
         if not file_exists or is_empty:
-            with open(OUTPUT_FILE, 'w', newline='') as file: # Use 'w' to create/overwrite if empty
+            with open(path, 'w', newline='') as file: # Use 'w' to create/overwrite if empty
                 writer = csv.writer(file)
                 writer.writerow(HEADER)
-            logging.info(f"Data log file '{OUTPUT_FILE}' initialized with header.")
+            logging.info(f"Data log file '{path}' initialized with header.")
         else:
-            logging.info(f"Data log file '{OUTPUT_FILE}' already exists.")
+            logging.info(f"Data log file '{path}' already exists.")
 
     except Exception as e:
-        logging.error(f"Error initializing data log file '{OUTPUT_FILE}': {e}")
+        logging.error(f"Error initializing data log file '{path}': {e}")
 
-def save_data_to_log(sensor_data):
+def build_log_row(sensor_data):
+    """
+    Converts a sample (or sample dict) into a list of values matching HEADER.
+    Readings missing from a dict are logged with their fallback value.
     """
-    Appends a row of sensor data to the CSV log file.
+    return samples.as_sample(sensor_data).log_row()
 
-    Args:
-        sensor_data (dict): A dictionary containing sensor readings.
-                            Expected keys match the HEADER list.
+def parse_log_row(row):
     """
-    try:
-        # Ensure all header keys are present in the data, providing defaults if necessary
-        row_data = [
-            sensor_data.get('timestamp', int(time.time())),
-            sensor_data.get('co2', -1.0), # Use fallback/error indicator
-            sensor_data.get('o2', -1.0),
-            # Handle temperatures - expect a list
-            *sensor_data.get('temperatures', [-1.0] * 5)[:5], # Take first 5 temps, provide fallback
-            sensor_data.get('humidity', -1.0)
-        ]
+    Converts a CSV log row (list of strings in HEADER order) back into a
+    sample. Raises ValueError on malformed rows.
+    """
+    if len(row) != len(HEADER):
+        raise ValueError(f"Expected {len(HEADER)} columns, got {len(row)}")
+    values = [float(value) for value in row]
+    timestamp = values[0]
+    return samples.Sample.from_log_row(int(timestamp) if timestamp.is_integer() else timestamp, values[1:])
 
-        # Ensure the number of elements matches the header length
-        if len(row_data) != len(HEADER):
-             logging.error(f"Data length mismatch: Expected {len(HEADER)} columns, got {len(row_data)}. Data: {sensor_data}")
-             # Pad with a default value if too short, or truncate if too long (less ideal)
-             # This indicates an issue elsewhere generating sensor_data
-             row_data = (row_data + [-1.0] * len(HEADER))[:len(HEADER)]
+def save_data_to_log(sensor_data, path=OUTPUT_FILE):
+    """
+    Appends a row of sensor data to a CSV log file.
 
+    Args:
+        sensor_data (Sample): The sample (a sample dict also works).
+        path (str): The chamber's log file (default: the main chamber's).
+    """
+    try:
+        row_data = build_log_row(sensor_data)
 
-        with open(OUTPUT_FILE, 'a', newline='') as file:
+        with open(path, 'a', newline='') as file:
             writer = csv.writer(file)
             writer.writerow(row_data)
 
     except KeyError as e:
          logging.error(f"Missing key '{e}' in sensor data for logging: {sensor_data}")
     except Exception as e:
-        logging.error(f"Error saving data to log file '{OUTPUT_FILE}': {e}")
+        logging.error(f"Error saving data to log file '{path}': {e}")
 
 # Note: initialize_datalog() should be called once during application startup.
\ No newline at end of file
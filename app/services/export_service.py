@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+import zlib
+
+from app.services import datalog_service
+
+# --- Constants ---
+FORMAT_CSV = 'csv'
+FORMAT_NDJSON = 'ndjson'
+FORMAT_ARROW = 'arrow'     # Arrow IPC stream
+FORMAT_PARQUET = 'parquet'
+FORMATS = (FORMAT_CSV, FORMAT_NDJSON, FORMAT_ARROW, FORMAT_PARQUET)
+MIMETYPES = {
+    FORMAT_CSV: 'text/csv',
+    FORMAT_NDJSON: 'application/x-ndjson',
+    FORMAT_ARROW: 'application/vnd.apache.arrow.stream',
+    FORMAT_PARQUET: 'application/vnd.apache.parquet',
+}
+
+CHANNELS = datalog_service.HEADER[1:] # Every column except the timestamp
+CHUNK_SIZE = 64 * 1024 # Bytes of text output buffered before yielding
+BATCH_ROWS = 4096      # Rows per Arrow record batch / Parquet row group
+SEEK_BLOCK = 4096      # Binary search stops when the window is this small
+
+# --- Exceptions ---
+class ExportError(ValueError):
+    """Raised for invalid export parameters (reported to the client as 400)."""
+
+# --- Private Functions ---
+def _load_pyarrow():
+    """Imports pyarrow (optional, only needed for Arrow/Parquet) on first use."""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        return None
+
+def _parse_timestamp(line):
+    try:
+        return float(line[:line.index(b',')])
+    except ValueError:
+        return None # Header or malformed line
+
+def _find_start_offset(file, data_start, file_size, start_time):
+    """
+    Binary searches the log (appended in time order) for a line-start offset
+    such that every earlier line is older than start_time. The caller still
+    filters row by row, so a slightly early offset is harmless.
+    """
+    lo, hi = data_start, file_size
+    while hi - lo > SEEK_BLOCK:
+        mid = (lo + hi) // 2
+        file.seek(mid - 1)
+        file.readline() # Move to the first line starting at or after mid
+        line = file.readline()
+        timestamp = _parse_timestamp(line) if line else None
+        if timestamp is not None and timestamp < start_time:
+            lo = file.tell()
+        else:
+            hi = mid
+    return lo
+
+def _iter_rows(path, start_time, end_time, column_indexes):
+    """Yields (timestamp, [values...]) for rows in [start_time, end_time], reading one line at a time."""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as file:
+        file.readline() # Header
+        data_start = file.tell()
+        if start_time is not None:
+            file.seek(_find_start_offset(file, data_start, os.path.getsize(path), start_time))
+
+        for line in file:
+            fields = line.rstrip(b'\r\n').split(b',')
+            if len(fields) != len(datalog_service.HEADER):
+                continue # Partial last line or malformed row
+            try:
+                timestamp = float(fields[0])
+                values = [float(fields[i]) for i in column_indexes]
+            except ValueError:
+                continue
+            if start_time is not None and timestamp < start_time:
+                continue
+            if end_time is not None and timestamp > end_time:
+                break # Log is in time order
+            yield timestamp, values
+
+def _format_number(value):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+def _csv_chunks(rows, channels):
+    buffer = [','.join(['timestamp', *channels]) + '\n']
+    size = len(buffer[0])
+    for timestamp, values in rows:
+        line = ','.join([_format_number(timestamp), *map(_format_number, values)]) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+def _ndjson_chunks(rows, channels):
+    buffer, size = [], 0
+    keys = ['timestamp', *channels]
+    for timestamp, values in rows:
+        timestamp = int(timestamp) if timestamp.is_integer() else timestamp
+        line = json.dumps(dict(zip(keys, [timestamp, *values])), separators=(',', ':')) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+class _ChunkSink:
+    """Write-only file object collecting bytes until the generator drains them."""
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _columnar_chunks(rows, channels, export_format):
+    """Streams Arrow IPC or Parquet, holding at most one batch of rows in memory."""
+    pa = _load_pyarrow()
+    schema = pa.schema([('timestamp', pa.float64()), *[(name, pa.float64()) for name in channels]])
+    sink = _ChunkSink()
+    if export_format == FORMAT_ARROW:
+        writer = pa.ipc.new_stream(pa.PythonFile(sink, mode='w'), schema)
+        write_batch = writer.write_batch
+    else:
+        writer = pa.parquet.ParquetWriter(pa.PythonFile(sink, mode='w'), schema)
+        write_batch = lambda batch: writer.write_table(pa.Table.from_batches([batch]))
+
+    for batch_rows in _batched(rows, BATCH_ROWS):
+        columns = [[row[0] for row in batch_rows]]
+        columns.extend([row[1][i] for row in batch_rows] for i in range(len(channels)))
+        write_batch(pa.record_batch(columns, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+# --- Public Functions ---
+def validate_export(channels=None, export_format=FORMAT_CSV):
+    """
+    Checks export parameters and returns the resolved channel list.
+    Raises ExportError on invalid channels or an unavailable format.
+    """
+    channels = list(channels) if channels else list(CHANNELS)
+    unknown = [name for name in channels if name not in CHANNELS]
+    if unknown:
+        raise ExportError(f"Unknown channels: {', '.join(unknown)}. Available: {', '.join(CHANNELS)}")
+    if export_format not in FORMATS:
+        raise ExportError(f"Unknown format '{export_format}'. Available: {', '.join(FORMATS)}")
+    if export_format in (FORMAT_ARROW, FORMAT_PARQUET) and _load_pyarrow() is None:
+        raise ExportError(f"Format '{export_format}' requires pyarrow, which is not installed")
+    return channels
+
+def iter_rows(path=datalog_service.OUTPUT_FILE, start_time=None, end_time=None, channels=None):
+    """
+    Returns an iterator of (timestamp, [values...]) for the rows of a sensor
+    log in [start_time, end_time], limited to `channels` (default: all), in
+    time order. Raises ExportError on unknown channels.
+    """
+    channels = validate_export(channels)
+    return _iter_rows(path, start_time, end_time, [datalog_service.HEADER.index(name) for name in channels])
+
+def stream_export(start_time=None, end_time=None, channels=None, export_format=FORMAT_CSV, compress=False, path=datalog_service.OUTPUT_FILE):
+    """
+    Returns a generator of bytes for the rows of a sensor log (default: the
+    main chamber's) in [start_time, end_time] (unix seconds, either may be
+    None), limited to `channels`. Memory use is constant regardless of the
+    size of the export.
+    """
+    channels = validate_export(channels, export_format)
+    column_indexes = [datalog_service.HEADER.index(name) for name in channels]
+    rows = _iter_rows(path, start_time, end_time, column_indexes)
+
+    if export_format == FORMAT_CSV:
+        chunks = _csv_chunks(rows, channels)
+    elif export_format == FORMAT_NDJSON:
+        chunks = _ndjson_chunks(rows, channels)
+    else:
+        chunks = _columnar_chunks(rows, channels, export_format)
+
+    logging.info(f"Export started: log={path}, format={export_format}, channels={channels}, range=[{start_time}, {end_time}], gzip={compress}")
+    return _gzip_chunks(chunks) if compress else chunks
@@ -0,0 +1,175 @@
+import argparse
+import csv
+import io
+import logging
+import time
+
+from app import settings
+from app.hardware import gpio_devices as hw_gpio
+from app.hardware import serial_comms as hw_serial
+from app.services import datalog_service
+from app.services import samples
+from app.services import sensor_service
+from app.services import control_service
+
+# --- Constants ---
+# Pipeline stages timed per sample
+STAGE_PARSE = 'parse'         # CSV row -> sample
+STAGE_ACQUIRE = 'acquire'     # sensor_service.process_sample()
+STAGE_SERIALIZE = 'serialize' # JSON encoding, as done for the SocketIO emit
+STAGE_LOG = 'log'             # CSV row formatting, as done for the data log
+STAGE_CONTROL = 'control'     # Heater and CO2 control decisions
+STAGES = (STAGE_PARSE, STAGE_ACQUIRE, STAGE_SERIALIZE, STAGE_LOG, STAGE_CONTROL)
+
+# --- Private Functions ---
+def _new_stage_stats():
+    return {stage: {'count': 0, 'total': 0.0, 'max': 0.0} for stage in STAGES}
+
+def _record(stage_stats, stage, elapsed):
+    stats = stage_stats[stage]
+    stats['count'] += 1
+    stats['total'] += elapsed
+    if elapsed > stats['max']:
+        stats['max'] = elapsed
+
+def _summarize(stage_stats):
+    return {
+        stage: {
+            'count': stats['count'],
+            'total_s': round(stats['total'], 6),
+            'mean_us': round(stats['total'] / stats['count'] * 1e6, 2) if stats['count'] else None,
+            'max_us': round(stats['max'] * 1e6, 2),
+        }
+        for stage, stats in stage_stats.items()
+    }
+
+# --- Public Functions ---
+def replay(path, speed=None, start_time=None, end_time=None, publish=False):
+    """
+    Feeds a recorded sensor log through the acquisition path in place of the
+    hardware and runs the control decisions on the recorded timeline.
+
+    Args:
+        path (str): CSV log in datalog_service.HEADER format.
+        speed (float): 1.0 for real time, N for N x real time, None or 0 for
+                       as fast as possible.
+        start_time, end_time (float): Optional unix-time range to replay.
+        publish (bool): Also emit each sample to SocketIO clients.
+
+    Returns:
+        dict: Sample count, simulated and wall durations, the actuator
+              decisions taken, and per-stage timings.
+    """
+    stage_stats = _new_stage_stats()
+    decisions = []
+    # Simulated actuator states; the real GPIO is never touched
+    heater_state = 'off'
+    co2_state = 'off'
+    next_temp_control = None
+    next_co2_control = None
+    first_timestamp = None
+    last_timestamp = None
+    sample_count = 0
+    log_sink = csv.writer(io.StringIO())
+
+    wall_start = time.perf_counter()
+    with open(path, newline='') as file:
+        reader = csv.reader(file)
+        next(reader, None) # Header
+        for row in reader:
+            t0 = time.perf_counter()
+            try:
+                sample = datalog_service.parse_log_row(row)
+            except ValueError:
+                continue # Malformed or partial row
+            _record(stage_stats, STAGE_PARSE, time.perf_counter() - t0)
+
+            timestamp = sample['timestamp']
+            if start_time is not None and timestamp < start_time:
+                continue
+            if end_time is not None and timestamp > end_time:
+                break
+            if first_timestamp is None:
+                first_timestamp = timestamp
+                next_temp_control = timestamp
+                next_co2_control = timestamp
+            last_timestamp = timestamp
+
+            # Pace the replay against the recorded timeline
+            if speed:
+                delay = wall_start + (timestamp - first_timestamp) / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            t0 = time.perf_counter()
+            sensor_service.process_sample(sample, publish=publish)
+            t1 = time.perf_counter()
+            samples.dumps(sample)
+            t2 = time.perf_counter()
+            log_sink.writerow(datalog_service.build_log_row(sample))
+            t3 = time.perf_counter()
+            _record(stage_stats, STAGE_ACQUIRE, t1 - t0)
+            _record(stage_stats, STAGE_SERIALIZE, t2 - t1)
+            _record(stage_stats, STAGE_LOG, t3 - t2)
+
+            # Control loops run at their own intervals on the recorded clock
+            t0 = time.perf_counter()
+            if timestamp >= next_temp_control:
+                next_temp_control = timestamp + settings.current().temp_control_interval
+                average_temperature = control_service.average_control_temperature(sample['temperatures'])
+                if average_temperature is not None:
+                    new_state = control_service.decide_heater(average_temperature, heater_state)
+                    if new_state:
+                        heater_state = new_state
+                        decisions.append({'timestamp': timestamp, 'device': hw_gpio.ITO_HEATING, 'action': new_state, 'value': average_temperature})
+            if timestamp >= next_co2_control:
+                next_co2_control = timestamp + settings.current().co2_control_interval
+                co2_value = sample['co2']
+                if co2_value != hw_serial.FALLBACK_CO2_PERCENT:
+                    action = control_service.decide_co2(co2_value, co2_state)
+                    if action:
+                        co2_state = 'off' # A pulse closes the solenoid again
+                        decisions.append({'timestamp': timestamp, 'device': hw_gpio.CO2_SOLENOID, 'action': action, 'value': co2_value})
+            _record(stage_stats, STAGE_CONTROL, time.perf_counter() - t0)
+            sample_count += 1
+
+    wall_seconds = time.perf_counter() - wall_start
+    simulated_seconds = (last_timestamp - first_timestamp) if sample_count else 0
+    return {
+        'samples': sample_count,
+        'simulated_seconds': simulated_seconds,
+        'wall_seconds': round(wall_seconds, 3),
+        'speedup': round(simulated_seconds / wall_seconds, 1) if wall_seconds > 0 else None,
+        'decisions': decisions,
+        'stages': _summarize(stage_stats),
+    }
+
+def _main():
+    parser = argparse.ArgumentParser(description="Replay a recorded sensor log through the acquisition and control pipeline.")
+    parser.add_argument('path', nargs='?', default=datalog_service.OUTPUT_FILE, help="Recorded CSV log")
+    parser.add_argument('--speed', type=float, default=0, help="1 = real time, N = N x real time, 0 = as fast as possible (default)")
+    parser.add_argument('--start', type=float, help="Replay from this unix time")
+    parser.add_argument('--end', type=float, help="Replay up to this unix time")
+    parser.add_argument('--decisions', help="Write actuator decisions to this CSV file")
+    args = parser.parse_args()
+
+    result = replay(args.path, speed=args.speed, start_time=args.start, end_time=args.end)
+
+    if args.decisions:
+        with open(args.decisions, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=['timestamp', 'device', 'action', 'value'])
+            writer.writeheader()
+            writer.writerows(result['decisions'])
+
+    print(f"Replayed {result['samples']} samples ({result['simulated_seconds']} s recorded) "
+          f"in {result['wall_seconds']} s (x{result['speedup']}).")
+    print(f"Actuator decisions: {len(result['decisions'])}")
+    print(f"{'stage':<10} {'count':>8} {'mean us':>10} {'max us':>10}")
+    for stage, stats in result['stages'].items():
+        print(f"{stage:<10} {stats['count']:>8} {stats['mean_us'] or 0:>10.2f} {stats['max_us']:>10.2f}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    _main()
+
+# Usage: python -m app.services.replay_service sensor_data.csv --speed 60
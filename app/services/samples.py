@@ -0,0 +1,182 @@
+import json
+from array import array
+from collections import namedtuple
+from collections.abc import Mapping
+
+from app.hardware import registry as hw_registry
+from app.hardware import sensors as hw_sensors
+from app.hardware import serial_comms as hw_serial
+
+# --- Channel Registry ---
+# A sample's readings, one field per sensor kind. A field holds one value, or
+# `count` values (one per probe) that form the channels <channel>_1.._<count>.
+# Every other module derives its channel lists and the log layout from here.
+TEMPERATURE_CHANNELS = 5 # Probes per chamber in the sample/log format
+
+SampleField = namedtuple('SampleField', ['key', 'kind', 'channel', 'count', 'fallback'])
+FIELDS = (
+    SampleField('temperatures', hw_registry.DEVICE_TEMPERATURE, 'temperature', TEMPERATURE_CHANNELS, hw_sensors.FALLBACK_TEMPERATURE),
+    SampleField('humidity', hw_registry.DEVICE_HUMIDITY, 'humidity', None, hw_sensors.FALLBACK_HUMIDITY),
+    SampleField('o2', hw_registry.DEVICE_OXYGEN, 'o2', None, hw_sensors.FALLBACK_OXYGEN),
+    SampleField('co2', hw_registry.DEVICE_CO2, 'co2', None, hw_serial.FALLBACK_CO2_PERCENT),
+)
+SAMPLE_KEYS = {field.kind: field.key for field in FIELDS} # Sensor kind -> sample key
+_FIELDS_BY_KEY = {field.key: field for field in FIELDS}
+
+def _channel_names(field):
+    return [f"{field.channel}_{i + 1}" for i in range(field.count)] if field.count else [field.channel]
+
+def _layout():
+    """Returns (channel -> row index, channel -> field, sample key -> slice or index) for FIELDS."""
+    channel_index, channel_fields, positions = {}, {}, {}
+    for field in FIELDS:
+        start = len(channel_index)
+        for name in _channel_names(field):
+            channel_fields[name] = field
+            channel_index[name] = len(channel_index)
+        positions[field.key] = slice(start, len(channel_index)) if field.count else start
+    return channel_index, channel_fields, positions
+
+CHANNEL_INDEX, CHANNEL_FIELDS, _FIELD_POSITIONS = _layout() # Positions in a sample's value row
+ROW_SIZE = len(CHANNEL_INDEX)
+_FALLBACK_ROW = array('d', [CHANNEL_FIELDS[name].fallback for name in CHANNEL_INDEX])
+
+# CSV log layout (the file format predates the registry, hence its own order)
+LOG_FIELDS = ('co2', 'o2', 'temperatures', 'humidity')
+LOG_HEADER = ['timestamp'] + [name for key in LOG_FIELDS for name in _channel_names(_FIELDS_BY_KEY[key])]
+_LOG_ORDER = [CHANNEL_INDEX[name] for name in LOG_HEADER[1:]]
+
+# --- Sample Record ---
+class Sample(Mapping):
+    """
+    One chamber reading: the timestamp and all channel values in a typed
+    array row (in CHANNEL_INDEX order), plus the acquisition times and read
+    durations per sample key when read live. Samples are not modified after
+    they are built, so one object is shared by the buffer, the latest-data
+    cache, the listeners and the sinks.
+
+    Reads like the sample dict it replaces (sample['temperatures'],
+    sample.get('co2')); to_dict() gives that dict, for JSON and other edges.
+    """
+    __slots__ = ('timestamp', 'values', 'acquired_ns', 'read_ms', '_json')
+
+    def __init__(self, timestamp, values, acquired_ns=None, read_ms=None):
+        self.timestamp = timestamp
+        self.values = values # array('d') of ROW_SIZE channel values
+        self.acquired_ns = acquired_ns
+        self.read_ms = read_ms
+        self._json = None
+
+    @classmethod
+    def from_readings(cls, timestamp, readings, acquired_ns=None, read_ms=None):
+        """Builds a sample from sample key -> reading (a list for list fields, padded or cut to size); missing keys get the fallback value."""
+        values = array('d', _FALLBACK_ROW)
+        for field in FIELDS:
+            reading = readings.get(field.key)
+            if reading is None:
+                continue
+            position = _FIELD_POSITIONS[field.key]
+            if field.count:
+                reading = list(reading[:field.count])
+                values[position] = array('d', reading + [field.fallback] * (field.count - len(reading)))
+            else:
+                values[position] = reading
+        return cls(timestamp, values, acquired_ns, read_ms)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds a sample from a sample dict (e.g. from the simulation or an older caller)."""
+        return cls.from_readings(data['timestamp'], data, data.get('acquired_ns'), data.get('read_ms'))
+
+    @classmethod
+    def from_log_row(cls, timestamp, row_values):
+        """Builds a sample from a log row's values after the timestamp (floats in LOG_HEADER order)."""
+        values = array('d', _FALLBACK_ROW)
+        for index, value in zip(_LOG_ORDER, row_values):
+            values[index] = value
+        return cls(timestamp, values)
+
+    def log_row(self):
+        """Returns the row for the CSV log: the timestamp and the channels in LOG_HEADER order."""
+        values = self.values
+        return [self.timestamp, *[values[index] for index in _LOG_ORDER]]
+
+    def channel_values(self):
+        """Returns channel -> value, None for channels that hold their fallback value."""
+        return {name: None if value == fallback else value for name, value, fallback in zip(CHANNEL_INDEX, self.values, _FALLBACK_ROW)}
+
+    def channel(self, name):
+        """Returns one channel's value by name (e.g. 'temperature_3'), fallback values included."""
+        return self.values[CHANNEL_INDEX[name]]
+
+    def __getitem__(self, key):
+        position = _FIELD_POSITIONS.get(key)
+        if position is not None:
+            return self.values[position].tolist() if isinstance(position, slice) else self.values[position]
+        if key == 'timestamp':
+            return self.timestamp
+        if key == 'acquired_ns' and self.acquired_ns is not None:
+            return self.acquired_ns
+        if key == 'read_ms' and self.read_ms is not None:
+            return self.read_ms
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield 'timestamp'
+        yield from _FIELD_POSITIONS
+        if self.acquired_ns is not None:
+            yield 'acquired_ns'
+        if self.read_ms is not None:
+            yield 'read_ms'
+
+    def __len__(self):
+        return 1 + len(FIELDS) + (self.acquired_ns is not None) + (self.read_ms is not None)
+
+    def to_dict(self):
+        values = self.values
+        data = {'timestamp': self.timestamp}
+        for key, position in _FIELD_POSITIONS.items():
+            data[key] = values[position].tolist() if position.__class__ is slice else values[position]
+        if self.acquired_ns is not None:
+            data['acquired_ns'] = self.acquired_ns
+        if self.read_ms is not None:
+            data['read_ms'] = self.read_ms
+        return data
+
+    def to_json(self):
+        """Returns the sample dict as compact JSON, encoded on the first call only."""
+        if self._json is None:
+            self._json = json.dumps(self.to_dict(), separators=(',', ':'))
+        return self._json
+
+    def __repr__(self):
+        return f"Sample({self.to_dict()!r})"
+
+# --- Public Functions ---
+def as_sample(data):
+    """Returns data as a Sample, converting a sample dict."""
+    return data if isinstance(data, Sample) else Sample.from_dict(data)
+
+def dumps(obj):
+    """
+    Compact json.dumps() for a payload that is a Sample or a dict holding
+    Samples as values (e.g. {'chamber': ..., 'data': sample}), reusing each
+    sample's cached encoding.
+    """
+    if isinstance(obj, Sample):
+        return obj.to_json()
+    if isinstance(obj, dict) and any(isinstance(value, Sample) for value in obj.values()):
+        return '{' + ','.join(
+            f"{json.dumps(str(key))}:{value.to_json() if isinstance(value, Sample) else dumps(value)}" for key, value in obj.items()
+        ) + '}'
+    return json.dumps(obj, separators=(',', ':'), default=json_default)
+
+def json_default(obj):
+    """`default` for json.dumps(): encodes Samples (also nested in payloads) as sample dicts."""
+    if isinstance(obj, Sample):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+# Note: chambers.Chamber.read_sensors() builds the samples; the JSON encoders
+# (broadcast hub, event stream, state, telemetry) and the CSV log convert them
+# at the edge, the encoders through dumps() so a sample is encoded once.
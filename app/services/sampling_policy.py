@@ -0,0 +1,97 @@
+import math
+import threading
+
+from config import Config
+from app.utils.rolling import RollingWindow
+
+# --- Constants ---
+MIN_STABLE_SAMPLES = 3 # Readings in the stability window before a sensor may back off
+CHANGE_SIGMAS = 3.0    # A reading this many stable-deviation limits away from the window mean is a change
+HOLD_AFTER_EVENT = 60.0 # Seconds an actuator event keeps the sensors it affects at the fast rate
+
+# --- Policy ---
+class AdaptiveSampler:
+    """
+    Read intervals for one chamber's sensor kinds. Each kind starts at the
+    base interval; after every reading whose channels have all stayed within
+    their standard-deviation limit (Config.SAMPLING_STABLE_STDDEV) over the
+    stability window, its interval doubles, up to `max_interval`, the ceiling
+    on how stale a reported value may get. A reading that jumps away from the
+    window mean, a sensor without a valid reading and actuator events (see
+    hold()) drop it straight back to the base interval. Kinds without a limit
+    are read at the base interval.
+    """
+    def __init__(self, kinds, base_interval, max_interval=None, limits=None, window=None):
+        self.base_interval = base_interval
+        self.max_interval = max(base_interval, max_interval or Config.SAMPLING_MAX_INTERVAL)
+        self.limits = Config.SAMPLING_STABLE_STDDEV if limits is None else limits
+        self.window = window or max(Config.SAMPLING_STABILITY_WINDOW, 2 * self.max_interval)
+        self._lock = threading.Lock()
+        self._intervals = {kind: base_interval for kind in kinds}
+        self._next_due = {kind: 0.0 for kind in kinds} # Monotonic times; 0: read at the next tick
+        self._windows = {}      # Channel -> RollingWindow of its recent readings
+        self._hold_until = {kind: 0.0 for kind in kinds} # Monotonic time until which each kind stays at the base interval
+        self._reads = {kind: 0 for kind in kinds}
+
+    def due_kinds(self, now):
+        """Returns the kinds to read at a job tick at monotonic time `now` (half a base interval early counts as due)."""
+        with self._lock:
+            return [kind for kind, due in self._next_due.items() if now >= due - self.base_interval / 2]
+
+    def record(self, kind, channel_values, now):
+        """Feeds the channel values (channel -> value or None) of a reading of `kind` and schedules its next read."""
+        limit = self.limits.get(kind)
+        stable = limit is not None and now >= self._hold_until.get(kind, 0.0)
+        for channel, value in channel_values.items():
+            window = self._windows.get(channel)
+            if window is None:
+                window = self._windows[channel] = RollingWindow(self.window)
+            previous = window.stats()
+            window.update(now, value)
+            if value is None or limit is None:
+                stable = False
+                continue
+            if previous.mean is not None and abs(value - previous.mean) > CHANGE_SIGMAS * limit:
+                stable = False # A step: the window still holds the old level, so this also keeps it fast for a while
+                continue
+            current = window.stats()
+            if current.count < MIN_STABLE_SAMPLES or math.sqrt(current.variance) > limit:
+                stable = False
+        with self._lock:
+            interval = min(self._intervals[kind] * 2, self.max_interval) if stable else self.base_interval
+            self._intervals[kind] = interval
+            self._next_due[kind] = now + interval
+            self._reads[kind] += 1
+
+    def hold(self, now, kinds=None):
+        """
+        Returns `kinds` (default: all) to the base interval for
+        HOLD_AFTER_EVENT seconds (e.g. the kinds an actuator that just
+        switched acts on).
+        """
+        with self._lock:
+            for kind in self._intervals if kinds is None else [kind for kind in kinds if kind in self._intervals]:
+                self._hold_until[kind] = now + HOLD_AFTER_EVENT
+                self._intervals[kind] = self.base_interval
+                self._next_due[kind] = min(self._next_due[kind], now)
+
+    def request(self, kind, now):
+        """Makes `kind` due at the next tick (e.g. a control loop needs a fresh value) without changing its interval."""
+        with self._lock:
+            if kind in self._next_due:
+                self._next_due[kind] = min(self._next_due[kind], now)
+
+    def status(self, now):
+        """Returns each kind's current interval, seconds until its next read and reads so far."""
+        with self._lock:
+            return {
+                kind: {
+                    'interval': interval,
+                    'next_read_in': round(max(0.0, self._next_due[kind] - now), 1),
+                    'reads': self._reads[kind],
+                }
+                for kind, interval in self._intervals.items()
+            }
+
+# Note: sensor_service keeps one AdaptiveSampler per chamber; its job ticks at
+# READ_INTERVAL and reads (and logs) only the sensors that are due.
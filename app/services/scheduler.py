@@ -0,0 +1,185 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from app import socketio # Jobs run as SocketIO background tasks (green threads under eventlet)
+from app.utils.offload import OffloadPool
+
+# --- Constants ---
+MAX_IDLE_SLEEP = 0.1 # Seconds; upper bound on how long the loop sleeps before re-checking jobs
+IO_WORKERS = 3       # Threads for blocking driver/file/network I/O
+
+# --- State Variables ---
+_lock = threading.Lock()
+_jobs = {}           # Job name -> job dict
+_queue = []          # Heap of (due_time, sequence, job name) for periodic jobs
+_sequence = itertools.count()
+_running = False
+_io_pool = OffloadPool('driver-io', max_workers=IO_WORKERS, max_pending=IO_WORKERS * 8)
+
+# --- Internal Functions ---
+def _new_job(name, func, deadline, interval=None):
+    return {
+        'name': name,
+        'func': func,
+        'interval': interval,  # Seconds or callable returning seconds; None for event jobs
+        'deadline': deadline,  # Max seconds from due time to completion before a run counts as late
+        'busy': False,
+        'runs': 0,
+        'skipped': 0,          # Due while the previous run was still going
+        'late': 0,             # Finished after its deadline
+        'errors': 0,
+        'last_duration': None,
+        'max_duration': 0.0,
+    }
+
+def _current_interval(job):
+    interval = job['interval']
+    return interval() if callable(interval) else interval
+
+def _run_job(job, due_time, args=()):
+    """Runs one job invocation and records its timing against the deadline."""
+    start_time = time.monotonic()
+    try:
+        job['func'](*args)
+    except Exception as e:
+        job['errors'] += 1
+        logging.error(f"Scheduler: Job '{job['name']}' failed: {e}", exc_info=True)
+    finally:
+        end_time = time.monotonic()
+        duration = end_time - start_time
+        job['runs'] += 1
+        job['last_duration'] = duration
+        job['max_duration'] = max(job['max_duration'], duration)
+        job['busy'] = False
+        if job['deadline'] is not None and end_time - due_time > job['deadline']:
+            job['late'] += 1
+            logging.warning(
+                f"Scheduler: Job '{job['name']}' missed its {job['deadline']:.2f}s deadline "
+                f"(started {start_time - due_time:.3f}s late, ran {duration:.3f}s)."
+            )
+
+def _dispatch_due_jobs(now):
+    """Starts every periodic job that is due and reschedules it. Returns the next due time."""
+    to_start = []
+    with _lock:
+        while _queue and _queue[0][0] <= now:
+            due_time, _, name = heapq.heappop(_queue)
+            job = _jobs.get(name)
+            if job is None or job['interval'] is None:
+                continue # Removed since it was queued
+            if job['busy']:
+                job['skipped'] += 1
+            else:
+                job['busy'] = True
+                to_start.append((job, due_time))
+            # Fixed-rate schedule; if we fell more than an interval behind, realign to now
+            next_due = due_time + _current_interval(job)
+            if next_due <= now:
+                next_due = now + _current_interval(job)
+            heapq.heappush(_queue, (next_due, next(_sequence), name))
+        next_due_time = _queue[0][0] if _queue else now + MAX_IDLE_SLEEP
+
+    for job, due_time in to_start:
+        socketio.start_background_task(_run_job, job, due_time)
+    return next_due_time
+
+def _scheduler_loop():
+    """Single loop driving all periodic jobs, sleeping cooperatively between them."""
+    logging.info("Scheduler loop started.")
+    while _running:
+        now = time.monotonic()
+        next_due_time = _dispatch_due_jobs(now)
+        socketio.sleep(min(max(0, next_due_time - time.monotonic()), MAX_IDLE_SLEEP))
+    logging.info("Scheduler loop stopped.")
+
+# --- Job Registration ---
+def add_periodic_job(name, func, interval, deadline=None, start_delay=0.0):
+    """
+    Registers func to run every `interval` seconds (a number, or a callable
+    re-evaluated each cycle). `deadline` defaults to the interval: a run that
+    finishes later than that after its due time is counted and logged as late.
+    A run that is still going when the next one is due causes that one to be skipped.
+    """
+    with _lock:
+        job = _new_job(name, func, deadline, interval=interval)
+        if job['deadline'] is None:
+            job['deadline'] = _current_interval(job)
+        _jobs[name] = job
+        heapq.heappush(_queue, (time.monotonic() + start_delay, next(_sequence), name))
+    logging.info(f"Scheduler: Periodic job '{name}' registered.")
+
+def add_event_job(name, func, deadline=None):
+    """Registers func to run (with the trigger's arguments) each time trigger(name) is called."""
+    with _lock:
+        _jobs[name] = _new_job(name, func, deadline)
+    logging.info(f"Scheduler: Event job '{name}' registered.")
+
+def remove_job(name):
+    """Unregisters a job. A run already in progress completes."""
+    with _lock:
+        _jobs.pop(name, None) # Queue entries for it are dropped when they come due
+
+def trigger(name, *args):
+    """Runs an event job as soon as possible. Returns False if the job is unknown."""
+    job = _jobs.get(name)
+    if job is None:
+        logging.warning(f"Scheduler: Trigger for unknown job '{name}'.")
+        return False
+    socketio.start_background_task(_run_job, job, time.monotonic(), args)
+    return True
+
+# --- Helpers for Jobs ---
+def run_blocking(func, *args, **kwargs):
+    """
+    Runs blocking driver I/O on the small I/O pool and returns its result.
+    Only the calling job waits; other jobs and the server keep running.
+    """
+    return _io_pool.run(func, *args, **kwargs)
+
+def set_io_workers(count):
+    """
+    Resizes the I/O pool. Call before start(): each chamber's sensor job keeps
+    one worker busy for most of its read (sensor conversion and serial waits),
+    so run.py sizes the pool to the number of chambers.
+    """
+    global _io_pool
+    if _running:
+        raise RuntimeError("I/O pool can only be resized before the scheduler starts")
+    old_pool = _io_pool
+    _io_pool = OffloadPool('driver-io', max_workers=count, max_pending=count * 8)
+    old_pool.shutdown()
+    logging.info(f"Scheduler: I/O pool sized to {count} workers.")
+
+def sleep(seconds):
+    """Cooperative sleep for use inside jobs."""
+    socketio.sleep(seconds)
+
+def get_job_stats():
+    """Returns per-job run counts and timings."""
+    with _lock:
+        return {
+            name: {key: job[key] for key in ('runs', 'skipped', 'late', 'errors', 'last_duration', 'max_duration', 'deadline')}
+            for name, job in _jobs.items()
+        }
+
+# --- Lifecycle ---
+def start():
+    """Starts the scheduler loop as a SocketIO background task."""
+    global _running
+    if _running:
+        logging.warning("Scheduler already running.")
+        return
+    _running = True
+    socketio.start_background_task(_scheduler_loop)
+
+def stop():
+    """Stops dispatching jobs. Runs already in progress complete."""
+    global _running
+    _running = False
+
+# Note: Services register their jobs (e.g. start_sensor_service()) and run.py
+# calls start() once; under eventlet everything here runs in green threads on
+# the server's hub, and only run_blocking() work leaves it.
@@ -1,128 +1,187 @@
+import functools
 import time
 import logging
-import threading
-from collections import deque
 
 # Import hardware modules
-from app.hardware import sensors as hw_sensors
-from app.hardware import serial_comms as hw_serial
+from app.hardware import breaker as hw_breaker
+from app.hardware import registry as hw_registry
 from app.hardware import display as hw_display
+from app.hardware import gpio_devices as hw_gpio
 
 # Import other services and app components
+from app.services import broadcast_hub
+from app.services import chambers
 from app.services import datalog_service
+from app.services import samples
+from app.services import sampling_policy
+from app.services import scheduler
+from app.services import telemetry_service
 from app import socketio # Import the socketio instance from app/__init__
+from flask_socketio import emit
 
 # --- Constants ---
-READ_INTERVAL = 1.0 # Seconds between sensor readings
-BUFFER_SIZE = 20 # Number of recent readings to keep in memory
+READ_INTERVAL = 1.0 # Seconds between sensor job ticks: the fastest rate a sensor is read at
+BUFFER_SIZE = chambers.BUFFER_SIZE # Number of recent readings kept in memory per chamber
+JOB_NAME = 'sensor-reading'
+# Sensor kinds an actuator's switching moves, held at the fast rate after it switches
+HELD_KINDS = {
+    hw_gpio.ITO_HEATING: (hw_registry.DEVICE_TEMPERATURE, hw_registry.DEVICE_HUMIDITY),
+    hw_gpio.CO2_SOLENOID: (hw_registry.DEVICE_CO2, hw_registry.DEVICE_OXYGEN),
+    hw_gpio.ARGON_SOLENOID: (hw_registry.DEVICE_OXYGEN, hw_registry.DEVICE_CO2),
+}
 
 # --- State Variables ---
-_data_buffer = deque(maxlen=BUFFER_SIZE)
-_sensor_thread = None
-_stop_event = threading.Event()
-_latest_data = {} # Store the most recent complete sensor data dictionary
+_sample_listeners = [] # Called with (chamber, sample) for each live sample
+_breaker_states = {}   # Chamber name -> sensor kind -> breaker state last pushed to clients
+_samplers = {}         # Chamber name -> AdaptiveSampler deciding which sensors each tick reads
+_actuator_chambers = {} # Relay device name -> (name of the chamber it belongs to, sensor kinds it moves)
 
 # --- Private Functions ---
-def _sensor_reading_loop():
+def _write_outputs(chamber, current_data):
+    """Blocking sinks (CSV file and OLED display), run on the scheduler's I/O pool."""
+    # Log data to the chamber's CSV file
+    datalog_service.save_data_to_log(current_data, chamber.log_file)
+
+    # Update OLED display (shows the main chamber)
+    if chamber.name == chambers.MAIN_CHAMBER and hw_registry.is_usable(hw_registry.DEVICE_DISPLAY):
+        hw_display.update_display(current_data)
+
+def _publish_breaker_changes(chamber):
+    """Emits 'device_breaker' for each of the chamber's sensors whose circuit breaker opened or closed."""
+    states = chamber.breaker_states()
+    previous = _breaker_states.get(chamber.name, {})
+    for kind, state in states.items():
+        if state != previous.get(kind, hw_breaker.STATE_CLOSED):
+            socketio.emit('device_breaker', {'chamber': chamber.name, 'device': chamber.device_name(kind), 'sensor': kind, 'state': state})
+    _breaker_states[chamber.name] = states
+
+def _on_transition(transition):
     """
-    The main loop that runs in a background thread to read sensors,
-    log data, update display, and emit data.
+    gpio_devices transition listener: an actuator switching holds the sensors
+    it moves at the fast rate (re-asserting a state is not a transition).
     """
-    global _latest_data
-    logging.info("Sensor reading loop started.")
+    chamber_name, kinds = _actuator_chambers.get(transition.device, (None, ()))
+    if chamber_name in _samplers:
+        _samplers[chamber_name].hold(time.monotonic(), kinds)
 
-    while not _stop_event.is_set():
+def _sensor_reading_job(chamber):
+    """
+    Periodic scheduler job (one per chamber): read the sensors that are due,
+    log data, update display, and emit data. Sensors not due are reported
+    with their previous reading, so the sample (and control freshness) still
+    moves on every tick; the log row and display are only written when
+    something was read. Driver I/O runs on the I/O pool; the emit happens on
+    the server's own loop, so no cross-thread emit is needed.
+    """
+    sampler = _samplers[chamber.name]
+    kinds = sampler.due_kinds(time.monotonic())
+    # 1-2. Read the chamber's sensors and assemble the sensor data dictionary
+    current_data = scheduler.run_blocking(chamber.read_sensors, kinds)
+    _publish_breaker_changes(chamber)
+    values = process_sample(current_data, chamber=chamber)
+    now = time.monotonic()
+    for kind in kinds:
+        sampler.record(kind, {channel: values.get(channel) for channel in chamber.stats_windows if chambers.CHANNELS[channel] == kind}, now)
+    telemetry_service.record_sample(chamber.name, current_data) # Queued in memory, sent by the uplink jobs
+    for callback in _sample_listeners:
         try:
-            start_time = time.time()
-
-            # 1. Read all sensors using hardware modules
-            temperatures = hw_sensors.read_temperatures() # Expects a list
-            humidity = hw_sensors.read_humidity()
-            oxygen = hw_sensors.read_oxygen()
-            co2 = hw_serial.read_co2_value()
-
-            # Ensure temperatures list has the expected length (5 sensors)
-            if len(temperatures) < 5:
-                 logging.warning(f"Expected 5 temperature readings, got {len(temperatures)}. Padding with fallback.")
-                 temperatures.extend([hw_sensors.FALLBACK_TEMPERATURE] * (5 - len(temperatures)))
-            elif len(temperatures) > 5:
-                 logging.warning(f"Expected 5 temperature readings, got {len(temperatures)}. Truncating.")
-                 temperatures = temperatures[:5]
-
-
-            # 2. Assemble sensor data dictionary
-            current_data = {
-                'timestamp': int(start_time),
-                'temperatures': temperatures, # List of 5 temps
-                'humidity': humidity,
-                'o2': oxygen,
-                'co2': co2,
-                # Add calculated average temp if needed by consumers (e.g., control loop)
-                # 'average_temperature': round((temperatures[2] + temperatures[3]) / 2, 2) if len(temperatures) >= 4 else hw_sensors.FALLBACK_TEMPERATURE
-            }
-            _latest_data = current_data # Update latest data cache
-
-            # 3. Log data to CSV file
-            datalog_service.save_data_to_log(current_data)
-
-            # 4. Add to internal buffer
-            _data_buffer.append(current_data)
-
-            # 5. Update OLED display
-            hw_display.update_display(current_data)
-
-            # 6. Emit data via SocketIO
-            # Use the imported socketio instance directly
-            socketio.emit('update_dashboard', current_data)
-            # logging.debug("Emitted sensor data via SocketIO.") # Use debug level
-
-            # Calculate time taken and sleep accordingly
-            elapsed_time = time.time() - start_time
-            sleep_time = max(0, READ_INTERVAL - elapsed_time)
-            if sleep_time == 0:
-                logging.warning(f"Sensor reading loop took longer than interval: {elapsed_time:.2f}s")
-
-            # Use time.sleep() for background threads not managed by socketio directly
-            time.sleep(sleep_time)
-
+            callback(chamber, current_data)
         except Exception as e:
-            logging.error(f"Error in sensor reading loop: {e}", exc_info=True)
-            # Avoid busy-waiting on continuous errors
-            time.sleep(READ_INTERVAL * 2)
+            logging.error(f"Sample listener failed for chamber '{chamber.name}': {e}", exc_info=True)
 
-    logging.info("Sensor reading loop stopped.")
+    # 5. Log to CSV and update the OLED display, at the sampling policy's rate
+    if kinds:
+        scheduler.run_blocking(_write_outputs, chamber, current_data)
 
 # --- Public Service Functions ---
+def request_reading(chamber_name, kind):
+    """Has the chamber's sensor job read `kind` at its next tick, even if its sensor has backed off."""
+    sampler = _samplers.get(chamber_name)
+    if sampler is not None:
+        sampler.request(kind, time.monotonic())
+
+def add_sample_listener(callback):
+    """
+    Registers callback(chamber, sample), called in each chamber's sensor job
+    after a live sample is processed (not for replayed samples). It delays
+    that chamber's next steps, so it should return quickly.
+    """
+    _sample_listeners.append(callback)
+
+def process_sample(current_data, publish=True, chamber=None):
+    """
+    Feeds one sample into a chamber's acquisition path (default: the main
+    chamber): updates its rolling statistics, latest-data cache and buffer, and emits it to
+    clients if `publish`. Called by the sensor jobs with live readings, or by
+    the replay driver with recorded ones. Returns the sample's channel values.
+    """
+    chamber = chamber or chambers.get_chamber(chambers.MAIN_CHAMBER)
+    current_data = samples.as_sample(current_data) # Sample dicts (e.g. from the simulation) are converted once here
+    values = chamber.update_stats(current_data) # Rolling windows: O(1) per channel and window
+    chamber.latest_data = current_data # Update latest data cache
+
+    # 3. Add to the chamber's buffer
+    chamber.buffer.append(current_data)
+
+    # 4. Publish via the broadcast hub (the dashboard shows the main chamber):
+    # encoded once, sent to each client at its rate class
+    if publish:
+        signature = current_data.values # What 'on-change' compares: the readings only
+        if chamber.name == chambers.MAIN_CHAMBER:
+            broadcast_hub.publish('update_dashboard', current_data, key=chamber.name, signature=signature)
+        else:
+            broadcast_hub.publish('update_chamber', {'chamber': chamber.name, 'data': current_data}, key=chamber.name, signature=signature)
+    return values
+
 def start_sensor_service():
-    """Starts the background thread for reading sensors."""
-    global _sensor_thread
-    if _sensor_thread is None or not _sensor_thread.is_alive():
-        _stop_event.clear()
-        _sensor_thread = threading.Thread(target=_sensor_reading_loop, daemon=True)
-        _sensor_thread.start()
-        logging.info("Sensor service thread started.")
-    else:
-        logging.warning("Sensor service thread already running.")
+    """
+    Registers one sensor reading job per chamber with the scheduler. Their
+    start times are spread over the read interval so the chambers' bus I/O
+    doesn't all land at once.
+    """
+    all_chambers = chambers.get_chambers()
+    for chamber in all_chambers:
+        _samplers[chamber.name] = sampling_policy.AdaptiveSampler(
+            [kind for kind in chambers.SENSOR_KINDS if chamber.has_sensor(kind)], READ_INTERVAL
+        )
+        for actuator in chamber.relay_pins:
+            _actuator_chambers[chamber.actuator_name(actuator)] = (chamber.name, HELD_KINDS.get(actuator, ()))
+    hw_gpio.add_transition_listener(_on_transition)
+    for i, chamber in enumerate(all_chambers):
+        scheduler.add_periodic_job(
+            chamber.job_name(JOB_NAME), functools.partial(_sensor_reading_job, chamber),
+            interval=READ_INTERVAL, start_delay=i * READ_INTERVAL / len(all_chambers)
+        )
+    logging.info(f"Sensor service started for {len(all_chambers)} chamber(s).")
 
 def stop_sensor_service():
-    """Signals the background sensor reading thread to stop."""
-    logging.info("Stopping sensor service thread...")
-    _stop_event.set()
-    if _sensor_thread and _sensor_thread.is_alive():
-        _sensor_thread.join(timeout=READ_INTERVAL * 2) # Wait for thread to finish
-        if _sensor_thread.is_alive():
-             logging.warning("Sensor service thread did not stop gracefully.")
-    _sensor_thread = None
-    logging.info("Sensor service thread stop signal sent.")
+    """Removes the sensor reading jobs from the scheduler."""
+    logging.info("Stopping sensor service...")
+    for chamber in chambers.get_chambers():
+        scheduler.remove_job(chamber.job_name(JOB_NAME))
+    logging.info("Sensor service stopped.")
 
 
-def get_buffered_data():
-    """Returns a list of recent sensor readings from the buffer."""
-    return list(_data_buffer)
+def get_sampling_status():
+    """Returns chamber name -> sensor kind -> current read interval, time to its next read and reads so far."""
+    now = time.monotonic()
+    return {name: sampler.status(now) for name, sampler in _samplers.items()}
 
-def get_latest_data():
-    """Returns the most recent sensor reading dictionary."""
-    return _latest_data.copy() # Return a copy
+def get_buffered_data(chamber_name=chambers.MAIN_CHAMBER):
+    """Returns a list of a chamber's recent sensor readings from its buffer."""
+    return list(chambers.get_chamber(chamber_name).buffer)
+
+def get_latest_data(chamber_name=chambers.MAIN_CHAMBER):
+    """Returns a chamber's most recent samples.Sample ({} before the first one). Samples aren't modified, so no copy is needed."""
+    return chambers.get_chamber(chamber_name).latest_data
+
+def get_stats(chamber_name=chambers.MAIN_CHAMBER):
+    """
+    Returns a chamber's rolling statistics as of its latest sample: channel ->
+    window label ('10s', '1m', ...) -> WindowStats(count, mean, variance, min,
+    max, slope per minute). Precomputed per sample, so this is a lookup.
+    """
+    return chambers.get_chamber(chamber_name).stats
 
 # --- SocketIO Event Handlers ---
 # Moved handler registration here to keep service logic together
@@ -134,11 +193,11 @@ def register_socketio_handlers(socketio_instance):
          logging.debug("Client requested buffered data.")
          buffered_data = get_buffered_data()
          for data in buffered_data:
-             # Use emit from the passed instance or the global one
-             socketio.emit('update_dashboard', data) # Emitting to the requesting client context
+             emit('update_dashboard', data.to_dict()) # To the requesting client only
          logging.debug(f"Sent {len(buffered_data)} buffered data points.")
 
 # Note:
-# - start_sensor_service() should be called once during application startup.
+# - start_sensor_service() should be called once during application startup,
+#   before scheduler.start().
 # - stop_sensor_service() could be called during shutdown (e.g., via atexit).
 # - register_socketio_handlers(socketio) should be called after socketio is initialized.
\ No newline at end of file
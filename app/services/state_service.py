@@ -0,0 +1,86 @@
+import json
+import logging
+import threading
+import time
+
+from app import socketio
+from app.hardware import gpio_devices as hw_gpio
+from app.services import chambers
+from app.services import samples
+from app.services import sensor_service
+
+# --- Constants ---
+POLL_STEP = 0.1 # Seconds between version checks while a long-poll waits (cooperative sleep)
+
+# --- State Variables ---
+# The state served at /api/state is rebuilt only when a version changes: device
+# versions move on actuator changes, sensor versions on every sample. Pollers
+# that only want actuator state leave sensors out, so samples don't wake them.
+_lock = threading.Lock()
+_boot_id = format(int(time.time()), 'x') # Keeps ETags from matching across restarts
+_device_version = 0
+_sensor_version = 0
+_cache = {} # include_sensors -> (etag, JSON body bytes) of the last state built
+
+# --- Listeners ---
+def _on_device_state(device_name, state):
+    """gpio_devices state listener."""
+    global _device_version
+    with _lock:
+        _device_version += 1
+
+def _on_sample(chamber, data):
+    """sensor_service sample listener."""
+    global _sensor_version
+    with _lock:
+        _sensor_version += 1
+
+# --- Public Functions ---
+def current_etag(include_sensors=True):
+    """Returns the (unquoted) ETag of the current state."""
+    if include_sensors:
+        return f"{_boot_id}-{_device_version}-{_sensor_version}"
+    return f"{_boot_id}-{_device_version}"
+
+def get_state(include_sensors=True):
+    """
+    Returns (etag, body): the current actuator states, pump speed and (unless
+    excluded) each chamber's latest reading, encoded as JSON once per version.
+    """
+    etag = current_etag(include_sensors)
+    cached = _cache.get(include_sensors)
+    if cached is not None and cached[0] == etag:
+        return cached
+    state = {
+        'version': etag,
+        'devices': hw_gpio.get_all_device_states(),
+        'pump_speed': hw_gpio.get_pump_speed(),
+    }
+    if include_sensors:
+        state['sensors'] = {chamber.name: chamber.latest_data for chamber in chambers.get_chambers()}
+    cached = (etag, json.dumps(state, default=samples.json_default).encode('utf-8'))
+    _cache[include_sensors] = cached
+    return cached
+
+def wait_for_change(etag, include_sensors=True, timeout=0.0):
+    """
+    Waits up to `timeout` seconds for the state to move past `etag`, sleeping
+    cooperatively (a waiting request holds no thread under eventlet). Returns
+    True if it changed.
+    """
+    deadline = time.monotonic() + timeout
+    while current_etag(include_sensors) == etag:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        socketio.sleep(min(POLL_STEP, remaining))
+    return True
+
+def start_state_service():
+    """Starts tracking actuator changes and samples for /api/state."""
+    hw_gpio.add_state_listener(_on_device_state)
+    sensor_service.add_sample_listener(_on_sample)
+    logging.info("State service started.")
+
+# Note: start_state_service() should be called once during application startup,
+# alongside the other services.
@@ -0,0 +1,116 @@
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+
+from config import Config
+from app import socketio
+from app.services import chambers
+from app.services import samples
+from app.services import sensor_service
+
+# --- Constants ---
+EVENT_NAME = 'update_dashboard' # Same event name and payload as the SocketIO dashboard feed
+POLL_STEP = 0.25       # Seconds between ring checks of an idle stream (cooperative sleep)
+KEEPALIVE_INTERVAL = 15.0 # Seconds of silence before a comment line keeps proxies from closing the stream
+RETRY_MS = 3000        # Reconnect delay suggested to EventSource clients
+
+_boot_id = format(int(time.time()), 'x') # Event ids are "<boot>-<n>", so ids from before a restart aren't resumed
+
+# --- Ring Buffer ---
+class EventRing:
+    """
+    The last `size` samples of one chamber as ready-to-send SSE frames with
+    consecutive ids. Each sample is encoded once and the same bytes go to
+    every stream, so a viewer costs only its last sent id.
+    """
+    def __init__(self, size):
+        self._frames = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.last_id = 0
+
+    def append(self, data):
+        frame_data = samples.dumps(data) # Encoded outside the lock (a sample's JSON is shared with the other sinks)
+        with self._lock:
+            self.last_id += 1
+            self._frames.append(f"id: {_boot_id}-{self.last_id}\nevent: {EVENT_NAME}\ndata: {frame_data}\n\n".encode('utf-8'))
+
+    def frames_after(self, event_id):
+        """
+        Returns (last id, frames): the frames newer than event_id still in the
+        ring (all of them if it has wrapped past it) and the id of the newest.
+        """
+        with self._lock:
+            count = min(self.last_id - event_id, len(self._frames))
+            if count <= 0:
+                return self.last_id, []
+            return self.last_id, list(itertools.islice(self._frames, len(self._frames) - count, None))
+
+# --- State Variables ---
+_rings = {} # Chamber name -> EventRing
+_lock = threading.Lock()
+_streams = 0 # Open streams
+
+# --- Private Functions ---
+def _on_sample(chamber, data):
+    """sensor_service sample listener."""
+    ring = _rings.get(chamber.name)
+    if ring is not None:
+        ring.append(data)
+
+# --- Public Functions ---
+def start_stream_service():
+    """Creates a ring per chamber and starts recording samples into them."""
+    for chamber in chambers.get_chambers():
+        _rings[chamber.name] = EventRing(Config.STREAM_BUFFER_SIZE)
+    sensor_service.add_sample_listener(_on_sample)
+    logging.info(f"Event stream service started ({Config.STREAM_BUFFER_SIZE} samples buffered per chamber).")
+
+def has_stream(chamber_name):
+    return chamber_name in _rings
+
+def parse_event_id(value):
+    """Returns the sequence number of a Last-Event-ID header, or None if it is missing, malformed or from another run."""
+    boot_id, _, number = (value or '').rpartition('-')
+    if boot_id != _boot_id or not number.isdigit():
+        return None
+    return int(number)
+
+def stream_events(chamber_name, last_event_id=None):
+    """
+    Generator of SSE frames for a chamber's samples. Resumes after
+    `last_event_id` (see parse_event_id()) with the
+    samples it missed that are still buffered; a new client starts with the
+    latest sample. Idles with cooperative sleeps, so an open stream holds no
+    thread under eventlet.
+    """
+    global _streams
+    ring = _rings[chamber_name]
+    if last_event_id is None or last_event_id > ring.last_id:
+        last_event_id = max(ring.last_id - 1, 0)
+    with _lock:
+        _streams += 1
+    try:
+        yield f"retry: {RETRY_MS}\n\n".encode('utf-8')
+        last_sent = time.monotonic()
+        while True:
+            newest_id, frames = ring.frames_after(last_event_id)
+            if frames:
+                last_event_id = newest_id
+                yield b''.join(frames)
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= KEEPALIVE_INTERVAL:
+                yield b": keepalive\n\n"
+                last_sent = time.monotonic()
+            socketio.sleep(POLL_STEP)
+    finally:
+        with _lock:
+            _streams -= 1
+
+def get_status():
+    """Returns the number of open streams and the last event id per chamber."""
+    return {'streams': _streams, 'last_ids': {name: ring.last_id for name, ring in _rings.items()}}
+
+# Note: start_stream_service() should be called once during application
+# startup, after chambers are loaded.
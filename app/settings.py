@@ -0,0 +1,145 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from config import Config
+from app import database
+from app.services.chambers import MAIN_CHAMBER
+
+# --- Constants ---
+# Editable settings: name -> (default, minimum, maximum). All are numbers.
+FIELDS = {
+    'co2_threshold': (Config.CO2_THRESHOLD, 0.1, 20.0),           # %
+    'o2_threshold': (Config.O2_THRESHOLD, 0.0, 21.0),             # % (O2 control not implemented yet)
+    'temp_lower_bound': (Config.TEMP_LOWER_BOUND, 20.0, 45.0),    # C
+    'temp_upper_bound': (Config.TEMP_UPPER_BOUND, 20.0, 45.0),    # C
+    'temp_control_interval': (Config.TEMP_CONTROL_INTERVAL, 1.0, 600.0),   # s
+    'co2_control_interval': (Config.CO2_CONTROL_INTERVAL, 1.0, 3600.0),    # s
+    'co2_solenoid_on_time': (Config.CO2_SOLENOID_ON_TIME, 0.05, 5.0),      # s
+}
+
+# Immutable snapshot of one chamber's settings plus where they came from.
+# Version 0 is the Config defaults (nothing saved yet for that chamber).
+Settings = namedtuple('Settings', ['chamber', 'version', 'updated_by', 'updated_at', *FIELDS])
+
+# --- Exceptions ---
+class SettingsError(ValueError):
+    """Raised when a change fails validation (reported to the client as 400)."""
+
+class SettingsConflictError(SettingsError):
+    """Raised when the settings changed since the version the caller edited (409)."""
+
+# --- State Variables ---
+# Chamber name -> current snapshot. Readers take a snapshot with a plain dict
+# lookup and never lock; writers build a complete new snapshot and publish a
+# new dict (copy-on-write).
+_current = {}
+_write_lock = threading.Lock()
+
+# --- Private Functions ---
+def _defaults(chamber):
+    return Settings(chamber, 0, None, None, **{name: spec[0] for name, spec in FIELDS.items()})
+
+def _validate(values):
+    """Checks a complete set of values and returns them as floats."""
+    clean = {}
+    for name, (_, minimum, maximum) in FIELDS.items():
+        value = values[name]
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise SettingsError(f"'{name}' must be a number")
+        if not minimum <= value <= maximum:
+            raise SettingsError(f"'{name}' must be between {minimum} and {maximum}")
+        clean[name] = float(value)
+    if clean['temp_lower_bound'] >= clean['temp_upper_bound']:
+        raise SettingsError("'temp_lower_bound' must be below 'temp_upper_bound'")
+    return clean
+
+def _snapshot_from_row(chamber, row):
+    version, data, username, created_at = row
+    values = {name: spec[0] for name, spec in FIELDS.items()}
+    values.update({name: value for name, value in json.loads(data).items() if name in FIELDS}) # Fields added later keep defaults
+    return Settings(chamber, version, username, created_at, **values)
+
+def _publish(snapshot):
+    global _current
+    _current = {**_current, snapshot.chamber: snapshot}
+
+def _load_newer_versions():
+    """Loads every chamber whose latest stored version is newer than its snapshot. Call with _write_lock held."""
+    loaded = []
+    for chamber, version in database.get_latest_settings_versions().items():
+        if version > current(chamber).version:
+            _publish(_snapshot_from_row(chamber, database.get_settings_version(version)))
+            loaded.append(chamber)
+    return loaded
+
+# --- Public Functions ---
+def current(chamber=MAIN_CHAMBER):
+    """
+    Returns a chamber's current settings snapshot. Control loops call this
+    once per cycle and use that snapshot throughout, so a cycle never mixes
+    versions.
+    """
+    return _current.get(chamber) or _defaults(chamber)
+
+def load():
+    """Loads the latest saved version of every chamber from the database (call after init_db())."""
+    with _write_lock:
+        _load_newer_versions()
+    for chamber, snapshot in _current.items():
+        logging.info(f"Settings version {snapshot.version} loaded for chamber '{chamber}'.")
+
+def reload():
+    """
+    Picks up versions saved by another process (e.g. a CLI edit), if any.
+    Cheap enough to run every few seconds: one indexed GROUP BY query.
+    """
+    with _write_lock:
+        loaded = _load_newer_versions()
+    for chamber in loaded:
+        snapshot = _current[chamber]
+        logging.info(f"Settings version {snapshot.version} loaded for chamber '{chamber}' (saved by '{snapshot.updated_by}').")
+    return bool(loaded)
+
+def update(changes, username=None, expected_version=None, chamber=MAIN_CHAMBER):
+    """
+    Validates `changes` (setting name -> value) against a chamber's current
+    settings, saves them as a new version and publishes the new snapshot. If
+    expected_version is given and the settings have moved on since, raises
+    SettingsConflictError instead of overwriting someone else's edit.
+    """
+    unknown = [name for name in changes if name not in FIELDS]
+    if unknown:
+        raise SettingsError(f"Unknown settings: {', '.join(unknown)}. Available: {', '.join(FIELDS)}")
+
+    with _write_lock:
+        _load_newer_versions() # Saved by another process since the last reload
+        base = current(chamber)
+        if expected_version is not None and expected_version != base.version:
+            raise SettingsConflictError(f"Settings are at version {base.version}, not {expected_version}")
+        values = {name: getattr(base, name) for name in FIELDS}
+        values.update(changes)
+        values = _validate(values)
+        version = database.get_latest_settings_version() + 1
+        try:
+            database.add_settings_version(version, json.dumps(values), username, chamber)
+        except sqlite3.IntegrityError:
+            raise SettingsConflictError("Settings were changed by another process; reload and retry")
+        snapshot = Settings(chamber, version, username, time.time(), **values)
+        _publish(snapshot)
+
+    logging.info(f"Settings version {version} saved for chamber '{chamber}' by '{username}': {changes}")
+    return snapshot
+
+def history(chamber=MAIN_CHAMBER, limit=50):
+    """Returns a chamber's most recent saved versions, newest first."""
+    entries = database.list_settings_versions(chamber, limit)
+    for entry in entries:
+        entry['data'] = json.loads(entry['data'])
+    return entries
+
+def as_dict(snapshot=None):
+    """Returns a snapshot (default: the main chamber's) as a JSON-serializable dict."""
+    return (snapshot or current())._asdict()
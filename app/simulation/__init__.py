@@ -0,0 +1 @@
+# This file marks the 'simulation' directory as a Python package.
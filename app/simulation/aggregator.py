@@ -0,0 +1,114 @@
+import argparse
+import gzip
+import json
+import logging
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# --- Constants ---
+DEFAULT_PORT = 8086
+DEFAULT_OUTPUT = "telemetry_received.ndjson"
+
+# --- Aggregator ---
+class Aggregator:
+    """
+    Local stand-in for the central telemetry aggregator. Stores each record
+    once per (box, stream, id) as one NDJSON line and acknowledges the last
+    id stored; records it has already stored (a resend after a lost ack) are
+    acknowledged again but not duplicated.
+
+    `fail_rate` refuses that fraction of requests and `lose_ack_rate` stores
+    a batch but drops the connection before replying, to exercise the
+    uplink's retries on a bad link.
+    """
+    def __init__(self, output_path=DEFAULT_OUTPUT, fail_rate=0.0, lose_ack_rate=0.0, seed=None):
+        self.output_path = output_path
+        self.fail_rate = fail_rate
+        self.lose_ack_rate = lose_ack_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._last_ids = {} # (box, stream) -> highest record id stored
+        self.stats = {'batches': 0, 'stored': 0, 'duplicates': 0, 'refused': 0, 'acks_lost': 0}
+
+    def receive(self, body, encoding=None):
+        """
+        Stores one batch. Returns the id to acknowledge, or None to simulate a
+        lost ack. Raises ValueError for a malformed batch and ConnectionError
+        for a refused request.
+        """
+        with self._lock:
+            if self._random.random() < self.fail_rate:
+                self.stats['refused'] += 1
+                raise ConnectionError("Simulated link failure")
+            batch = json.loads(gzip.decompress(body) if encoding == 'gzip' else body)
+            key = (batch['box'], batch['stream'])
+            last_id = self._last_ids.get(key, 0)
+            new_records = [record for record in batch['records'] if record['id'] > last_id]
+            self.stats['duplicates'] += len(batch['records']) - len(new_records)
+            with open(self.output_path, 'a') as file:
+                for record in new_records:
+                    file.write(json.dumps(dict(record, box=batch['box'], stream=batch['stream'])) + '\n')
+            if new_records:
+                self._last_ids[key] = new_records[-1]['id']
+            self.stats['batches'] += 1
+            self.stats['stored'] += len(new_records)
+            if self._random.random() < self.lose_ack_rate:
+                self.stats['acks_lost'] += 1
+                return None
+            return self._last_ids.get(key, last_id)
+
+def _make_handler(aggregator):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            try:
+                acked = aggregator.receive(body, self.headers.get('Content-Encoding'))
+            except ConnectionError:
+                self.send_error(503)
+                return
+            except (ValueError, KeyError, TypeError) as e:
+                self.send_error(400, str(e))
+                return
+            if acked is None:
+                self.close_connection = True # Stored, but the client never hears back
+                return
+            reply = json.dumps({'acked': acked}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+        def log_message(self, format, *args):
+            logging.debug(f"Aggregator: {format % args}")
+    return Handler
+
+def serve(aggregator, port=DEFAULT_PORT, host='127.0.0.1'):
+    """Starts an HTTP server for the aggregator on a background thread and returns it."""
+    server = ThreadingHTTPServer((host, port), _make_handler(aggregator))
+    threading.Thread(target=server.serve_forever, daemon=True, name='aggregator').start()
+    return server
+
+def _main():
+    parser = argparse.ArgumentParser(description="Local telemetry aggregator for testing the uplink.")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="NDJSON file the records are appended to")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="Fraction of requests refused with 503")
+    parser.add_argument('--lose-ack-rate', type=float, default=0.0, help="Fraction of batches stored without replying")
+    args = parser.parse_args()
+
+    aggregator = Aggregator(args.output, args.fail_rate, args.lose_ack_rate)
+    server = ThreadingHTTPServer(('0.0.0.0', args.port), _make_handler(aggregator))
+    logging.info(f"Aggregator listening on port {args.port}, writing to {args.output}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+        logging.info(f"Aggregator stopped: {aggregator.stats}")
+
+if __name__ == "__main__":
+    _main()
+
+# Usage: python -m app.simulation.aggregator --port 8086
+# then run the app with TELEMETRY_URL=http://127.0.0.1:8086/
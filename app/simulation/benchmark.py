@@ -0,0 +1,211 @@
+import argparse
+import itertools
+import logging
+
+from app import settings
+from app.hardware import gpio_devices as hw_gpio
+from app.services import control_service
+from app.simulation.chamber import ChamberModel
+
+# --- Constants ---
+TICK = 0.1              # s, simulation resolution (CO2 pulses are 0.1 s)
+SAMPLE_INTERVAL = 1.0   # s, as sensor_service.READ_INTERVAL
+DEFAULT_DURATION = 6 * 3600.0
+CO2_BAND = 0.3          # %, +/- around the CO2 threshold counted as "in band"
+
+# --- Strategies ---
+# A strategy is called every `interval` simulated seconds with the latest
+# reading and returns a list of (device, state, duration) actions; a duration
+# turns the device back off after that many seconds (pulses).
+class HysteresisHeater:
+    """control_service.decide_heater, as run by the live temperature loop."""
+    def __init__(self, interval=None):
+        self.interval = interval or settings.current().temp_control_interval
+        self.name = f"hysteresis-{self.interval:g}s"
+        self.state = 'off'
+
+    def __call__(self, reading, now):
+        average = control_service.average_control_temperature(reading['temperatures'])
+        if average is None:
+            return []
+        new_state = control_service.decide_heater(average, self.state)
+        if new_state is None:
+            return []
+        self.state = new_state
+        return [(hw_gpio.ITO_HEATING, new_state, None)]
+
+class TimeProportionalHeater:
+    """Candidate: PI controller driving heater duty over a fixed window."""
+    def __init__(self, window=20.0, kp=0.5, ki=0.002):
+        self.interval = 1.0
+        self.name = f"pi-duty-{window:g}s"
+        self.window = window
+        self.kp = kp
+        self.ki = ki
+        self.integral = 0.0
+        self.duty = 0.0
+        self.state = 'off'
+
+    def __call__(self, reading, now):
+        average = control_service.average_control_temperature(reading['temperatures'])
+        phase = now % self.window
+        if average is not None and phase < self.interval: # Recompute duty once per window
+            setpoint = (settings.current().temp_lower_bound + settings.current().temp_upper_bound) / 2
+            error = setpoint - average
+            self.integral = min(max(self.integral + error * self.window, -1.0 / self.ki), 1.0 / self.ki)
+            self.duty = min(max(self.kp * error + self.ki * self.integral, 0.0), 1.0)
+        new_state = 'on' if phase < self.duty * self.window else 'off'
+        if new_state == self.state:
+            return []
+        self.state = new_state
+        return [(hw_gpio.ITO_HEATING, new_state, None)]
+
+class PulseCO2:
+    """control_service.decide_co2 with fixed co2_solenoid_on_time pulses, as the live CO2 loop."""
+    def __init__(self, interval=None, on_time=None):
+        self.interval = interval or settings.current().co2_control_interval
+        self.on_time = on_time or settings.current().co2_solenoid_on_time
+        self.name = f"pulse-{self.interval:g}s"
+
+    def __call__(self, reading, now):
+        action = control_service.decide_co2(reading['co2'], 'off')
+        if action == control_service.CO2_PULSE:
+            return [(hw_gpio.CO2_SOLENOID, 'on', self.on_time)]
+        return []
+
+class ProportionalPulseCO2:
+    """Candidate: pulse length proportional to the distance below the threshold."""
+    def __init__(self, interval=None, gain=0.5, max_on_time=1.0):
+        self.interval = interval or settings.current().co2_control_interval
+        self.gain = gain
+        self.max_on_time = max_on_time
+        self.name = f"proportional-pulse-{self.interval:g}s"
+
+    def __call__(self, reading, now):
+        if control_service.decide_co2(reading['co2'], 'off') != control_service.CO2_PULSE:
+            return []
+        on_time = min(self.max_on_time, max(TICK, self.gain * (settings.current().co2_threshold - reading['co2'])))
+        return [(hw_gpio.CO2_SOLENOID, 'on', round(on_time / TICK) * TICK)]
+
+HEATER_STRATEGIES = {
+    'hysteresis-10s': lambda: HysteresisHeater(10.0),
+    'hysteresis-1s': lambda: HysteresisHeater(1.0),
+    'pi-duty-20s': lambda: TimeProportionalHeater(20.0),
+}
+CO2_STRATEGIES = {
+    'pulse-30s': lambda: PulseCO2(30.0),
+    'pulse-10s': lambda: PulseCO2(10.0),
+    'proportional-pulse-30s': lambda: ProportionalPulseCO2(30.0),
+}
+
+# --- Simulation ---
+def run_closed_loop(heater_strategy, co2_strategy, duration=DEFAULT_DURATION, parameters=None, seed=0):
+    """
+    Runs the chamber model under two strategies in accelerated simulated time
+    and returns the control scores.
+    """
+    model = ChamberModel(parameters, seed=seed)
+    strategies = [heater_strategy, co2_strategy]
+    next_run = [0.0, 0.0]
+    off_at = {} # Device -> simulated time a pulse ends
+    reading = model.read_sensors()
+    next_sample = 0.0
+
+    snapshot = settings.current()
+    lower, upper = snapshot.temp_lower_bound, snapshot.temp_upper_bound
+    co2_low, co2_high = snapshot.co2_threshold - CO2_BAND, snapshot.co2_threshold + CO2_BAND
+    steps = int(round(duration / TICK))
+    temp_in_band_steps = co2_in_band_steps = 0
+    last_temp_out_of_band = last_co2_out_of_band = 0.0
+    max_temperature = max_co2 = float('-inf')
+    entered_band = False
+    cycles = {hw_gpio.ITO_HEATING: 0, hw_gpio.CO2_SOLENOID: 0}
+    on_time = {hw_gpio.ITO_HEATING: 0.0, hw_gpio.CO2_SOLENOID: 0.0}
+
+    for step in range(steps):
+        now = step * TICK
+        for device, end_time in list(off_at.items()):
+            if now >= end_time - 1e-9:
+                model.set_actuator(device, 'off')
+                del off_at[device]
+        if now >= next_sample - 1e-9:
+            reading = model.read_sensors(now)
+            next_sample += SAMPLE_INTERVAL
+        for i, strategy in enumerate(strategies):
+            if now >= next_run[i] - 1e-9:
+                next_run[i] += strategy.interval
+                for device, state, pulse in strategy(reading, now):
+                    if state == 'on' and model.actuators[device] != 'on':
+                        cycles[device] += 1
+                    model.set_actuator(device, state)
+                    if pulse:
+                        off_at[device] = now + pulse
+
+        model.step(TICK)
+
+        for device in on_time:
+            if model.actuators[device] == 'on':
+                on_time[device] += TICK
+        temperature = model.chamber_temperature
+        if lower <= temperature <= upper:
+            temp_in_band_steps += 1
+            entered_band = True
+        else:
+            last_temp_out_of_band = model.time
+        if entered_band:
+            max_temperature = max(max_temperature, temperature)
+        if co2_low <= model.co2 <= co2_high:
+            co2_in_band_steps += 1
+        else:
+            last_co2_out_of_band = model.time
+        max_co2 = max(max_co2, model.co2)
+
+    return {
+        'heater_strategy': heater_strategy.name,
+        'co2_strategy': co2_strategy.name,
+        'temp_settling_time_s': round(last_temp_out_of_band, 1) if last_temp_out_of_band < duration - TICK else None, # None: never settled
+        'temp_overshoot_c': round(max(0.0, max_temperature - upper), 3) if entered_band else None,
+        'temp_time_in_band': round(temp_in_band_steps / steps, 4),
+        'heater_cycles': cycles[hw_gpio.ITO_HEATING],
+        'heater_duty': round(on_time[hw_gpio.ITO_HEATING] / duration, 4),
+        'co2_settling_time_s': round(last_co2_out_of_band, 1) if last_co2_out_of_band < duration - TICK else None,
+        'co2_overshoot_pct': round(max(0.0, max_co2 - co2_high), 3),
+        'co2_time_in_band': round(co2_in_band_steps / steps, 4),
+        'co2_pulses': cycles[hw_gpio.CO2_SOLENOID],
+        'co2_open_time_s': round(on_time[hw_gpio.CO2_SOLENOID], 1),
+    }
+
+def run_benchmark(duration=DEFAULT_DURATION, heater_names=None, co2_names=None, seed=0):
+    """Scores every combination of the selected heater and CO2 strategies."""
+    heater_names = heater_names or list(HEATER_STRATEGIES)
+    co2_names = co2_names or list(CO2_STRATEGIES)
+    return [
+        run_closed_loop(HEATER_STRATEGIES[h](), CO2_STRATEGIES[c](), duration=duration, seed=seed)
+        for h, c in itertools.product(heater_names, co2_names)
+    ]
+
+def _main():
+    parser = argparse.ArgumentParser(description="Score heater and CO2 control strategies against the simulated chamber.")
+    parser.add_argument('--hours', type=float, default=DEFAULT_DURATION / 3600, help="Simulated duration per run")
+    parser.add_argument('--heater', action='append', choices=list(HEATER_STRATEGIES), help="Heater strategy (repeatable, default: all)")
+    parser.add_argument('--co2', action='append', choices=list(CO2_STRATEGIES), help="CO2 strategy (repeatable, default: all)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    results = run_benchmark(args.hours * 3600, args.heater, args.co2, args.seed)
+    columns = [
+        ('heater_strategy', 'heater', 15), ('co2_strategy', 'co2', 23),
+        ('temp_settling_time_s', 'T settle s', 10), ('temp_overshoot_c', 'T over C', 8),
+        ('temp_time_in_band', 'T in band', 9), ('heater_cycles', 'heater cyc', 10),
+        ('co2_settling_time_s', 'CO2 settle s', 12), ('co2_overshoot_pct', 'CO2 over %', 10),
+        ('co2_time_in_band', 'CO2 in band', 11), ('co2_pulses', 'CO2 pulses', 10),
+    ]
+    print(' '.join(f"{title:>{width}}" for _, title, width in columns))
+    for result in results:
+        print(' '.join(f"{str(result[key]):>{width}}" for key, _, width in columns))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    _main()
+
+# Usage: python -m app.simulation.benchmark --hours 6
@@ -0,0 +1,116 @@
+import math
+import random
+
+from app.hardware import gpio_devices as hw_gpio
+
+# --- Constants ---
+# Default plant parameters for the transport chamber (SI units unless noted).
+# Steady state at 37 C in a 20 C room needs ~28% heater duty; the chamber's
+# thermal time constant is ~40 min and the air is exchanged about once per hour.
+DEFAULT_PARAMETERS = {
+    'ambient_temperature': 20.0,  # C
+    'initial_temperature': 22.0,  # C, chamber and heater at start
+    'chamber_heat_capacity': 600.0, # J/K, air, walls and culture vessels
+    'heater_heat_capacity': 50.0,   # J/K, ITO heater element
+    'heater_power': 15.0,           # W when ITO_HEATING is on
+    'heater_coupling': 1.0,         # W/K, heater element -> chamber
+    'loss_conductance': 0.25,       # W/K, chamber -> ambient
+    'temperature_sensor_lag': 5.0,  # s, first-order probe time constant
+    'temperature_noise': 0.01,      # C, standard deviation
+    'volume': 5.0,                  # L
+    'co2_flow': 0.1,                # L/s through the open CO2 solenoid
+    'argon_flow': 0.1,              # L/s through the open argon solenoid
+    'leak_rate': 1.0 / 3600.0,      # 1/s, fraction of gas exchanged with room air
+    'ambient_co2': 0.04,            # %
+    'ambient_o2': 20.9,             # %
+    'initial_co2': 0.04,            # %
+    'co2_sensor_lag': 15.0,         # s
+    'o2_sensor_lag': 10.0,          # s
+    'gas_noise': 0.005,             # %, standard deviation
+    'humidity': 45.0,               # %, not modelled, reported constant
+}
+MAX_STEP = 0.1 # s, integration sub-step
+
+# --- Model ---
+class ChamberModel:
+    """
+    Deterministic lumped model of the chamber, driven by the actuator states
+    (ITO_HEATING, CO2_SOLENOID, ARGON_SOLENOID) and producing synthetic sensor
+    readings in the same format as sensor_service samples.
+
+    Thermal: heater element and chamber as two heat capacities, with losses
+    to ambient. Gas: CO2/argon inflow while a solenoid is open, plus leakage
+    towards room air. Sensors: first-order lag plus seeded Gaussian noise.
+    """
+    def __init__(self, parameters=None, seed=0):
+        self.p = dict(DEFAULT_PARAMETERS, **(parameters or {}))
+        self._rng = random.Random(seed)
+        self.time = 0.0
+        self.chamber_temperature = self.p['initial_temperature']
+        self.heater_temperature = self.p['initial_temperature']
+        self.co2 = self.p['initial_co2']
+        self.o2 = self.p['ambient_o2']
+        self.actuators = {hw_gpio.ITO_HEATING: 'off', hw_gpio.CO2_SOLENOID: 'off', hw_gpio.ARGON_SOLENOID: 'off'}
+        # Lagged sensor states
+        self._sensed_chamber = self.chamber_temperature
+        self._sensed_heater = self.heater_temperature
+        self._sensed_co2 = self.co2
+        self._sensed_o2 = self.o2
+
+    def set_actuator(self, device_name, state):
+        """Sets an actuator to 'on' or 'off' (same names as gpio_devices)."""
+        if device_name not in self.actuators:
+            raise ValueError(f"Unknown actuator: {device_name}")
+        self.actuators[device_name] = state
+
+    def _lag(self, sensed, actual, tau, dt):
+        return sensed + (actual - sensed) * (1.0 - math.exp(-dt / tau))
+
+    def _integrate(self, dt):
+        p = self.p
+        heater_power = p['heater_power'] if self.actuators[hw_gpio.ITO_HEATING] == 'on' else 0.0
+        to_chamber = p['heater_coupling'] * (self.heater_temperature - self.chamber_temperature)
+        to_ambient = p['loss_conductance'] * (self.chamber_temperature - p['ambient_temperature'])
+        self.heater_temperature += (heater_power - to_chamber) / p['heater_heat_capacity'] * dt
+        self.chamber_temperature += (to_chamber - to_ambient) / p['chamber_heat_capacity'] * dt
+
+        # Well-mixed gas: inflow replaces chamber gas at rate flow/volume
+        co2_in = p['co2_flow'] / p['volume'] if self.actuators[hw_gpio.CO2_SOLENOID] == 'on' else 0.0
+        argon_in = p['argon_flow'] / p['volume'] if self.actuators[hw_gpio.ARGON_SOLENOID] == 'on' else 0.0
+        leak = p['leak_rate']
+        self.co2 += (co2_in * (100.0 - self.co2) - argon_in * self.co2 - leak * (self.co2 - p['ambient_co2'])) * dt
+        self.o2 += (-(co2_in + argon_in) * self.o2 - leak * (self.o2 - p['ambient_o2'])) * dt
+
+        self._sensed_chamber = self._lag(self._sensed_chamber, self.chamber_temperature, p['temperature_sensor_lag'], dt)
+        self._sensed_heater = self._lag(self._sensed_heater, self.heater_temperature, p['temperature_sensor_lag'], dt)
+        self._sensed_co2 = self._lag(self._sensed_co2, self.co2, p['co2_sensor_lag'], dt)
+        self._sensed_o2 = self._lag(self._sensed_o2, self.o2, p['o2_sensor_lag'], dt)
+        self.time += dt
+
+    def step(self, dt):
+        """Advances simulated time by dt seconds."""
+        while dt > 1e-12:
+            sub_step = min(dt, MAX_STEP)
+            self._integrate(sub_step)
+            dt -= sub_step
+
+    def read_sensors(self, timestamp=None):
+        """Returns a sample dict shaped like sensor_service readings."""
+        noise = self._rng.gauss
+        t_noise = self.p['temperature_noise']
+        g_noise = self.p['gas_noise']
+        near_heater = 0.7 * self._sensed_chamber + 0.3 * self._sensed_heater
+        temperatures = [
+            near_heater + noise(0, t_noise),
+            near_heater + noise(0, t_noise),
+            self._sensed_chamber - 0.03 + noise(0, t_noise), # Control sensors (3 and 4)
+            self._sensed_chamber + 0.03 + noise(0, t_noise),
+            self._sensed_chamber + noise(0, t_noise),        # Chamber temperature shown on the OLED
+        ]
+        return {
+            'timestamp': self.time if timestamp is None else timestamp,
+            'temperatures': [round(t, 2) for t in temperatures],
+            'humidity': self.p['humidity'],
+            'o2': round(max(0.0, self._sensed_o2 + noise(0, g_noise)), 2),
+            'co2': round(max(0.0, self._sensed_co2 + noise(0, g_noise)), 2),
+        }
@@ -0,0 +1,218 @@
+import argparse
+import heapq
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import settings
+from app.hardware import gpio_devices as hw_gpio
+from app.hardware import registry as hw_registry
+from app.services import chambers
+from app.services import control_service
+from app.services import datalog_service
+from app.services import scheduler
+from app.services import sensor_service
+from app.simulation.chamber import ChamberModel
+
+# --- Constants ---
+# Blocking waits of one chamber read on real hardware. The threads sleep
+# through them (no CPU, bus free for other transfers), so they limit how many
+# chambers the I/O pool can serve rather than how much CPU is used.
+PROBE_READ_TIME = 0.075  # s per MAX31865 probe: one-shot bias settle + conversion in adafruit_max31865
+OXYGEN_READ_TIME = 0.005 # s, one I2C register read
+CO2_READ_TIME = 0.2      # s, serial_comms.read_co2_value() response wait
+DEFAULT_CHAMBER_COUNTS = (1, 2, 4, 8, 16, 32)
+DEFAULT_DURATION = 10.0  # s of wall time per chamber count
+MAX_LATE_FRACTION = 0.01 # A chamber count is sustained if <= 1% of samples are late and none are skipped
+
+# --- Simulated Chamber ---
+class SimulatedChamber(chambers.Chamber):
+    """
+    A Chamber whose sensors and relays are backed by a ChamberModel, with the
+    blocking waits of the real drivers reproduced by sleeping.
+    """
+    def __init__(self, name, log_dir, probes=5, seed=0):
+        super().__init__(
+            name,
+            temperature_cs_pins=[f"SIM{i}" for i in range(probes)],
+            relay_pins={hw_gpio.ITO_HEATING: None, hw_gpio.CO2_SOLENOID: None},
+            control_sensors=chambers.DEFAULT_CONTROL_SENSORS if probes >= 4 else (0,),
+            oxygen_address=0,
+            co2_port='sim',
+        )
+        self.log_file = os.path.join(log_dir, f"sensor_data_{name}.csv")
+        self.model = ChamberModel(seed=seed)
+        self._model_lock = threading.Lock()
+        self._model_time = time.monotonic()
+
+    def is_usable(self, kind):
+        return self.has_sensor(kind)
+
+    def _reading(self):
+        with self._model_lock:
+            now = time.monotonic()
+            self.model.step(now - self._model_time)
+            self._model_time = now
+            return self.model.read_sensors()
+
+    def read_temperatures(self):
+        time.sleep(PROBE_READ_TIME * len(self.temperature_cs_pins))
+        return self._reading()['temperatures'][:len(self.temperature_cs_pins)]
+
+    def read_humidity(self):
+        return self._reading()['humidity']
+
+    def read_oxygen(self):
+        time.sleep(OXYGEN_READ_TIME)
+        return self._reading()['o2']
+
+    def read_co2(self):
+        time.sleep(CO2_READ_TIME)
+        return self._reading()['co2']
+
+    def get_actuator_state(self, actuator):
+        return self.model.actuators.get(actuator)
+
+    def set_actuator_state(self, actuator, state):
+        with self._model_lock:
+            self.model.set_actuator(actuator, state)
+        return True
+
+# --- Benchmark ---
+def _control_step(chamber):
+    """
+    Heater and CO2 decisions for one chamber on its latest sample (as the
+    control jobs). Returns True if a CO2 pulse is due.
+    """
+    snapshot = settings.current(chamber.name)
+    latest_data = chamber.latest_data
+    average = control_service.average_control_temperature(latest_data['temperatures'], chamber.control_sensors)
+    if average is not None:
+        new_state = control_service.decide_heater(average, chamber.get_actuator_state(hw_gpio.ITO_HEATING),
+                                                  snapshot.temp_lower_bound, snapshot.temp_upper_bound)
+        if new_state:
+            chamber.set_actuator_state(hw_gpio.ITO_HEATING, new_state, hw_gpio.SOURCE_CONTROL)
+    # The solenoid pulse itself is a cooperative sleep, not modelled here
+    return control_service.decide_co2(latest_data['co2'], 'off', snapshot.co2_threshold) == control_service.CO2_PULSE
+
+def run_scaling(chamber_count, duration=DEFAULT_DURATION, probes=5, io_workers=None, interval=sensor_service.READ_INTERVAL):
+    """
+    Runs `chamber_count` simulated chambers for `duration` seconds of wall
+    time with the scheduler's semantics: one fixed-rate sensor job per
+    chamber, start times spread over the interval, a run skipped while the
+    previous one is still going, and blocking reads and log writes on a
+    bounded I/O pool sized as run.py does. Returns timing statistics.
+    """
+    io_workers = io_workers or scheduler.IO_WORKERS + chamber_count - 1
+    pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix='sim-io')
+    log_dir = tempfile.mkdtemp(prefix='chamber-scaling-')
+    sim_chambers = [SimulatedChamber(f"sim{i}", log_dir, probes=probes, seed=i) for i in range(chamber_count)]
+    for chamber in sim_chambers:
+        datalog_service.initialize_datalog(chamber.log_file)
+
+    stats_lock = threading.Lock()
+    stats = {'runs': 0, 'late': 0, 'skipped': 0, 'co2_pulses': 0, 'latencies': [], 'cpu': 0.0}
+    busy = set()
+    threads = []
+
+    def write_outputs(chamber, data):
+        start_cpu = time.thread_time()
+        datalog_service.save_data_to_log(data, chamber.log_file)
+        return time.thread_time() - start_cpu
+
+    def job(chamber, due_time):
+        try:
+            data = pool.submit(chamber.read_sensors).result()
+            start_cpu = time.thread_time()
+            sensor_service.process_sample(data, publish=False, chamber=chamber)
+            co2_pulse = _control_step(chamber)
+            cpu = time.thread_time() - start_cpu
+            cpu += pool.submit(write_outputs, chamber, data).result()
+            latency = time.monotonic() - due_time
+            with stats_lock:
+                stats['runs'] += 1
+                stats['cpu'] += cpu
+                stats['co2_pulses'] += co2_pulse
+                stats['latencies'].append(latency)
+                if latency > interval:
+                    stats['late'] += 1
+        finally:
+            busy.discard(chamber.name)
+
+    start = time.monotonic()
+    start_process_cpu = time.process_time()
+    queue = [(start + i * interval / chamber_count, i) for i in range(chamber_count)]
+    heapq.heapify(queue)
+    end = start + duration
+    while queue and queue[0][0] < end:
+        due_time, i = heapq.heappop(queue)
+        delay = due_time - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        chamber = sim_chambers[i]
+        if chamber.name in busy:
+            stats['skipped'] += 1
+        else:
+            busy.add(chamber.name)
+            thread = threading.Thread(target=job, args=(chamber, due_time), daemon=True)
+            thread.start()
+            threads.append(thread)
+        heapq.heappush(queue, (due_time + interval, i))
+    for thread in threads:
+        thread.join()
+    wall = time.monotonic() - start
+    process_cpu = time.process_time() - start_process_cpu
+    pool.shutdown()
+
+    latencies = sorted(stats['latencies'])
+    expected = chamber_count * int(duration / interval)
+    late_fraction = stats['late'] / stats['runs'] if stats['runs'] else 1.0
+    return {
+        'chambers': chamber_count,
+        'io_workers': io_workers,
+        'expected_samples': expected,
+        'samples': stats['runs'],
+        'skipped': stats['skipped'],
+        'late': stats['late'],
+        'p50_latency_ms': round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+        'p99_latency_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 1) if latencies else None,
+        'pipeline_cpu_us_per_sample': round(stats['cpu'] / stats['runs'] * 1e6, 1) if stats['runs'] else None,
+        'process_cpu_percent': round(process_cpu / wall * 100, 1),
+        'sustained': stats['skipped'] == 0 and late_fraction <= MAX_LATE_FRACTION,
+    }
+
+def _main():
+    parser = argparse.ArgumentParser(description="Measure how many chambers one controller sustains at the sensor read rate.")
+    parser.add_argument('--chambers', default=','.join(map(str, DEFAULT_CHAMBER_COUNTS)), help="Comma-separated chamber counts")
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help="Seconds per chamber count")
+    parser.add_argument('--probes', type=int, default=5, help="Temperature probes per chamber")
+    parser.add_argument('--io-workers', type=int, default=0, help="I/O pool size (default: as run.py sizes it)")
+    args = parser.parse_args()
+
+    # Relay state checks need GPIO to count as ready; nothing touches real pins
+    hw_registry.register_device(hw_registry.DEVICE_GPIO, lambda: True)
+    hw_registry.initialize_device(hw_registry.DEVICE_GPIO)
+
+    columns = [
+        ('chambers', 8), ('io_workers', 10), ('samples', 7), ('expected_samples', 8), ('skipped', 7), ('late', 5),
+        ('p50_latency_ms', 8), ('p99_latency_ms', 8), ('pipeline_cpu_us_per_sample', 10), ('process_cpu_percent', 7), ('sustained', 9),
+    ]
+    titles = {'expected_samples': 'expected', 'p50_latency_ms': 'p50 ms', 'p99_latency_ms': 'p99 ms',
+              'pipeline_cpu_us_per_sample': 'cpu us/smp', 'process_cpu_percent': 'cpu %'}
+    print(' '.join(f"{titles.get(key, key):>{width}}" for key, width in columns))
+    best = 0
+    for count in (int(value) for value in args.chambers.split(',')):
+        result = run_scaling(count, args.duration, args.probes, args.io_workers or None)
+        print(' '.join(f"{str(result[key]):>{width}}" for key, width in columns))
+        if result['sustained']:
+            best = max(best, count)
+    print(f"Largest chamber count sustained at {1 / sensor_service.READ_INTERVAL:g} Hz: {best}")
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.WARNING) # config.py already configured logging at INFO
+    _main()
+
+# Usage: python -m app.simulation.chamber_scaling --chambers 1,2,4,8,16 --duration 10
@@ -0,0 +1,280 @@
+import argparse
+import atexit
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import timeit
+import tracemalloc
+import types
+
+from app.hardware import serial_comms
+from app.services import control_service
+from app.services import datalog_service
+from app.services import samples
+
+# --- Constants ---
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'microbench_baseline.json')
+DEFAULT_TOLERANCE = 0.30       # Fail if a benchmark's relative throughput drops by more than this fraction...
+DEFAULT_ALLOC_TOLERANCE = 0.10 # ...or its peak allocation per call grows by more than this fraction
+ALLOC_SLACK = 256              # Bytes of allocation growth always tolerated (interpreter noise)
+REPEATS = 5                    # Timing runs per benchmark; the best one counts
+ALLOC_CALLS = 25               # Calls measured for the allocation figures
+
+SAMPLE = samples.Sample.from_dict({
+    'timestamp': 1700000000,
+    'temperatures': [36.91, 37.02, 36.88, 37.05, 36.97],
+    'humidity': 55.4,
+    'o2': 20.61,
+    'co2': 4.97,
+})
+
+# --- Off-Device Fixtures ---
+# The hot functions are run without hardware: bus I/O is replaced by fakes that
+# return fixed bytes instantly, so only the Python cost is measured.
+class FakeSMBus:
+    """Answers every DFRobot register read with fixed bytes (key 120, 20.61 %vol)."""
+    def __init__(self, bus=1):
+        self.bus = bus
+
+    def read_i2c_block_data(self, address, register, length):
+        return [120] if length == 1 else [20, 6, 1][:length]
+
+    def write_i2c_block_data(self, address, register, data):
+        pass
+
+    def close(self):
+        pass
+
+class FakeOled:
+    """Accepts frames like adafruit_ssd1306.SSD1306_I2C without an I2C bus."""
+    def image(self, image):
+        self.frame = image
+
+    def show(self):
+        pass
+
+def _load_oxygen_driver():
+    """Imports the DFRobot driver with its smbus module replaced by FakeSMBus."""
+    fake_smbus = types.SimpleNamespace(SMBus=FakeSMBus)
+    try:
+        from app import DFRobot_Oxygen
+    except ImportError: # Off-device: no smbus to satisfy the driver's module-level import
+        sys.modules.setdefault('smbus', fake_smbus)
+        from app import DFRobot_Oxygen
+    DFRobot_Oxygen.smbus = fake_smbus
+    DFRobot_Oxygen.time = types.SimpleNamespace(sleep=lambda seconds: None) # get_flash() sleeps 0.1 s per read
+    return DFRobot_Oxygen
+
+# --- Benchmarks ---
+# Each setup function returns the callable to measure (and may raise
+# BenchmarkSkipped if a library it needs is missing).
+class BenchmarkSkipped(Exception):
+    pass
+
+def _bench_co2_response():
+    responses = [" Z 49700\r\n", "Z 497\r\n", "garbage\r\n"]
+    def run():
+        for response in responses:
+            serial_comms._process_co2_response(response)
+    return run
+
+def _bench_datalog_row():
+    handle, path = tempfile.mkstemp(suffix='.csv', prefix='microbench_')
+    os.close(handle)
+    atexit.register(os.remove, path)
+    datalog_service.initialize_datalog(path)
+    return lambda: datalog_service.save_data_to_log(SAMPLE, path)
+
+def _bench_display_render():
+    from app.hardware import display
+    from app.hardware import registry as hw_registry
+    for module_name in ('PIL.Image', 'PIL.ImageDraw', 'PIL.ImageFont'):
+        if not hw_registry.is_library_available(module_name):
+            raise BenchmarkSkipped("Pillow not installed")
+    display.Image = hw_registry.load_library('PIL.Image')
+    display.ImageDraw = hw_registry.load_library('PIL.ImageDraw')
+    display.ImageFont = hw_registry.load_library('PIL.ImageFont')
+    display.DEFAULT_FONT = display.ImageFont.load_default()
+    display._oled = FakeOled()
+    display._is_initialized = True
+    # Network lookups (a UDP socket and an `iwgetid` process) are not rendering
+    display._get_ip_address = lambda: "192.168.1.20"
+    display._get_wifi_ssid = lambda: "lab-wifi"
+    return lambda: display.update_display(SAMPLE)
+
+def _bench_oxygen_smoothing():
+    oxygen_module = _load_oxygen_driver()
+    sensor = oxygen_module.DFRobot_Oxygen_IIC(1, oxygen_module.ADDRESS_3)
+    return lambda: sensor.get_oxygen_data(20)
+
+def _bench_socketio_payload():
+    # Each new sample is encoded once, then reused by the other sinks' payloads
+    def run():
+        sample = samples.Sample(SAMPLE.timestamp, SAMPLE.values) # Not yet encoded, as fresh from the sensors
+        samples.dumps(sample)
+        samples.dumps({'chamber': 'incubator-2', 'data': sample})
+    return run
+
+def _bench_control_decisions():
+    temperatures = SAMPLE['temperatures']
+    def run():
+        average = control_service.average_control_temperature(temperatures)
+        control_service.decide_heater(average, 'off', 36.5, 37.5)
+        control_service.decide_heater(average - 1.0, 'off', 36.5, 37.5)
+        control_service.decide_co2(SAMPLE['co2'], 'off', 5.0)
+        control_service.decide_co2(5.5, 'on', 5.0)
+    return run
+
+def _calibration():
+    """Fixed pure-Python workload; throughput is reported relative to it so baselines carry across machines."""
+    values = list(range(64))
+    def run():
+        total = 0.0
+        for value in values:
+            total += value * 0.5
+        return str(total)
+    return run
+
+BENCHMARKS = {
+    'co2_response': _bench_co2_response,
+    'datalog_row': _bench_datalog_row,
+    'display_render': _bench_display_render,
+    'oxygen_smoothing': _bench_oxygen_smoothing,
+    'socketio_payload': _bench_socketio_payload,
+    'control_decisions': _bench_control_decisions,
+}
+
+# --- Measurement ---
+def _ops_per_second(func, calibration):
+    """
+    Best-of-REPEATS calls per second of func and of the calibration workload,
+    timed alternately so both see the same CPU clock and load. Each timing
+    run lasts at least 0.2 s (timeit autorange).
+    """
+    timers = [timeit.Timer(func), timeit.Timer(calibration)]
+    numbers = [timer.autorange()[0] for timer in timers]
+    best = [float('inf'), float('inf')]
+    for _ in range(REPEATS):
+        for index, timer in enumerate(timers):
+            best[index] = min(best[index], timer.timeit(numbers[index]))
+    return numbers[0] / best[0], numbers[1] / best[1]
+
+def _allocations(func):
+    """Median peak bytes allocated during one call, and bytes still held per call afterwards."""
+    func() # Warm caches (imports, fonts, file handles) outside the measurement
+    tracemalloc.start()
+    try:
+        peaks = [0] * ALLOC_CALLS # Preallocated, so the measurement itself allocates nothing
+        start_size, _ = tracemalloc.get_traced_memory()
+        for index in range(ALLOC_CALLS):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks[index] = peak - before
+        end_size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return int(statistics.median(peaks)), max(0, (end_size - start_size) // ALLOC_CALLS)
+
+def run_benchmarks(names=None):
+    """
+    Runs the benchmarks (default: all) and returns name -> result dict with
+    'ops_per_second', 'relative' (throughput / calibration throughput),
+    'peak_bytes' and 'retained_bytes', or {'skipped': reason}.
+    """
+    calibration = _calibration()
+    results = {}
+    for name in names or BENCHMARKS:
+        try:
+            func = BENCHMARKS[name]()
+        except BenchmarkSkipped as e:
+            results[name] = {'skipped': str(e)}
+            continue
+        peak_bytes, retained_bytes = _allocations(func)
+        ops, calibration_ops = _ops_per_second(func, calibration)
+        results[name] = {
+            'ops_per_second': round(ops, 1),
+            'relative': round(ops / calibration_ops, 5),
+            'peak_bytes': peak_bytes,
+            'retained_bytes': retained_bytes,
+        }
+    return results
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, alloc_tolerance=DEFAULT_ALLOC_TOLERANCE):
+    """
+    Returns a list of failure messages: results that fall outside the
+    baseline's tolerances, and measured benchmarks the baseline has no
+    reference for (an unchecked benchmark must not pass silently).
+    """
+    regressions = []
+    for name, result in results.items():
+        if 'skipped' in result:
+            continue
+        reference = baseline.get(name)
+        if not reference or 'skipped' in reference:
+            regressions.append(f"{name}: no baseline reference (run --save-baseline on the reference machine)")
+            continue
+        if result['relative'] < reference['relative'] * (1 - tolerance):
+            change = result['relative'] / reference['relative'] - 1
+            regressions.append(f"{name}: throughput {change:+.0%} (limit -{tolerance:.0%})")
+        for key in ('peak_bytes', 'retained_bytes'):
+            limit = reference[key] * (1 + alloc_tolerance) + ALLOC_SLACK
+            if result[key] > limit:
+                regressions.append(f"{name}: {key} {result[key]} > {limit:.0f} (baseline {reference[key]})")
+    return regressions
+
+def _main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the hot-path functions, compared against stored baselines.")
+    parser.add_argument('names', nargs='*', help=f"Benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline results file")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline instead of comparing")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="Allowed relative throughput drop")
+    parser.add_argument('--alloc-tolerance', type=float, default=DEFAULT_ALLOC_TOLERANCE, help="Allowed relative allocation growth")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    results = run_benchmarks(args.names or None)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file).get('results', {})
+
+    print(f"{'benchmark':<18} {'ops/s':>12} {'relative':>9} {'baseline':>9} {'peak B':>8} {'kept B':>7}")
+    for name, result in results.items():
+        if 'skipped' in result:
+            print(f"{name:<18} skipped: {result['skipped']}")
+            continue
+        reference = baseline.get(name, {}).get('relative', '--')
+        print(f"{name:<18} {result['ops_per_second']:>12,.0f} {result['relative']:>9} {reference:>9} "
+              f"{result['peak_bytes']:>8} {result['retained_bytes']:>7}")
+
+    if args.save_baseline:
+        stored = dict(baseline, **{name: result for name, result in results.items() if 'skipped' not in result})
+        with open(args.baseline, 'w') as file:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'results': stored}, file, indent=2, sort_keys=True)
+            file.write('\n')
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not baseline:
+        print(f"No baseline at {args.baseline}; run with --save-baseline first.")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance, args.alloc_tolerance)
+    for message in regressions:
+        print(f"FAIL {message}")
+    print("FAIL" if regressions else "OK: no regressions beyond tolerance")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.CRITICAL) # Benchmarked fallback paths log errors on purpose
+    sys.exit(_main())
+
+# Usage: python -m app.simulation.microbench                 (compare with the stored baseline)
+#        python -m app.simulation.microbench --save-baseline (after an intended change, on the reference machine)
@@ -0,0 +1,133 @@
+import argparse
+import logging
+import statistics
+import sys
+import time
+
+from app.hardware import gpio_devices
+from app.hardware import pwm
+from app.hardware import registry
+
+# --- Constants ---
+DEFAULT_DUTIES = (25, 50, 75)  # Duty cycles measured per backend (%)
+DEFAULT_SECONDS = 2.0          # Seconds per measurement phase
+DEFAULT_PIN = gpio_devices._PUMP_ENA_PIN
+DEFAULT_FREQUENCY = gpio_devices._PWM_FREQUENCY
+
+# --- Measurement ---
+def _cpu_fraction(seconds):
+    """Fraction of one CPU this process used (all threads, e.g. RPi.GPIO's PWM thread) while sleeping `seconds`."""
+    start_cpu, start = time.process_time(), time.monotonic()
+    time.sleep(seconds)
+    return (time.process_time() - start_cpu) / (time.monotonic() - start)
+
+def _sample_output(backend, seconds):
+    """
+    Polls the output level for `seconds`. Returns (measured duty %, rising
+    edge period jitter in µs, samples per second), or None if the backend
+    can't read its pin back. The polling loop's own resolution bounds the
+    accuracy; it is reported as the sample rate.
+    """
+    if backend.read_level() is None:
+        return None
+    samples = high = 0
+    rising = []
+    previous = backend.read_level()
+    start = time.monotonic()
+    deadline = start + seconds
+    while True:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+        level = backend.read_level()
+        samples += 1
+        high += level
+        if level and not previous:
+            rising.append(now)
+        previous = level
+    periods = [b - a for a, b in zip(rising, rising[1:])]
+    jitter = statistics.pstdev(periods) * 1e6 if len(periods) > 1 else None
+    return high / samples * 100, jitter, samples / (time.monotonic() - start)
+
+def _create(name, pin, frequency):
+    """Creates a backend on `pin`, setting the pin up with RPi.GPIO for the software backend."""
+    gpio = None
+    if name == pwm.BACKEND_SOFTWARE:
+        gpio = registry.require_library('RPi.GPIO')
+        gpio.setmode(gpio.BCM)
+        gpio.setwarnings(False)
+        gpio.setup(pin, gpio.OUT, initial=gpio.LOW)
+    return pwm.create_backend(name, pin, frequency, gpio=gpio)
+
+def run_benchmark(backends, pin=DEFAULT_PIN, frequency=DEFAULT_FREQUENCY, duties=DEFAULT_DUTIES, seconds=DEFAULT_SECONDS):
+    """
+    Measures each backend at each duty cycle. Returns backend -> list of
+    result dicts ('duty', 'measured', 'error', 'jitter_us', 'sample_rate',
+    'cpu_percent': CPU above the idle baseline while the output runs), or
+    {'skipped': reason} for a backend that can't be created here.
+    """
+    idle = _cpu_fraction(seconds)
+    results = {}
+    for name in backends:
+        try:
+            backend = _create(name, pin, frequency)
+        except (registry.LibraryUnavailableError, RuntimeError) as e:
+            results[name] = {'skipped': str(e)}
+            continue
+        rows = results[name] = []
+        try:
+            backend.start(0)
+            for duty in duties:
+                backend.set_duty(duty)
+                cpu = max(0.0, _cpu_fraction(seconds) - idle)
+                output = _sample_output(backend, seconds)
+                measured, jitter, rate = output if output else (None, None, None)
+                rows.append({
+                    'duty': duty,
+                    'timing': backend.timing,
+                    'measured': None if measured is None else round(measured, 2),
+                    'error': None if measured is None else round(measured - duty, 2),
+                    'jitter_us': None if jitter is None else round(jitter, 1),
+                    'sample_rate': None if rate is None else round(rate),
+                    'cpu_percent': round(cpu * 100, 2),
+                })
+        finally:
+            backend.stop()
+    return results
+
+def _cell(value, width, spec):
+    """Formats a table cell (spec without width, e.g. '+.2f'), or '--' for a missing value."""
+    if value is None:
+        return '--'.rjust(width)
+    sign = spec[0] if spec and spec[0] in '+- ' else ''
+    return format(value, f">{sign}{width}{spec[len(sign):]}")
+
+def _main():
+    parser = argparse.ArgumentParser(description="Duty-cycle accuracy and CPU cost of the pump PWM backends.")
+    parser.add_argument('backends', nargs='*', help=f"Backends to measure (default: all of {', '.join(pwm.BACKENDS)})")
+    parser.add_argument('--pin', type=int, default=DEFAULT_PIN, help="BCM pin to drive (default: the pump enable pin)")
+    parser.add_argument('--frequency', type=int, default=DEFAULT_FREQUENCY, help="PWM frequency in Hz")
+    parser.add_argument('--duty', type=float, nargs='+', default=DEFAULT_DUTIES, help="Duty cycles to measure (%%)")
+    parser.add_argument('--seconds', type=float, default=DEFAULT_SECONDS, help="Seconds per measurement phase")
+    args = parser.parse_args()
+    unknown = [name for name in args.backends if name not in pwm.BACKENDS]
+    if unknown:
+        parser.error(f"unknown backend(s): {', '.join(unknown)}")
+
+    results = run_benchmark(args.backends or list(pwm.BACKENDS), args.pin, args.frequency, args.duty, args.seconds)
+    print(f"{'backend':<10} {'timing':<9} {'duty %':>7} {'measured':>9} {'error':>7} {'jitter us':>10} {'samples/s':>10} {'cpu %':>6}")
+    for name, rows in results.items():
+        if isinstance(rows, dict):
+            print(f"{name:<10} skipped: {rows['skipped']}")
+            continue
+        for row in rows:
+            print(f"{name:<10} {row['timing']:<9} {row['duty']:>7g} {_cell(row['measured'], 9, '.2f')} {_cell(row['error'], 7, '+.2f')} "
+                  f"{_cell(row['jitter_us'], 10, '.1f')} {_cell(row['sample_rate'], 10, ',')} {row['cpu_percent']:>6.2f}")
+    return 0
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.WARNING)
+    sys.exit(_main())
+
+# Usage: python -m app.simulation.pwm_benchmark                  (all backends; stop the server first, it drives the same pin)
+#        python -m app.simulation.pwm_benchmark pigpio --pin 18  (one backend on another pin)
@@ -169,10 +169,60 @@ document.addEventListener("DOMContentLoaded", () => {
         }
         document.getElementById('humidity').textContent = humidityDisplayValue;
 
+        if (callback) callback(); // Acknowledge, so the server sends the next update
     });
 
+    // Active alarms, keyed by chamber and rule
+    const activeAlarms = new Map();
+
+    socket.on('alarm', (event) => {
+        const key = `${event.chamber}/${event.rule}`;
+        if (event.state === 'raised') {
+            activeAlarms.set(key, event);
+        } else {
+            activeAlarms.delete(key);
+        }
+        renderAlarms();
+    });
+
+    // Sensors whose circuit breaker is open are listed with the alarms
+    socket.on('device_breaker', (event) => showBreaker(event.chamber, event.sensor, event.state));
+
+    function showBreaker(chamber, sensor, state) {
+        const key = `${chamber}/breaker-${sensor}`;
+        if (state === 'closed') {
+            activeAlarms.delete(key);
+        } else {
+            activeAlarms.set(key, { chamber, rule: `${sensor} sensor`, severity: 'warning', message: 'not responding, retrying with backoff' });
+        }
+        renderAlarms();
+    }
+
+    // Alarms raised before this page was loaded
+    fetch('/api/alarms?limit=1')
+        .then(response => response.json())
+        .then(data => {
+            data.active.forEach(event => activeAlarms.set(`${event.chamber}/${event.rule}`, event));
+            renderAlarms();
+        })
+        .catch(error => console.warn('Could not load active alarms:', error));
+    fetch('/api/chambers')
+        .then(response => response.json())
+        .then(data => data.chambers.forEach(chamber => {
+            Object.entries(chamber.breakers).forEach(([sensor, status]) => showBreaker(chamber.name, sensor, status.state));
+        }))
+        .catch(error => console.warn('Could not load sensor breaker states:', error));
+
+    // Full rate while visible, one update per 5 s in a background tab; acks
+    // let the server coalesce updates instead of queueing them if we fall behind
+    function subscribe() {
+        socket.emit('subscribe', { rate: document.hidden ? '0.2hz' : '1hz', ack: true });
+    }
+    document.addEventListener('visibilitychange', subscribe);
+
     socket.on('connect', () => {
         console.log('Connected to server');
+        subscribe();
         socket.emit('request_data'); // Request buffered data after reconnecting
     });
 
@@ -180,6 +230,22 @@ document.addEventListener("DOMContentLoaded", () => {
         console.warn('Disconnected from server. Attempting to reconnect...');
     });
 
+    /**
+     * Shows the active alarms above the charts, critical ones first.
+     */
+    function renderAlarms() {
+        const list = document.getElementById('alarms');
+        const alarms = [...activeAlarms.values()].sort((a, b) => (a.severity === 'critical' ? 0 : 1) - (b.severity === 'critical' ? 0 : 1));
+        list.replaceChildren(...alarms.map(event => {
+            const item = document.createElement('li');
+            item.className = `alarm alarm-${event.severity}`;
+            const chamber = event.chamber === 'main' ? '' : `[${event.chamber}] `;
+            item.textContent = `${chamber}${event.rule}: ${event.message}`;
+            return item;
+        }));
+        list.hidden = alarms.length === 0;
+    }
+
     /**
      * Updates the given chart with new data.
      * @param {Chart} chart - The chart to update.
@@ -0,0 +1 @@
+# This file marks the 'utils' directory as a Python package.
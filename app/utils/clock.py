@@ -0,0 +1,45 @@
+import logging
+import threading
+import time
+
+# --- Constants ---
+RESYNC_THRESHOLD_NS = 500_000_000 # Re-anchor when the wall clock has stepped by more than 0.5 s (e.g. an NTP correction)
+
+# --- State Variables ---
+# Acquisition times are taken with the monotonic clock, which never steps, and
+# mapped to wall-clock time through one (monotonic, wall) anchor pair. Times
+# mapped with the same anchor keep their order and spacing exactly.
+_lock = threading.Lock()
+_anchor = (time.monotonic_ns(), time.time_ns())
+
+# --- Public Functions ---
+def monotonic_ns():
+    return time.monotonic_ns()
+
+def to_wall_ns(mono_ns):
+    """Maps a monotonic_ns() time to wall-clock nanoseconds since the epoch."""
+    mono_anchor, wall_anchor = _anchor
+    return wall_anchor + (mono_ns - mono_anchor)
+
+def to_wall(mono_ns):
+    """Maps a monotonic_ns() time to wall-clock seconds since the epoch (float)."""
+    return to_wall_ns(mono_ns) / 1e9
+
+def resync():
+    """
+    Re-anchors the mapping if the wall clock has moved away from it by more
+    than RESYNC_THRESHOLD_NS. Call it between samples, not within one, so all
+    channels of a sample are mapped with the same anchor.
+    """
+    global _anchor
+    mono_now, wall_now = time.monotonic_ns(), time.time_ns()
+    offset = wall_now - to_wall_ns(mono_now)
+    if abs(offset) <= RESYNC_THRESHOLD_NS:
+        return False
+    with _lock:
+        _anchor = (mono_now, wall_now)
+    logging.warning(f"Wall clock stepped by {offset / 1e9:+.3f}s; re-anchored acquisition timestamps.")
+    return True
+
+# Note: chambers.Chamber.read_sensors() stamps each channel with the monotonic
+# time its read finished and stores it mapped to wall-clock time.
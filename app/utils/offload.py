@@ -0,0 +1,52 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# eventlet is the production server (see requirements.txt). When it is present,
+# waiting for a pool result goes through eventlet's tpool so only the calling
+# green thread waits, instead of the whole hub (and every SocketIO emit).
+try:
+    from eventlet import tpool as _tpool
+except ImportError:
+    _tpool = None
+
+# --- Exceptions ---
+class PoolBusyError(RuntimeError):
+    """Raised when a pool's queue of pending jobs is full."""
+
+# --- Pool ---
+class OffloadPool:
+    """
+    A small bounded thread pool for blocking or CPU-heavy work (bcrypt, driver
+    I/O) that must not run on the server's event loop. At most `max_pending`
+    jobs may be queued or running; further submissions raise PoolBusyError.
+    """
+    def __init__(self, name, max_workers, max_pending=None):
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_pending or max_workers * 4)
+
+    def submit(self, func, *args, **kwargs):
+        """Queues func on the pool and returns a Future. Raises PoolBusyError if full."""
+        if not self._slots.acquire(blocking=False):
+            logging.warning(f"Offload pool '{self.name}' is full, rejecting job.")
+            raise PoolBusyError(f"Offload pool '{self.name}' is full")
+        try:
+            future = self._executor.submit(func, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, func, *args, **kwargs):
+        """Runs func on the pool and returns its result, yielding to other green threads while waiting."""
+        future = self.submit(func, *args, **kwargs)
+        if _tpool is not None and threading.current_thread() is threading.main_thread():
+            # Green threads of the eventlet server all run on the main OS thread
+            return _tpool.execute(future.result)
+        return future.result()
+
+    def shutdown(self):
+        """Stops accepting work and waits for running jobs to finish."""
+        self._executor.shutdown(wait=True)
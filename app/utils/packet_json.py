@@ -0,0 +1,18 @@
+import json
+
+# JSON module for the SocketIO server (SocketIO(json=packet_json)). Socket.IO
+# encodes an event packet as the JSON array [event, *args]; arguments that are
+# already-encoded JSON text (PreEncoded) are spliced in as is, so a payload
+# sent to many clients is serialized once instead of once per client.
+
+class PreEncoded(str):
+    """JSON text encoded once by the caller, sent verbatim as an event argument."""
+
+def dumps(obj, *args, **kwargs):
+    if isinstance(obj, list) and any(isinstance(item, PreEncoded) for item in obj):
+        return '[' + ','.join(
+            item if isinstance(item, PreEncoded) else json.dumps(item, *args, **kwargs) for item in obj
+        ) + ']'
+    return json.dumps(obj, *args, **kwargs)
+
+loads = json.loads
@@ -0,0 +1,115 @@
+from collections import deque, namedtuple
+
+# Statistics of one window. `slope` is the least-squares trend in units per
+# minute; fields are None while the window holds no samples (variance and
+# slope need two).
+WindowStats = namedtuple('WindowStats', ['count', 'mean', 'variance', 'min', 'max', 'slope'])
+EMPTY_STATS = WindowStats(0, None, None, None, None, None)
+
+class RollingWindow:
+    """
+    Mean, variance, min, max and slope of the samples from the last `window`
+    seconds, updated in O(1) amortized time per sample:
+
+    - mean, variance and the time/value co-moment (for the slope) by Welford
+      updates, applied in reverse when a sample leaves the window;
+    - min and max by monotonic deques, so each sample is pushed and popped once.
+
+    Reverse Welford updates accumulate rounding error, so the moments are
+    recomputed from the window's samples after every RECOMPUTE_TURNOVERS
+    full turnovers of the window (at least RECOMPUTE_MIN_EVICTIONS samples),
+    which keeps that cost O(1) amortized too.
+    """
+    RECOMPUTE_TURNOVERS = 4
+    RECOMPUTE_MIN_EVICTIONS = 1024
+    # Time variance (s^2) below which there is no slope: samples (nearly) all
+    # at one time, where rounding in the reverse updates would dominate it
+    MIN_TIME_VARIANCE = 1e-6
+
+    def __init__(self, window):
+        self.window = window
+        self._samples = deque()  # (time, value), oldest first
+        self._min = deque()      # Increasing values: candidates for the minimum
+        self._max = deque()      # Decreasing values: candidates for the maximum
+        self._origin = None      # Times are taken relative to the first sample, for precision
+        self._evicted = 0        # Samples removed since the moments were last recomputed
+        self._reset_moments()
+
+    def _reset_moments(self):
+        self._n = 0
+        self._mean_t = self._mean_v = 0.0
+        self._m2_t = self._m2_v = self._c_tv = 0.0 # Sums of squared/cross deviations
+
+    def _add_moments(self, t, v):
+        self._n += 1
+        dt = t - self._mean_t
+        dv = v - self._mean_v
+        self._mean_t += dt / self._n
+        self._mean_v += dv / self._n
+        self._m2_t += dt * (t - self._mean_t)
+        self._m2_v += dv * (v - self._mean_v)
+        self._c_tv += dt * (v - self._mean_v)
+
+    def _remove_moments(self, t, v):
+        if self._n == 1:
+            self._reset_moments()
+            return
+        dt = t - self._mean_t
+        dv = v - self._mean_v
+        self._n -= 1
+        self._mean_t -= dt / self._n
+        self._mean_v -= dv / self._n
+        self._m2_t -= dt * (t - self._mean_t)
+        self._m2_v -= dv * (v - self._mean_v)
+        self._c_tv -= dt * (v - self._mean_v)
+
+    def _evict(self, now):
+        """Removes the samples that have left the window ending at `now`."""
+        samples = self._samples
+        while samples and now - samples[0][0] >= self.window:
+            t, v = samples.popleft()
+            self._remove_moments(t, v)
+            while self._min and self._min[0][0] <= t:
+                self._min.popleft()
+            while self._max and self._max[0][0] <= t:
+                self._max.popleft()
+            self._evicted += 1
+        if self._evicted >= max(self.RECOMPUTE_TURNOVERS * len(samples), self.RECOMPUTE_MIN_EVICTIONS):
+            self._reset_moments()
+            for t, v in samples:
+                self._add_moments(t, v)
+            self._evicted = 0
+
+    def update(self, timestamp, value):
+        """
+        Advances the window to `timestamp` (seconds) and adds `value`, unless it
+        is None (no valid reading: the window only ages). Timestamps must not
+        decrease.
+        """
+        if self._origin is None:
+            self._origin = timestamp
+        t = timestamp - self._origin
+        samples = self._samples
+        if samples and t - samples[0][0] >= self.window:
+            self._evict(t)
+        if value is None:
+            return
+        samples.append((t, value))
+        self._add_moments(t, value)
+        low = self._min
+        while low and low[-1][1] >= value:
+            low.pop()
+        low.append((t, value))
+        high = self._max
+        while high and high[-1][1] <= value:
+            high.pop()
+        high.append((t, value))
+
+    def stats(self):
+        """Returns the window's WindowStats."""
+        n = self._n
+        if n == 0:
+            return EMPTY_STATS
+        variance = max(self._m2_v, 0.0) / (n - 1) if n > 1 else None
+        slope = self._c_tv / self._m2_t * 60 if n > 1 and self._m2_t > self.MIN_TIME_VARIANCE * n else None
+        return WindowStats(n, self._mean_v, variance, self._min[0][1], self._max[0][1], slope)
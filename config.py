@@ -1,5 +1,6 @@
 import os
 import logging
+import socket
 
 class Config:
     SECRET_KEY = os.getenv('FLASK_SECRET_KEY', 'fallback_key_for_dev')
@@ -12,6 +13,88 @@ class Config:
     FALLBACK_CO2 = 22
     FALLBACK_O2 = 22
 
+    # Control loops. These and the thresholds above are defaults: the live
+    # values are edited at runtime through /api/settings (see app/settings.py)
+    TEMP_CONTROL_INTERVAL = 10   # Seconds between heater decisions
+    CO2_CONTROL_INTERVAL = 30    # Seconds between CO2 decisions
+    CO2_SOLENOID_ON_TIME = 0.1   # Seconds the CO2 solenoid opens per pulse
+    SETTINGS_RELOAD_INTERVAL = 5 # Seconds between checks for settings saved by another process
+    ACTUATOR_JOURNAL_PATH = 'actuator_journal.bin' # Every actuator transition (see app/services/actuator_journal.py)
+    CO2_FLOW_RATE = None         # L/min through the open CO2 solenoid; set it to report doses in litres (/api/analytics)
+
+    # Pump PWM backend (see app/hardware/pwm.py): 'software' (RPi.GPIO), 'pigpio'
+    # (DMA/hardware-timed, needs the pigpiod daemon) or 'simulated'
+    PUMP_PWM_BACKEND = os.getenv('PUMP_PWM_BACKEND', 'software')
+
+    # Additional chambers run by this controller besides the main one (see
+    # app/services/chambers.py). Each entry holds Chamber arguments, e.g.
+    # {'name': 'b', 'temperature_cs_pins': ['D12', 'D16'], 'control_sensors': [0, 1],
+    #  'relay_pins': {'ito-heating': 22, 'co2-solenoid': 23}, 'co2_port': '/dev/ttyUSB0'}
+    CHAMBERS = []
+
+    # Rolling statistics (mean, variance, min, max, slope) kept per channel
+    # over each of these windows, in seconds (see app/utils/rolling.py)
+    STATS_WINDOWS = (10, 60, 600)
+
+    # Adaptive sampling (see app/services/sampling_policy.py). A sensor whose
+    # readings stay within its standard-deviation limit over the stability
+    # window is read (and logged) at doubling intervals, up to
+    # SAMPLING_MAX_INTERVAL seconds; changes and actuator events return it to
+    # the 1 s rate. Keep the ceiling below the 'stale' alarm rules' max_age; set
+    # it to 1 to read every sensor every second
+    SAMPLING_MAX_INTERVAL = 10
+    SAMPLING_STABILITY_WINDOW = 60
+    SAMPLING_STABLE_STDDEV = {'temperature': 0.05, 'humidity': 1.0, 'oxygen': 0.1, 'co2': 0.05}
+
+    # Alarm rules, evaluated per chamber on every sample (see app/services/alarm_service.py).
+    # Types: 'threshold' (high/low, hysteresis), 'sustained' (out of high/low for
+    # duration s), 'rate' (max_rate per minute over window s), 'stale' (no valid
+    # reading for max_age s). With 'relative_to', high/low are offsets from that setting
+    ALARM_RULES = [
+        {'name': 'temperature-high', 'type': 'threshold', 'channel': 'temperature', 'relative_to': 'temp_upper_bound',
+         'high': 0.5, 'hysteresis': 0.2, 'severity': 'critical'},
+        {'name': 'temperature-low', 'type': 'sustained', 'channel': 'temperature', 'relative_to': 'temp_lower_bound',
+         'low': -0.5, 'hysteresis': 0.2, 'duration': 900}, # Allows for warm-up and door openings
+        {'name': 'temperature-rate', 'type': 'rate', 'channel': 'temperature', 'max_rate': 1.0, 'window': 60},
+        {'name': 'co2-drift', 'type': 'sustained', 'channel': 'co2', 'relative_to': 'co2_threshold',
+         'low': -0.5, 'high': 0.5, 'hysteresis': 0.1, 'duration': 600},
+        {'name': 'co2-rate', 'type': 'rate', 'channel': 'co2', 'max_rate': 2.0, 'window': 60}, # e.g. solenoid stuck open
+        {'name': 'temperature-dropout', 'type': 'stale', 'channel': 'temperature', 'max_age': 15, 'severity': 'critical'},
+        {'name': 'co2-dropout', 'type': 'stale', 'channel': 'co2', 'max_age': 15},
+        {'name': 'o2-dropout', 'type': 'stale', 'channel': 'o2', 'max_age': 15},
+        {'name': 'humidity-dropout', 'type': 'stale', 'channel': 'humidity', 'max_age': 30},
+    ]
+
+    # Longest ?wait_for_change= a client may hold an /api/state long-poll, in seconds
+    STATE_MAX_WAIT = 30
+    # Samples kept per chamber for /api/stream clients resuming with Last-Event-ID (5 min at 1 Hz)
+    STREAM_BUFFER_SIZE = 300
+
+    # Telemetry uplink (see app/services/telemetry_service.py). Samples and
+    # actuator events are queued on disk and sent in batches to an http(s)://
+    # or mqtt://host:port/topic aggregator; unset disables the uplink
+    TELEMETRY_URL = os.getenv('TELEMETRY_URL', '')
+    TELEMETRY_TOKEN = os.getenv('TELEMETRY_TOKEN')           # Bearer token for HTTP aggregators
+    TELEMETRY_BOX_ID = os.getenv('TELEMETRY_BOX_ID', socket.gethostname())
+    TELEMETRY_QUEUE_PATH = 'telemetry_outbox.db'
+    TELEMETRY_MAX_QUEUE = 2000000  # Records kept while offline (about 11 days at 1 Hz for two chambers)
+    TELEMETRY_BATCH_SIZE = 1000    # Records per request
+    TELEMETRY_INTERVAL = 5         # Seconds between uplink attempts
+    TELEMETRY_FLUSH_INTERVAL = 5   # Seconds between writes of queued records to disk
+    TELEMETRY_TIMEOUT = 10         # Seconds per request
+
+    # Authentication
+    AUTH_HASH_WORKERS = 2        # Threads verifying bcrypt hashes off the server loop
+    AUTH_HASH_MAX_PENDING = 8    # Queued/running hash checks before logins are rejected
+    LOGIN_MAX_FAILURES = 5       # Failed attempts per username or address...
+    LOGIN_FAILURE_WINDOW = 300   # ...within this many seconds before further attempts are rejected
+
+    # API tokens (machine clients, see app/api_tokens.py)
+    ADMIN_USERS = set(filter(None, os.getenv('ADMIN_USERS', 'pi').split(',')))
+    API_TOKEN_KEY = os.getenv('API_TOKEN_KEY', SECRET_KEY) # HMAC key for stored token hashes
+    API_TOKEN_CACHE_SIZE = 256
+    API_TOKEN_MISS_CACHE_SIZE = 64 # Unknown token hashes remembered (kept apart so they can't evict valid tokens)
+
     LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"  # Ensure LOG_FORMAT is defined
     
     @classmethod
@@ -1,7 +1,11 @@
+import functools
 import logging
 import sys
+import time
 from config import Config # Config handles its own logging init now
 
+_launch_time = time.monotonic() # Used to report how long the server took to come up
+
 # --- Initialize Logging ---
 # Logging should be configured early, potentially via Config or here
 # Assuming Config.init_logging() in config.py handles it.
@@ -12,16 +16,26 @@ from config import Config # Config handles its own logging init now
 try:
     from app import create_app, socketio
     from app.database import init_db
+    from app import settings
     from wifi_monitor import start_wifi_monitor # Keep if still used
-    # Import Hardware Modules
+    # Import Hardware Modules (cheap: driver libraries are loaded lazily on init)
+    from app.hardware import registry as hw_registry
     from app.hardware import gpio_devices as hw_gpio
     from app.hardware import sensors as hw_sensors
     from app.hardware import display as hw_display
     from app.hardware import serial_comms as hw_serial
     # Import Service Modules
+    from app.services import chambers
     from app.services import datalog_service
     from app.services import sensor_service
     from app.services import control_service
+    from app.services import scheduler
+    from app.services import telemetry_service
+    from app.services import alarm_service
+    from app.services import state_service
+    from app.services import stream_service
+    from app.services import broadcast_hub
+    from app.services import actuator_journal
 except ModuleNotFoundError as e:
     # Log critical error and exit if core components are missing
     logging.critical(f"Error importing core modules: {e}", exc_info=True)
@@ -31,33 +45,57 @@ except Exception as e:
     sys.exit(f"Unexpected error during imports: {e}")
 
 
-# --- Initialize Hardware and Services ---
-# It's crucial to initialize hardware *before* creating the app
-# if app creation depends on hardware state, or before starting services.
-try:
-    logging.info("Initializing hardware...")
-    hw_gpio.setup_gpio() # Handles GPIO setup and atexit cleanup registration
-    hw_sensors.initialize_sensors()
-    hw_display.initialize_display() # Handles display init and atexit cleanup
-    hw_serial.initialize_co2_sensor() # Handles serial init and atexit cleanup
-    logging.info("Hardware initialization complete.")
+# --- Hardware and Service Startup ---
+# Devices are initialized concurrently in the background with per-device
+# timeouts, so the web UI is reachable immediately. Services start right away
+# and only sample devices the hardware registry reports as ready; slow or
+# failed devices finish or are retried in the background. Missing libraries
+# are reported as 'unavailable' instead of aborting.
+def register_devices():
+    """Registers each device's init function and timeout (seconds)."""
+    hw_registry.register_device( # Registers its own atexit cleanup
+        hw_registry.DEVICE_GPIO, functools.partial(hw_gpio.setup_gpio, pwm_backend=Config.PUMP_PWM_BACKEND), timeout=2.0
+    )
+    hw_registry.register_device(hw_registry.DEVICE_TEMPERATURE, hw_sensors.initialize_temperature_sensors, timeout=3.0)
+    hw_registry.register_device(hw_registry.DEVICE_HUMIDITY, hw_sensors.initialize_humidity_sensor, timeout=2.0)
+    hw_registry.register_device(hw_registry.DEVICE_OXYGEN, hw_sensors.initialize_oxygen_sensor, timeout=8.0) # I2C retries sleep 1 s each
+    hw_registry.register_device(hw_registry.DEVICE_DISPLAY, hw_display.initialize_display, timeout=3.0) # Registers its own atexit cleanup
+    hw_registry.register_device(hw_registry.DEVICE_CO2, hw_serial.initialize_co2_sensor, timeout=4.0) # Registers its own atexit cleanup
 
-    logging.info("Initializing services...")
-    datalog_service.initialize_datalog()
-    logging.info("Services initialization complete.")
+def start_background_services():
+    """Starts hardware initialization and the background services."""
+    logging.info("Starting hardware initialization...")
+    register_devices()
+    for chamber in chambers.load_chambers(): # The main chamber plus Config.CHAMBERS
+        chamber.register_devices()
+    hw_registry.start_initialization() # Returns immediately, logs a report once devices settle
 
-except Exception as e:
-    # Log critical error and exit if hardware/service init fails
-    logging.critical(f"Failed during hardware/service initialization: {e}", exc_info=True)
-    # Optionally try to cleanup GPIO/Display if partially initialized before exiting
-    hw_display.display_standby() # Show standby message if possible
-    hw_gpio.cleanup_gpio()
-    hw_serial.close_serial_port()
-    sys.exit(f"Failed during hardware/service initialization: {e}")
+    logging.info("Starting background services...")
+    for chamber in chambers.get_chambers():
+        datalog_service.initialize_datalog(chamber.log_file)
+    if len(chambers.get_chambers()) > 1:
+        # One more I/O worker per additional chamber's sensor job
+        scheduler.set_io_workers(scheduler.IO_WORKERS + len(chambers.get_chambers()) - 1)
+    # Services register periodic jobs with the shared scheduler, which runs
+    # them as SocketIO background tasks in the server's async mode
+    actuator_journal.start_actuator_journal() # Before the control loops switch anything
+    sensor_service.start_sensor_service()
+    control_service.start_control_service()
+    alarm_service.start_alarm_service()
+    state_service.start_state_service()
+    stream_service.start_stream_service()
+    broadcast_hub.start_broadcast_hub()
+    telemetry_service.start_telemetry_service() # No-op unless TELEMETRY_URL is set
+    # Pick up settings saved by another process (API edits apply immediately)
+    scheduler.add_periodic_job('settings-reload', lambda: scheduler.run_blocking(settings.reload), interval=Config.SETTINGS_RELOAD_INTERVAL)
+    # Start other background tasks like Wi-Fi monitor if needed
+    start_wifi_monitor(scheduler)
+    scheduler.start()
+    logging.info("Background services started.")
 
 
 # --- Create Flask App ---
-# Now create the app after hardware/services are ready (if needed)
+# The app does not depend on hardware state, so it is created right away
 app = create_app()
 
 # --- Initialize Database ---
@@ -66,6 +104,7 @@ with app.app_context():
      try:
           init_db()
           logging.info("Database initialized.")
+          settings.load() # Control loops start from the last saved settings
      except Exception as e:
           logging.critical(f"Failed to initialize database: {e}", exc_info=True)
           sys.exit(f"Failed to initialize database: {e}")
@@ -75,6 +114,7 @@ with app.app_context():
 # Must be done after socketio object is created (in create_app)
 try:
     sensor_service.register_socketio_handlers(socketio)
+    broadcast_hub.register_socketio_handlers(socketio)
     logging.info("SocketIO handlers registered.")
 except Exception as e:
     logging.error(f"Failed to register SocketIO handlers: {e}", exc_info=True)
@@ -83,26 +123,24 @@ except Exception as e:
 
 # --- Main Execution ---
 if __name__ == "__main__":
-    logging.info("Starting background services...")
     try:
-        # Start the new background services (threads)
-        sensor_service.start_sensor_service()
-        control_service.start_control_service()
-        # Start other background tasks like Wi-Fi monitor if needed
-        start_wifi_monitor()
-        logging.info("Background services started.")
+        start_background_services()
     except Exception as e:
         logging.critical(f"Failed to start background services: {e}", exc_info=True)
         sys.exit(f"Failed to start background services: {e}")
 
-    logging.info("Starting Flask-SocketIO server...")
+    logging.info(f"Starting Flask-SocketIO server ({time.monotonic() - _launch_time:.2f}s after launch)...")
     try:
         # Run the Flask-SocketIO server
         # use_reloader=False is important for background threads/hardware access
         socketio.run(app, host="0.0.0.0", port=5000, debug=Config.SECRET_KEY == 'fallback_key_for_dev', use_reloader=False)
     except Exception as e:
         logging.critical(f"Error running Flask-SocketIO server: {e}", exc_info=True)
-        # Consider stopping background threads gracefully here before exiting
+        # Consider stopping background jobs gracefully here before exiting
         sensor_service.stop_sensor_service()
         control_service.stop_control_service()
+        alarm_service.stop_alarm_service()
+        telemetry_service.stop_telemetry_service()
+        actuator_journal.stop_actuator_journal()
+        scheduler.stop()
         sys.exit(f"Error running Flask-SocketIO server: {e}")
@@ -0,0 +1,141 @@
+import logging
+import os
+
+import pytest
+
+from app.hardware import gpio_devices as hw_gpio
+from app.services import actuator_journal
+
+HEATER = 'ito-heating'
+SOLENOID = 'co2-solenoid'
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'actuator_journal.bin')
+
+
+@pytest.fixture
+def journal(path):
+    journal = actuator_journal.ActuatorJournal(path)
+    journal.open()
+    yield journal
+    journal.close()
+
+
+def reopen(journal):
+    journal.close()
+    reopened = actuator_journal.ActuatorJournal(journal.path)
+    reopened.open()
+    return reopened
+
+
+def transition(device, old_state, new_state, duty=None, source=hw_gpio.SOURCE_CONTROL):
+    return hw_gpio.Transition(device, old_state, new_state, duty, source)
+
+
+def fill(journal, count):
+    """Appends `count` alternating heater/solenoid switches at times 0, 1, 2, ..."""
+    for i in range(count):
+        device = HEATER if i % 2 else SOLENOID
+        state = 'on' if i % 4 < 2 else 'off'
+        journal.append(transition(device, 'off' if state == 'on' else 'on', state), float(i))
+
+
+def test_records_round_trip(journal, path):
+    journal.append(transition(HEATER, 'off', 'on', source=hw_gpio.SOURCE_MANUAL), 10.0)
+    journal.append(transition(hw_gpio.PUMP, 'on', 'on', duty=40, source=hw_gpio.SOURCE_SYSTEM), 11.5)
+    journal.append(transition(SOLENOID, 'off', 'on', source=hw_gpio.SOURCE_PULSE), 12.25)
+
+    assert actuator_journal.RECORD_SIZE == 17
+    assert os.path.getsize(path) == 3 * actuator_journal.RECORD_SIZE
+    assert journal.query() == [
+        actuator_journal.Event(10.0, HEATER, 'off', 'on', None, hw_gpio.SOURCE_MANUAL),
+        actuator_journal.Event(11.5, hw_gpio.PUMP, 'on', 'on', 40.0, hw_gpio.SOURCE_SYSTEM),
+        actuator_journal.Event(12.25, SOLENOID, 'off', 'on', None, hw_gpio.SOURCE_PULSE),
+    ]
+    assert reopen(journal).query() == journal.query() # Device names come back from the .devices file
+
+
+def test_sparse_index_has_one_entry_per_stride(journal):
+    stride = actuator_journal.INDEX_STRIDE
+    fill(journal, 3 * stride + 10)
+
+    assert list(journal._index) == [0.0, float(stride), float(2 * stride), float(3 * stride)]
+    assert list(reopen(journal)._index) == list(journal._index)
+
+
+@pytest.mark.parametrize('start, end', [
+    (None, None), (0, 5), (250, 260), (255.5, 513), (511, 512), (700, None), (None, 3), (900, 1000), (-10, -1),
+])
+def test_range_queries_match_a_full_scan(journal, monkeypatch, start, end):
+    monkeypatch.setattr(actuator_journal, 'READ_RECORDS', 7) # Many block reads per query
+    fill(journal, 3 * actuator_journal.INDEX_STRIDE + 10)
+    everything = journal.query()
+
+    expected = [event for event in everything
+                if (start is None or event.time >= start) and (end is None or event.time <= end)]
+    assert journal.query(start, end) == expected
+    assert journal.query(start, end, device=HEATER) == [event for event in expected if event.device == HEATER]
+    assert journal.query(start, end, limit=3) == expected[:3]
+
+
+def test_unknown_device_has_no_events(journal):
+    fill(journal, 10)
+
+    assert journal.query(device='argon-solenoid') == []
+    assert journal.last_before(100.0, 'argon-solenoid') is None
+
+
+def test_open_drops_a_torn_last_record(journal, path):
+    fill(journal, 5)
+    journal.close()
+    with open(path, 'ab') as file:
+        file.write(b'\x01\x02\x03') # A crash mid-write
+
+    reopened = actuator_journal.ActuatorJournal(path)
+    reopened.open()
+    reopened.append(transition(HEATER, 'on', 'off'), 5.0)
+
+    assert os.path.getsize(path) == 6 * actuator_journal.RECORD_SIZE
+    assert [event.time for event in reopened.query()] == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    reopened.close()
+
+
+def test_backward_clock_step_is_logged_and_keeps_time_order(journal, caplog):
+    with caplog.at_level(logging.INFO):
+        journal.append(transition(HEATER, 'off', 'on'), 100.0)
+        journal.append(transition(HEATER, 'on', 'off'), 90.0) # Clock stepped back 10 s
+        journal.append(transition(HEATER, 'off', 'on'), 95.0)
+        journal.append(transition(HEATER, 'on', 'off'), 101.0)
+
+    assert [event.time for event in journal.query()] == [100.0, 100.0, 100.0, 101.0]
+    assert sum('stepped back' in message for message in caplog.messages) == 1
+    assert sum('caught up' in message for message in caplog.messages) == 1
+
+
+def test_last_before_scans_back_across_blocks(journal):
+    journal.append(transition(HEATER, 'off', 'on'), 0.0)
+    for i in range(1, 2 * actuator_journal.INDEX_STRIDE + 5):
+        journal.append(transition(SOLENOID, 'off', 'on'), float(i))
+
+    assert journal.last_before(1000.0, HEATER).time == 0.0
+    assert journal.last_before(0.0, HEATER) is None
+    assert journal.last_before(300.5, SOLENOID).time == 300.0
+
+
+def test_state_history_opening_state(journal, monkeypatch):
+    monkeypatch.setattr(actuator_journal, '_journal', None)
+    assert actuator_journal.state_history(HEATER, 0.0, 100.0) is None
+
+    monkeypatch.setattr(actuator_journal, '_journal', journal)
+    journal.append(transition(HEATER, 'off', 'on'), 10.0)
+    journal.append(transition(HEATER, 'on', 'off'), 40.0)
+    journal.append(transition(SOLENOID, 'off', 'on'), 50.0)
+
+    since, opening, times, states = actuator_journal.state_history(HEATER, 20.0, 60.0)
+    assert (since, opening, list(times), list(states)) == (10.0, 1, [40.0], [0]) # From the first event's old state
+    since, opening, times, states = actuator_journal.state_history(HEATER, 20.0, 30.0)
+    assert (opening, list(times), list(states)) == (1, [], []) # From the last event before
+    assert actuator_journal.state_history(HEATER, 45.0, 60.0)[1] == 0
+    assert actuator_journal.state_history('argon-solenoid', 0.0, 60.0)[1] == 0 # Never switched: off since startup
@@ -0,0 +1,116 @@
+import pytest
+
+from app import settings
+from app.services import alarm_service
+from app.services import chambers
+from app.services import samples
+
+T0 = 1_700_000_000.0
+RAISED, CLEARED = alarm_service.STATE_RAISED, alarm_service.STATE_CLEARED
+
+
+@pytest.fixture
+def chamber(monkeypatch):
+    monkeypatch.setattr(alarm_service, '_rules', {})
+    monkeypatch.setattr(alarm_service, '_active', {})
+    return chambers.Chamber('alarms', temperature_cs_pins=['D5', 'D6'], control_sensors=(0, 1))
+
+
+def feed(chamber, rule, points):
+    """
+    Runs (seconds after T0, co2 value) samples through _evaluate() with only
+    `rule` installed; a None value is a fallback reading. Returns the
+    (seconds after T0, state) transitions emitted.
+    """
+    alarm_service._rules[chamber.name] = [rule]
+    transitions = []
+    for offset, value in points:
+        readings = {} if value is None else {'co2': value}
+        for event in alarm_service._evaluate(chamber, samples.Sample.from_readings(T0 + offset, readings)):
+            transitions.append((event['timestamp'] - T0, event['state']))
+    return transitions
+
+
+def test_threshold_clears_only_past_the_hysteresis(chamber):
+    rule = alarm_service.ThresholdRule('co2-high', 'co2', high=6.0, hysteresis=0.5)
+
+    transitions = feed(chamber, rule, [(0, 5.0), (1, 6.2), (2, 5.8), (3, None), (4, 5.6), (5, 5.4), (6, 6.1)])
+
+    # 5.8 and 5.6 are inside the band but not 0.5 below the limit; a dropout changes nothing
+    assert transitions == [(1, RAISED), (5, CLEARED), (6, RAISED)]
+    assert alarm_service.get_active_alarms(chamber.name)[0]['message'] == 'co2 6.1 above 6.0'
+
+
+def test_threshold_relative_to_a_setting(chamber):
+    offset = 1.0
+    limit = settings.current(chamber.name).co2_threshold + offset
+    rule = alarm_service.ThresholdRule('co2-over-setpoint', 'co2', high=offset, relative_to='co2_threshold')
+
+    assert feed(chamber, rule, [(0, limit - 0.1), (1, limit + 0.1), (2, limit - 0.1)]) == [(1, RAISED), (2, CLEARED)]
+
+
+def test_low_limit(chamber):
+    rule = alarm_service.ThresholdRule('co2-low', 'co2', low=2.0)
+
+    assert feed(chamber, rule, [(0, 3.0), (1, 1.5), (2, 2.5)]) == [(1, RAISED), (2, CLEARED)]
+
+
+def test_sustained_raises_after_the_duration_and_restarts_when_back_in_band(chamber):
+    rule = alarm_service.SustainedRule('co2-high-sustained', 'co2', duration=30, high=6.0)
+
+    transitions = feed(chamber, rule, [
+        (0, 6.5), (20, 6.5), (25, 5.0), # Out for 25 s only: the timer restarts
+        (30, 6.5), (59, 6.5), (60, 6.5), (70, 6.5), (80, 5.0),
+    ])
+
+    assert transitions == [(60, RAISED), (80, CLEARED)]
+
+
+def test_sustained_timer_survives_dropouts(chamber):
+    rule = alarm_service.SustainedRule('co2-high-sustained', 'co2', duration=30, high=6.0)
+
+    assert feed(chamber, rule, [(0, 6.5), (10, None), (20, None), (30, 6.5)]) == [(30, RAISED)]
+
+
+def test_rate_of_change_needs_half_a_window_of_span(chamber):
+    rule = alarm_service.RateOfChangeRule('co2-jump', 'co2', max_rate=1.0, window=60)
+
+    # +2 %/min from the start, but the span is under 30 s until +30
+    transitions = feed(chamber, rule, [(0, 5.0), (10, 5.33), (20, 5.67), (30, 6.0)])
+
+    assert transitions == [(30, RAISED)]
+
+
+def test_rate_of_change_window_slides_and_clears_with_hysteresis(chamber):
+    rule = alarm_service.RateOfChangeRule('co2-jump', 'co2', max_rate=1.0, window=60, hysteresis=0.2)
+
+    transitions = feed(chamber, rule, [
+        (0, 5.0), (30, 6.0),   # 2 %/min: raised
+        (60, 6.0),             # 1 %/min over 0-60: not below 1.0 - 0.2
+        (90, 6.0),             # 0-30 slid out: 0 %/min over 30-90
+        (120, 6.0), (150, 4.0),
+    ])
+
+    assert transitions == [(30, RAISED), (90, CLEARED), (150, RAISED)]
+
+
+def test_stale_is_raised_by_check_and_cleared_by_a_valid_reading(chamber):
+    rule = alarm_service.StaleRule('co2-stale', 'co2', max_age=60)
+    assert feed(chamber, rule, [(0, 5.0), (30, None)]) == []
+
+    assert alarm_service._evaluate(chamber, now=T0 + 60) == []
+    events = alarm_service._evaluate(chamber, now=T0 + 61)
+    assert [(event['state'], event['message']) for event in events] == [(RAISED, 'no valid co2 reading for 61s')]
+    assert alarm_service._evaluate(chamber, now=T0 + 90) == [] # Already raised
+
+    assert feed(chamber, rule, [(95, None), (100, 5.0)]) == [(100, CLEARED)]
+    assert alarm_service.get_active_alarms() == []
+
+
+def test_create_rule_rejects_unknown_types_and_channels():
+    with pytest.raises(ValueError):
+        alarm_service.create_rule({'name': 'x', 'type': 'median', 'channel': 'co2'})
+    with pytest.raises(ValueError):
+        alarm_service.create_rule({'name': 'x', 'type': 'threshold', 'channel': 'nitrogen'})
+    rule = alarm_service.create_rule({'name': 'x', 'type': 'sustained', 'channel': 'co2', 'duration': 5, 'high': 6.0})
+    assert isinstance(rule, alarm_service.SustainedRule)
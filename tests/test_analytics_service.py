@@ -0,0 +1,144 @@
+import pytest
+
+from app.hardware import gpio_devices as hw_gpio
+from app.hardware import sensors as hw_sensors
+from app.services import actuator_journal
+from app.services import analytics_service
+from app.services import chambers
+from app.services import datalog_service
+from app.services import samples
+
+T0 = 1_000_000.0 # Well in the past, so every range is fully known
+BAND = {'low': 36.9, 'high': 37.1}
+
+
+@pytest.fixture
+def chamber(tmp_path):
+    chamber = chambers.Chamber('kpi', temperature_cs_pins=['D5', 'D6'], control_sensors=(0, 1),
+                               relay_pins={hw_gpio.ITO_HEATING: 22, hw_gpio.CO2_SOLENOID: 23})
+    chamber.log_file = str(tmp_path / 'sensor_data_kpi.csv')
+    datalog_service.initialize_datalog(chamber.log_file)
+    return chamber
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    journal = actuator_journal.ActuatorJournal(str(tmp_path / 'actuator_journal.bin'))
+    journal.open()
+    monkeypatch.setattr(actuator_journal, '_journal', journal)
+    yield journal
+    journal.close()
+
+
+def log_rows(chamber, rows):
+    """Logs (seconds after T0, control temperature, co2) rows."""
+    for offset, temperature, co2 in rows:
+        sample = samples.Sample.from_readings(T0 + offset, {'temperatures': [temperature, temperature], 'co2': co2})
+        datalog_service.save_data_to_log(sample, chamber.log_file)
+
+
+def switch(journal, device, changes):
+    """Journals (seconds after T0, new state) changes of a device, starting from 'off'."""
+    state = 'off'
+    for offset, new_state in changes:
+        journal.append(hw_gpio.Transition(device, state, new_state, None, hw_gpio.SOURCE_CONTROL), T0 + offset)
+        state = new_state
+
+
+def test_temperature_is_time_weighted_and_clipped_at_interval_edges(chamber, journal):
+    # MAX_SAMPLE_HOLD (20 s) ends the 37.5 reading at +30: no data until +40
+    assert analytics_service.MAX_SAMPLE_HOLD == 20
+    log_rows(chamber, [(0, 37.0, 5.0), (10, 37.5, 5.0), (40, 36.5, 5.0)])
+
+    result = analytics_service.compute_kpis(chamber, T0, T0 + 60, 20, **BAND)
+
+    first, second, third = (interval['temperature'] for interval in result['intervals'])
+    assert first == {'coverage': 1.0, 'in_band': 0.5, 'below': 0.0, 'above': 0.5, 'mean': 37.25}
+    assert second == {'coverage': 0.5, 'in_band': 0.0, 'below': 0.0, 'above': 1.0, 'mean': 37.5}
+    assert third == {'coverage': 1.0, 'in_band': 0.0, 'below': 1.0, 'above': 0.0, 'mean': 36.5}
+    summary = result['summary']['temperature']
+    assert summary['coverage'] == pytest.approx(50 / 60, abs=1e-4)
+    assert summary['in_band'] == pytest.approx(10 / 50, abs=1e-4)
+    assert summary['above'] == pytest.approx(20 / 50, abs=1e-4)
+    assert summary['below'] == pytest.approx(20 / 50, abs=1e-4)
+    assert summary['mean'] == pytest.approx(37.0)
+
+
+def test_reading_before_the_range_counts_and_fallback_readings_leave_gaps(chamber, journal):
+    log_rows(chamber, [(-5, 37.0, 5.0), (5, hw_sensors.FALLBACK_TEMPERATURE, 4.0), (10, 37.0, 6.0)])
+
+    result = analytics_service.compute_kpis(chamber, T0, T0 + 20, 20, **BAND)
+
+    temperature = result['summary']['temperature']
+    assert temperature['coverage'] == 0.75 # 0-5 (held from -5) and 10-20
+    assert temperature['in_band'] == 1.0
+    co2 = result['summary']['co2']
+    assert co2['coverage'] == 1.0
+    assert co2['mean'] == pytest.approx((5.0 * 5 + 4.0 * 5 + 6.0 * 10) / 20)
+
+
+def test_heater_duty_and_switch_ons_per_interval(chamber, journal):
+    log_rows(chamber, [(0, 37.0, 5.0)])
+    heater = chamber.actuator_name(hw_gpio.ITO_HEATING)
+    switch(journal, heater, [(5, 'on'), (15, 'off'), (50, 'on')])
+
+    result = analytics_service.compute_kpis(chamber, T0, T0 + 60, 20, **BAND)
+
+    # Nothing is known before the journal's first record (+5)
+    assert [interval['heater'] for interval in result['intervals']] == [
+        {'duty_cycle': round(10 / 15, 4), 'switch_ons': 1},
+        {'duty_cycle': 0.0, 'switch_ons': 0},
+        {'duty_cycle': 0.5, 'switch_ons': 1},
+    ]
+    assert result['summary']['heater'] == {'duty_cycle': round(20 / 55, 4), 'switch_ons': 2}
+
+
+def test_range_opening_while_on_takes_the_state_from_the_first_event(chamber, journal):
+    log_rows(chamber, [(0, 37.0, 5.0)])
+    heater = chamber.actuator_name(hw_gpio.ITO_HEATING)
+    switch(journal, heater, [(5, 'on'), (15, 'off'), (50, 'on')])
+
+    result = analytics_service.compute_kpis(chamber, T0 + 10, T0 + 30, 20, **BAND)
+
+    assert result['summary']['heater'] == {'duty_cycle': 0.25, 'switch_ons': 0}
+
+
+def test_co2_pulses_and_dose(chamber, journal, monkeypatch):
+    monkeypatch.setattr(analytics_service.Config, 'CO2_FLOW_RATE', 2.0)
+    log_rows(chamber, [(0, 37.0, 4.5)])
+    solenoid = chamber.actuator_name(hw_gpio.CO2_SOLENOID)
+    changes = []
+    for start in range(0, 3600, 30):
+        changes += [(start + 1, 'on'), (start + 1.5, 'off')]
+    switch(journal, solenoid, changes)
+
+    result = analytics_service.compute_kpis(chamber, T0, T0 + 3600, 1800, **BAND)
+
+    co2 = result['summary']['co2']
+    assert co2['pulses'] == 120
+    assert co2['open_seconds'] == 60.0
+    assert co2['open_seconds_per_hour'] == pytest.approx(60 * 3600 / 3599, abs=0.01) # Known from the first pulse (+1)
+    assert co2['dose_litres_per_hour'] == pytest.approx(2.0 * co2['open_seconds_per_hour'] / 60, abs=1e-3)
+    assert [interval['co2']['pulses'] for interval in result['intervals']] == [60, 60]
+
+
+def test_actuator_figures_are_unknown_without_a_journal(chamber, monkeypatch):
+    monkeypatch.setattr(actuator_journal, '_journal', None)
+    log_rows(chamber, [(0, 37.0, 5.0)])
+
+    result = analytics_service.compute_kpis(chamber, T0, T0 + 60, 60, **BAND)
+
+    assert result['summary']['heater'] == {'duty_cycle': None, 'switch_ons': 0}
+
+
+@pytest.mark.parametrize('params', [
+    {'start': T0, 'end': float('inf')},
+    {'start': T0, 'end': T0 + 60, 'interval': float('nan')},
+    {'start': T0, 'end': T0 + 60, 'interval': 0},
+    {'start': T0 + 60, 'end': T0},
+    {'start': T0, 'end': T0 + 60, 'low': 37.5, 'high': 37.0},
+    {'start': T0, 'end': T0 + 10_000, 'interval': 1},
+])
+def test_invalid_parameters_raise(chamber, params):
+    with pytest.raises(analytics_service.AnalyticsError):
+        analytics_service.compute_kpis(chamber, **params)
@@ -0,0 +1,122 @@
+import pytest
+
+from app.hardware import breaker as hw_breaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(hw_breaker.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.fixture
+def breaker(clock):
+    return hw_breaker.CircuitBreaker('sensor', failure_threshold=3, base_backoff=5.0, max_backoff=30.0)
+
+
+def fail(breaker, times=1, **kwargs):
+    for _ in range(times):
+        assert breaker.allow()
+        breaker.record_failure(**kwargs)
+
+
+def test_opens_after_threshold_consecutive_failures(breaker):
+    fail(breaker, 2)
+    breaker.record_success() # Resets the count
+    fail(breaker, 2)
+    assert breaker.state == hw_breaker.STATE_CLOSED
+
+    fail(breaker)
+    assert breaker.state == hw_breaker.STATE_OPEN
+    assert breaker.backoff == 5.0
+    assert not breaker.allow()
+    status = breaker.status()
+    assert (status['trips'], status['failures'], status['short_circuits']) == (1, 5, 1)
+    assert status['next_probe_in'] == 5.0
+
+
+def test_call_returns_fallback_without_reading_while_open(breaker):
+    reads = []
+
+    def read():
+        reads.append(1)
+        return -1
+
+    for _ in range(3):
+        assert breaker.call(read, 'fallback', lambda result: result == -1) == -1
+    assert breaker.call(read, 'fallback', lambda result: result == -1) == 'fallback'
+    assert len(reads) == 3
+
+
+def test_half_open_lets_exactly_one_probe_through(breaker, clock):
+    fail(breaker, 3)
+    clock.now += 4.9
+    assert not breaker.allow()
+
+    clock.now += 0.1
+    assert breaker.allow()
+    assert breaker.state == hw_breaker.STATE_HALF_OPEN
+    assert not breaker.allow() # The probe is still in progress
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == hw_breaker.STATE_CLOSED
+    assert breaker.backoff == 0.0
+    assert breaker.allow()
+
+
+def test_failed_probes_double_the_backoff_up_to_the_cap(breaker, clock):
+    fail(breaker, 3)
+    backoffs = []
+    for _ in range(5):
+        clock.now += breaker.backoff
+        fail(breaker) # The probe
+        assert breaker.state == hw_breaker.STATE_OPEN
+        backoffs.append(breaker.backoff)
+
+    assert backoffs == [10.0, 20.0, 30.0, 30.0, 30.0]
+    assert breaker.status()['trips'] == 1 # Reopening from half-open is not a new trip
+
+    clock.now += 29.0
+    assert not breaker.allow()
+    clock.now += 1.0
+    assert breaker.allow()
+
+
+def test_lost_device_opens_at_once(breaker):
+    fail(breaker, lost=True, error='port vanished')
+
+    assert breaker.state == hw_breaker.STATE_OPEN
+    assert breaker.backoff == 5.0
+    assert breaker.status()['last_failure'] == 'port vanished'
+
+
+def test_device_lost_error_from_call_opens_at_once(breaker):
+    def read():
+        raise hw_breaker.DeviceLostError('unplugged')
+
+    assert breaker.call(read, 'fallback', lambda result: False) == 'fallback'
+    assert breaker.state == hw_breaker.STATE_OPEN
+
+
+def test_probe_now_skips_the_wait_but_keeps_the_backoff(breaker, clock):
+    breaker.probe_now() # Closed: nothing to do
+    assert breaker.state == hw_breaker.STATE_CLOSED
+
+    fail(breaker, 3)
+    breaker.probe_now()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.backoff == 10.0
+
+    clock.now += 9.0
+    assert not breaker.allow()
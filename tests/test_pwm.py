@@ -0,0 +1,173 @@
+import logging
+
+import pytest
+
+from app.hardware import gpio_devices as hw_gpio
+from app.hardware import pwm
+from app.hardware import registry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakePwmChannel:
+    """RPi.GPIO.PWM stand-in."""
+    def __init__(self, pin, frequency, fail=False):
+        if fail:
+            raise RuntimeError("A PWM object already exists for this GPIO channel")
+        self.pin = pin
+        self.frequency = frequency
+        self.duties = []
+        self.running = False
+
+    def start(self, duty):
+        self.running = True
+        self.duties.append(duty)
+
+    def ChangeDutyCycle(self, duty):
+        self.duties.append(duty)
+
+    def stop(self):
+        self.running = False
+
+
+class FakeGpio:
+    """RPi.GPIO stand-in that records pin setup and output levels."""
+    BCM, OUT, HIGH, LOW = 'BCM', 'OUT', 1, 0
+
+    def __init__(self, fail_pwm=False):
+        self.fail_pwm = fail_pwm
+        self.levels = {}
+        self.channels = []
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, mode, initial=LOW):
+        self.levels[pin] = initial
+
+    def output(self, pin, level):
+        self.levels[pin] = level
+
+    def input(self, pin):
+        return self.levels.get(pin, self.LOW)
+
+    def PWM(self, pin, frequency):
+        channel = FakePwmChannel(pin, frequency, self.fail_pwm)
+        self.channels.append(channel)
+        return channel
+
+    def cleanup(self):
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(pwm.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.fixture
+def gpio(monkeypatch):
+    """Installs a FakeGpio as RPi.GPIO (other driver libraries are missing) and restores gpio_devices' state after."""
+    gpio = FakeGpio()
+
+    def require_library(module_name):
+        if module_name == 'RPi.GPIO':
+            return gpio
+        raise registry.LibraryUnavailableError(f"Driver library '{module_name}' not available")
+
+    monkeypatch.setattr(registry, 'require_library', require_library)
+    monkeypatch.setattr(hw_gpio.atexit, 'register', lambda func: None)
+    for name in ('GPIO', '_pwm_pump', '_current_pump_speed'):
+        monkeypatch.setattr(hw_gpio, name, getattr(hw_gpio, name))
+    monkeypatch.setattr(hw_gpio, '_device_states', dict(hw_gpio._device_states))
+    monkeypatch.setattr(hw_gpio, '_state_listeners', [])
+    monkeypatch.setattr(hw_gpio, '_transition_listeners', [])
+    return gpio
+
+
+def test_simulated_backend_tracks_duty_and_changes(clock):
+    backend = pwm.create_backend(pwm.BACKEND_SIMULATED, 18, 100)
+    assert isinstance(backend, pwm.SimulatedPwm)
+
+    backend.start(30)
+    clock.now += 1.0
+    backend.set_duty(75)
+    backend.stop()
+
+    assert backend.duty == 75
+    assert backend.changes == [(1000.0, 30), (1001.0, 75)]
+    assert backend.status() == {'backend': pwm.BACKEND_SIMULATED, 'timing': 'simulated', 'pin': 18, 'frequency': 100, 'duty': 75}
+
+
+def test_simulated_level_follows_the_duty_cycle(clock):
+    backend = pwm.SimulatedPwm(18, 100) # 10 ms period
+    backend.start(30)
+
+    levels = []
+    for phase in (0.0, 0.1, 0.29, 0.31, 0.5, 0.99, 1.1):
+        clock.now = 1000.0 + phase / 100
+        levels.append(backend.read_level())
+    assert levels == [1, 1, 1, 0, 0, 0, 1]
+
+    backend.set_duty(0)
+    assert backend.read_level() == 0
+
+
+def test_software_backend_drives_rpi_gpio_pwm():
+    gpio = FakeGpio()
+    backend = pwm.create_backend(pwm.BACKEND_SOFTWARE, 18, 100, gpio=gpio)
+
+    backend.start(0)
+    backend.set_duty(40)
+    backend.stop()
+
+    channel, = gpio.channels
+    assert (channel.pin, channel.frequency, channel.duties, channel.running) == (18, 100, [0, 40], False)
+    assert backend.duty == 40
+
+
+def test_unknown_backend_name_raises():
+    with pytest.raises(ValueError, match='Unknown PWM backend'):
+        pwm.create_backend('dma', 18, 100)
+
+
+def test_pwm_backend_requires_set_duty():
+    with pytest.raises(TypeError):
+        pwm.PwmBackend(18, 100)
+
+
+def test_setup_gpio_uses_the_named_backend(gpio):
+    assert hw_gpio.setup_gpio(pwm.BACKEND_SIMULATED)
+
+    assert isinstance(hw_gpio._pwm_pump, pwm.SimulatedPwm)
+    assert gpio.channels == []
+    assert hw_gpio.set_device_state(hw_gpio.PUMP, 'on')
+    assert hw_gpio.set_pump_speed(40)
+    assert [duty for _, duty in hw_gpio._pwm_pump.changes] == [0, 75, 40]
+
+
+@pytest.mark.parametrize('backend', ['no-such-backend', pwm.BACKEND_PIGPIO]) # Unknown name; pigpio library missing
+def test_setup_gpio_falls_back_to_software_pwm(gpio, caplog, backend):
+    with caplog.at_level(logging.WARNING):
+        assert hw_gpio.setup_gpio(backend)
+
+    assert isinstance(hw_gpio._pwm_pump, pwm.SoftwarePwm)
+    assert gpio.channels[0].duties == [0]
+    assert f"PWM backend '{backend}' unavailable" in caplog.text
+
+
+def test_setup_gpio_fails_when_software_pwm_fails(gpio):
+    gpio.fail_pwm = True
+
+    assert not hw_gpio.setup_gpio(pwm.BACKEND_SOFTWARE)
@@ -0,0 +1,51 @@
+from app import settings
+from app.hardware import gpio_devices as hw_gpio
+from app.hardware import serial_comms as hw_serial
+from app.services import control_service
+from app.services import datalog_service
+from app.services import replay_service
+from app.services import samples
+
+
+def write_log(path, rows):
+    """Writes a CSV log of (timestamp, control temperature, co2) rows."""
+    datalog_service.initialize_datalog(path)
+    for timestamp, temperature, co2 in rows:
+        sample = samples.Sample.from_readings(timestamp, {'temperatures': [temperature] * 5, 'co2': co2})
+        datalog_service.save_data_to_log(sample, path)
+
+
+def test_replay_runs_every_stage_and_decides_on_the_recorded_timeline(tmp_path):
+    snapshot = settings.current()
+    cold = snapshot.temp_lower_bound - 1.0
+    hot = snapshot.temp_upper_bound + 1.0
+    low_co2 = snapshot.co2_threshold / 2
+    path = str(tmp_path / 'sensor_data.csv')
+    write_log(path, [
+        (1700000000, cold, low_co2),
+        (1700000001, hot, hw_serial.FALLBACK_CO2_PERCENT), # Within both control intervals: no decisions
+        (1700000600, hot, hw_serial.FALLBACK_CO2_PERCENT), # Heater off; no CO2 reading
+    ])
+    with open(path, 'a') as file:
+        file.write('1700000700,partial\n')
+
+    result = replay_service.replay(path)
+
+    assert result['samples'] == 3
+    assert result['simulated_seconds'] == 600
+    assert all(stats['count'] == 3 for stats in result['stages'].values())
+    assert [(d['timestamp'], d['device'], d['action']) for d in result['decisions']] == [
+        (1700000000, hw_gpio.ITO_HEATING, 'on'),
+        (1700000000, hw_gpio.CO2_SOLENOID, control_service.CO2_PULSE),
+        (1700000600, hw_gpio.ITO_HEATING, 'off'),
+    ]
+
+
+def test_replay_honours_the_time_range(tmp_path):
+    path = str(tmp_path / 'sensor_data.csv')
+    write_log(path, [(1700000000 + offset, 37.0, 5.0) for offset in range(0, 50, 10)])
+
+    result = replay_service.replay(path, start_time=1700000010, end_time=1700000030)
+
+    assert result['samples'] == 3
+    assert result['simulated_seconds'] == 20
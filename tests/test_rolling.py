@@ -0,0 +1,87 @@
+import math
+import random
+
+import pytest
+
+from app.utils.rolling import EMPTY_STATS, RollingWindow
+
+
+def brute_force(samples, now, window):
+    """WindowStats fields computed directly from the (time, value) samples still in the window at `now`."""
+    kept = [(t, v) for t, v in samples if now - t < window]
+    n = len(kept)
+    if n == 0:
+        return EMPTY_STATS
+    times = [t for t, _ in kept]
+    values = [v for _, v in kept]
+    mean = sum(values) / n
+    variance = slope = None
+    if n > 1:
+        variance = sum((v - mean) ** 2 for v in values) / (n - 1)
+        mean_t = sum(times) / n
+        spread_t = sum((t - mean_t) ** 2 for t in times)
+        if spread_t / n > RollingWindow.MIN_TIME_VARIANCE:
+            slope = sum((t - mean_t) * (v - mean) for t, v in kept) / spread_t * 60
+    return (n, mean, variance, min(values), max(values), slope)
+
+
+def assert_matches(stats, expected):
+    assert stats.count == expected[0]
+    for actual, wanted in zip(stats[1:], expected[1:]):
+        if wanted is None:
+            assert actual is None
+        else:
+            assert actual == pytest.approx(wanted, rel=1e-6, abs=1e-6)
+
+
+def run_against_brute_force(rng, window, steps, start=0.0, gap=2.0, none_rate=0.1):
+    rolling = RollingWindow(window)
+    samples = []
+    now = start
+    for _ in range(steps):
+        now += rng.choice([0.0, rng.uniform(0, gap), rng.uniform(0, gap * 10)]) # Repeated times and long gaps too
+        value = None if rng.random() < none_rate else rng.choice([rng.uniform(-50, 50), float(rng.randint(0, 3))])
+        rolling.update(now, value)
+        if value is not None:
+            samples.append((now, value))
+        assert_matches(rolling.stats(), brute_force(samples, now, window))
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_brute_force_window(seed):
+    rng = random.Random(seed)
+    run_against_brute_force(rng, window=rng.choice([1.0, 10.0, 60.0]), steps=400)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_after_periodic_recompute(seed, monkeypatch):
+    monkeypatch.setattr(RollingWindow, 'RECOMPUTE_MIN_EVICTIONS', 8)
+    rng = random.Random(100 + seed)
+    # Unix-epoch times and an offset level: the case the recompute and relative times are for
+    run_against_brute_force(rng, window=30.0, steps=1500, start=1.7e9, gap=1.0, none_rate=0.02)
+
+
+def test_min_and_max_follow_eviction():
+    rolling = RollingWindow(10)
+    for t, value in [(0, 5.0), (1, 1.0), (2, 9.0), (3, 4.0)]:
+        rolling.update(t, value)
+    assert (rolling.stats().min, rolling.stats().max) == (1.0, 9.0)
+
+    rolling.update(11.5, None) # 0 and 1 leave the window; None only ages it
+    assert (rolling.stats().count, rolling.stats().min, rolling.stats().max) == (2, 4.0, 9.0)
+
+    rolling.update(12, None)
+    assert (rolling.stats().count, rolling.stats().min, rolling.stats().max) == (1, 4.0, 4.0)
+    assert rolling.stats().variance is None
+
+    rolling.update(100, None)
+    assert rolling.stats() == EMPTY_STATS
+
+
+def test_slope_is_per_minute():
+    rolling = RollingWindow(600)
+    for t in range(0, 120, 10):
+        rolling.update(t, 20.0 + t / 60 * 0.5) # 0.5 per minute
+
+    assert rolling.stats().slope == pytest.approx(0.5)
+    assert math.isclose(rolling.stats().mean, 20.0 + 55 / 60 * 0.5)
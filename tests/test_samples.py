@@ -0,0 +1,85 @@
+import csv
+import json
+
+import pytest
+
+from app.hardware import sensors as hw_sensors
+from app.hardware import serial_comms as hw_serial
+from app.services import datalog_service
+from app.services import samples
+
+# The CSV log layout before the channel registry; existing log files use it
+BASELINE_HEADER = [
+    'timestamp', 'co2', 'o2',
+    'temperature_1', 'temperature_2', 'temperature_3', 'temperature_4', 'temperature_5',
+    'humidity',
+]
+
+READINGS = {
+    'temperatures': [37.0, 37.1, 36.9, 37.2, 36.8],
+    'humidity': 92.5,
+    'o2': 19.8,
+    'co2': 5.1,
+}
+
+
+def test_log_header_matches_the_baseline_layout(tmp_path):
+    assert samples.LOG_HEADER == BASELINE_HEADER
+    path = tmp_path / 'sensor_data.csv'
+    datalog_service.initialize_datalog(str(path))
+    assert path.read_bytes() == (','.join(BASELINE_HEADER) + '\r\n').encode()
+
+
+def test_to_dict_and_mapping_access():
+    sample = samples.Sample.from_readings(1700000000, READINGS, acquired_ns=123, read_ms={'co2': 4.0})
+
+    assert sample.to_dict() == {'timestamp': 1700000000, **READINGS, 'acquired_ns': 123, 'read_ms': {'co2': 4.0}}
+    assert dict(sample) == sample.to_dict()
+    assert sample['temperatures'] == READINGS['temperatures']
+    assert sample.channel('temperature_3') == 36.9
+    assert json.loads(sample.to_json()) == sample.to_dict()
+    assert samples.as_sample(sample.to_dict()).to_dict() == sample.to_dict()
+
+
+def test_log_row_round_trip():
+    sample = samples.Sample.from_readings(1700000000, READINGS)
+
+    row = sample.log_row()
+    assert row == [1700000000, 5.1, 19.8, *READINGS['temperatures'], 92.5] # BASELINE_HEADER order
+    assert samples.Sample.from_log_row(row[0], row[1:]).to_dict() == sample.to_dict()
+
+
+def test_parse_log_row_reads_what_was_written(tmp_path):
+    path = str(tmp_path / 'sensor_data.csv')
+    datalog_service.initialize_datalog(path)
+    written = [samples.Sample.from_readings(1700000000, READINGS), samples.Sample.from_readings(1700000010.5, {'co2': 4.9})]
+    for sample in written:
+        datalog_service.save_data_to_log(sample, path)
+
+    with open(path, newline='') as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == BASELINE_HEADER
+    parsed = [datalog_service.parse_log_row(row) for row in rows[1:]]
+    assert [sample.to_dict() for sample in parsed] == [sample.to_dict() for sample in written]
+    assert isinstance(parsed[0].timestamp, int)
+
+
+@pytest.mark.parametrize('row', [['1700000000', '5.0'], ['x'] * len(BASELINE_HEADER)])
+def test_parse_log_row_rejects_malformed_rows(row):
+    with pytest.raises(ValueError):
+        datalog_service.parse_log_row(row)
+
+
+def test_missing_readings_and_short_temperature_lists_get_fallbacks():
+    sample = samples.Sample.from_readings(1700000000, {'temperatures': [37.0, 36.5], 'co2': 5.0})
+
+    fallback = hw_sensors.FALLBACK_TEMPERATURE
+    assert sample['temperatures'] == [37.0, 36.5, fallback, fallback, fallback]
+    assert sample['humidity'] == hw_sensors.FALLBACK_HUMIDITY
+    assert sample['o2'] == hw_sensors.FALLBACK_OXYGEN
+    assert sample.channel_values()['temperature_3'] is None
+    assert sample.channel_values()['temperature_2'] == 36.5
+
+    too_many = samples.Sample.from_readings(1700000000, {'temperatures': [37.0] * 7})
+    assert too_many['temperatures'] == [37.0] * 5
+    assert samples.Sample.from_readings(1700000000, {})['co2'] == hw_serial.FALLBACK_CO2_PERCENT
@@ -26,12 +26,29 @@ def reconnect_wifi():
     except Exception as e:
         logging.error(f"Error reconnecting to Wi-Fi: {e}")
 
+CHECK_INTERVAL = 60 # Seconds between connectivity checks
+
+def check_wifi():
+    """Single connectivity check, reconnecting if needed. Blocking (ping, ifconfig)."""
+    if not is_wifi_connected():
+        reconnect_wifi()
+
 def wifi_monitor():
     while True:
-        if not is_wifi_connected():
-            reconnect_wifi()
-        time.sleep(60)
+        check_wifi()
+        time.sleep(CHECK_INTERVAL)
 
-def start_wifi_monitor():
+def start_wifi_monitor(scheduler=None):
+    """
+    Starts the monitor. Inside the app, pass the app scheduler so the check runs
+    as a periodic job (on its blocking I/O pool); standalone, a thread is used.
+    """
+    if scheduler is not None:
+        scheduler.add_periodic_job('wifi-monitor', lambda: scheduler.run_blocking(check_wifi),
+                                   interval=CHECK_INTERVAL, deadline=CHECK_INTERVAL, start_delay=CHECK_INTERVAL)
+        return
     wifi_thread = threading.Thread(target=wifi_monitor, daemon=True)
     wifi_thread.start()
+
+if __name__ == "__main__":
+    wifi_monitor()